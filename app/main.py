@@ -1,8 +1,16 @@
 import streamlit as st
 import plotly.graph_objects as go
-import joblib
-import numpy as np
 import os
+import sys
+
+# Make the repository root importable so the dashboard can use the `src` package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.batch import RuntimeWatcher
+from src.coalescing import PredictionCoalescer
+from src.instrumentation import RECORDER, stage
+from src.prediction_cache import PredictionCache
+from src.premium_table import DEFAULT_TABLE_PATH, PremiumTable
 
 # ==============================================================================
 # 1. APPLICATION ARCHITECTURE & CONFIGURATION
@@ -20,33 +28,85 @@ st.set_page_config(
 # 2. ARTIFACT DESERIALIZATION & RESOURCE MANAGEMENT
 # ==============================================================================
 @st.cache_resource
-def load_artifacts():
+def load_runtime_watcher():
     """
-    Deserializes and loads machine learning artifacts (Model & Scaler) from the disk.
+    Process-wide watcher over the inference runtime (compiled Model & Scaler parameters).
     Implements a Singleton pattern via Streamlit's resource caching decorator 
     to optimize memory allocation and prevent reload latency on interaction.
+    The runtime is reloaded when the artifact files change on disk, so a
+    retrained model is picked up without restarting the dashboard.
+
+    Returns:
+        RuntimeWatcher: The shared watcher (see `src.batch.RuntimeWatcher`).
+    """
+    return RuntimeWatcher()
+
+def load_artifacts():
+    """
+    Returns the current inference runtime from the shared watcher.
+
+    Every path yields a raw-space runtime: the scaler is folded into the forest's
+    split thresholds, so requests are predicted from unscaled inputs directly.
+    See `src.batch.load_default_runtime` for the loader priority (.bin > .npz > .pkl).
     
     Returns:
-        dict: A dictionary containing the 'model' (RandomForest) and 'scaler' (StandardScaler).
+        InferenceRuntime: The runtime, or None when no artifacts are available.
     """
-    artifacts = {}
     try:
-        # Load the pre-trained Random Forest Regressor
-        if os.path.exists('models/champion_random_forest.pkl'):
-            artifacts['model'] = joblib.load('models/champion_random_forest.pkl')
-        
-        # Load the feature scaler for normalization consistency
-        if os.path.exists('models/scaler.pkl'):
-            artifacts['scaler'] = joblib.load('models/scaler.pkl')
+        return load_runtime_watcher().current()
     except Exception as e:
         # Error handling could be expanded for logging in production environments
         return None
-    return artifacts
+
+@st.cache_resource
+def load_premium_table(model_checksum):
+    """
+    Memory-maps the precomputed premium table (see `python -m src.premium_table`).
+    The table is only used when it was built from the currently loaded model.
+
+    Returns:
+        PremiumTable: The table, or None when missing or stale.
+    """
+    try:
+        if os.path.exists(DEFAULT_TABLE_PATH):
+            table = PremiumTable.open(DEFAULT_TABLE_PATH)
+            if model_checksum is not None and table.model_checksum == model_checksum:
+                return table
+    except Exception as e:
+        return None
+    return None
+
+@st.cache_resource
+def load_prediction_cache():
+    """
+    Process-wide LRU/TTL cache of premiums keyed on the encoded profile. It is
+    not keyed on the model: it clears itself when the watcher reloads a model
+    with a different checksum.
+
+    Returns:
+        PredictionCache: The shared cache (counters exported with the metrics).
+    """
+    cache = PredictionCache()
+    RECORDER.register_counters('prediction_cache', cache.stats)
+    return cache
+
+@st.cache_resource
+def load_coalescer():
+    """
+    One prediction dispatcher shared by every browser session of this process.
+    Concurrent submits from different sessions are collected for a few
+    milliseconds and predicted as a single matrix (see `src/coalescing.py`).
+    It predicts through the runtime watcher, so every batch uses the current model.
+
+    Returns:
+        PredictionCoalescer: The shared dispatcher.
+    """
+    return PredictionCoalescer(load_runtime_watcher(), cache=load_prediction_cache())
 
 # Initialize system artifacts
-assets = load_artifacts()
-model = assets['model'] if assets else None
-scaler = assets['scaler'] if assets else None
+runtime = load_artifacts()
+premium_table = load_premium_table(runtime.checksum) if runtime else None
+coalescer = load_coalescer() if runtime else None
 
 # ==============================================================================
 # 3. FRONTEND CONTROLLER & UI ORCHESTRATION
@@ -127,74 +187,113 @@ def main():
                 prediction = 0.0
                 
                 # --- INFERENCE PIPELINE EXECUTION ---
-                if model and scaler:
-                    # 1. Feature Encoding (Categorical -> Numerical)
-                    sex_val = 0 if sex == 'Male' else 1
-                    smoker_val = 1 if smoker else 0
-                    
-                    # One-Hot Encoding for Region
-                    r_nw = 1 if region == 'Northwest' else 0
-                    r_se = 1 if region == 'Southeast' else 0
-                    r_sw = 1 if region == 'Southwest' else 0
-                    
-                    # 2. Logic Layer: Dynamic Cluster Assignment
-                    # Heuristic: Smokers assigned to High-Risk Cluster (2), others to Baseline (1)
-                    cluster = 2 if smoker_val == 1 else 1
-                    
-                    # 3. Feature Normalization (Scaling)
-                    # Note: Scaler expects raw vector shape: [Age, BMI, Children, Cluster]
-                    input_raw = np.array([[age, bmi, children, cluster]])
-                    input_scaled = scaler.transform(input_raw)[0]
-                    
-                    # 4. Vector Assembly (Dense Input Construction)
-                    # Final Vector Shape: [Age(s), Sex, BMI(s), Child(s), Smoker, NW, SE, SW, Cluster(s)]
-                    final_vec = np.array([[
-                        input_scaled[0], sex_val, input_scaled[1], input_scaled[2],
-                        smoker_val, r_nw, r_se, r_sw, input_scaled[3]
-                    ]])
+                # 0. O(1) Fast Path: precomputed premium for on-grid profiles
+                table_hit = None
+                if premium_table:
+                    with stage('table_lookup'):
+                        table_hit = premium_table.lookup(age, sex, bmi, children, smoker, region)
+
+                if table_hit is not None:
+                    prediction = table_hit
+                elif coalescer:
+                    # 1. Shared Feature Pipeline (same encoder as training and bulk jobs)
+                    # Categorical lookup tables, Cluster heuristic and vector assembly
+                    # [Age, Sex, BMI, Child, Smoker, NW, SE, SW, Cluster] live in
+                    # src/feature_pipeline.py, in the column order of src/schema.py
+                    profile = {
+                        'age': age, 'sex': sex, 'bmi': bmi, 'children': children,
+                        'smoker': smoker, 'region': region,
+                    }
                     
-                    # 5. Model Inference
-                    prediction = model.predict(final_vec)[0]
+                    # 2. Model Inference (scaler is folded into the split thresholds)
+                    # Coalesced with concurrent submits from other sessions into one batch
+                    prediction = coalescer.predict(profile)
                 else:
                     # Fallback Logic for development/debugging contexts
                     prediction = 0.0
                 
                 # --- POST-PROCESSING & VISUALIZATION ---
                 
-                # 1. Logic-Based Alerts (Threshold Analysis)
-                if prediction > 30000:
-                    st.error("⚠️ High Risk Profile Detected: Premium exceeds standard thresholds.")
-                elif prediction < 10000:
-                    st.success("✅ Low Risk Profile: Optimal health markers identified.")
-                else:
-                    st.info("ℹ️ Standard Risk Profile: Aligns with market averages.")
+                with stage('render'):
+                    # 1. Logic-Based Alerts (Threshold Analysis)
+                    if prediction > 30000:
+                        st.error("⚠️ High Risk Profile Detected: Premium exceeds standard thresholds.")
+                    elif prediction < 10000:
+                        st.success("✅ Low Risk Profile: Optimal health markers identified.")
+                    else:
+                        st.info("ℹ️ Standard Risk Profile: Aligns with market averages.")
 
-                # 2. Key Performance Indicator (KPI) Display
-                st.metric(label="ESTIMATED ANNUAL PREMIUM", value=f"$ {prediction:,.2f}")
-                
-                # 3. Data Visualization: Gauge Chart (Plotly)
-                # Visualizes the prediction relative to min/max domain boundaries
-                fig = go.Figure(go.Indicator(
-                    mode = "gauge+number",
-                    value = prediction,
-                    number = {'prefix': "$ "},
-                    gauge = {
-                        'axis': {'range': [2000, 60000]}, # Domain boundaries
-                        'bar': {'color': "rgba(0,0,0,0)"}, # Transparent needle background
-                        'steps': [
-                            {'range': [2000, 15000], 'color': "#00b894"},  # Safe Zone
-                            {'range': [15000, 35000], 'color': "#fdcb6e"}, # Caution Zone
-                            {'range': [35000, 60000], 'color': "#ff7675"}  # Danger Zone
-                        ],
-                        'threshold': {'line': {'color': "black", 'width': 4}, 'thickness': 0.75, 'value': prediction}
-                    }
-                ))
-                fig.update_layout(height=250, margin=dict(l=20, r=20, t=20, b=20))
-                st.plotly_chart(fig, use_container_width=True)
+                    # 2. Key Performance Indicator (KPI) Display
+                    st.metric(label="ESTIMATED ANNUAL PREMIUM", value=f"$ {prediction:,.2f}")
+                    
+                    # 3. Data Visualization: Gauge Chart (Plotly)
+                    # Visualizes the prediction relative to min/max domain boundaries
+                    fig = go.Figure(go.Indicator(
+                        mode = "gauge+number",
+                        value = prediction,
+                        number = {'prefix': "$ "},
+                        gauge = {
+                            'axis': {'range': [2000, 60000]}, # Domain boundaries
+                            'bar': {'color': "rgba(0,0,0,0)"}, # Transparent needle background
+                            'steps': [
+                                {'range': [2000, 15000], 'color': "#00b894"},  # Safe Zone
+                                {'range': [15000, 35000], 'color': "#fdcb6e"}, # Caution Zone
+                                {'range': [35000, 60000], 'color': "#ff7675"}  # Danger Zone
+                            ],
+                            'threshold': {'line': {'color': "black", 'width': 4}, 'thickness': 0.75, 'value': prediction}
+                        }
+                    ))
+                    fig.update_layout(height=250, margin=dict(l=20, r=20, t=20, b=20))
+                    st.plotly_chart(fig, use_container_width=True)
 
             else:
                 # Idle State UI
                 st.info("Awaiting Input: Adjust parameters and execute prediction to view results.")
 
+    # Hidden operator view, only reachable through the `?admin=1` query parameter
+    if st.query_params.get('admin') == '1':
+        render_admin_panel()
+
+# ==============================================================================
+# 4. ADMIN PANEL: PIPELINE LATENCY METRICS
+# ==============================================================================
+def render_admin_panel():
+    """
+    Renders per-stage latency percentiles (encode, cluster, scale, inference,
+    cache_lookup, table_lookup, render), the prediction cache counters and the
+    Prometheus-format export.
+    """
+    st.markdown("---")
+    with st.expander("Pipeline Latency Metrics", expanded=True):
+        RECORDER.enabled = st.toggle("Record stage timings", value=RECORDER.enabled)
+        if coalescer and coalescer.batches:
+            st.caption(f"Prediction coalescer: {coalescer.rows:,} requests in "
+                       f"{coalescer.batches:,} batches "
+                       f"(mean batch {coalescer.rows / coalescer.batches:.1f} rows).")
+        counters = RECORDER.counters().get('prediction_cache')
+        if counters:
+            st.caption(f"Prediction cache: {counters['hits']:,} hits / {counters['misses']:,} "
+                       f"misses ({counters['hit_rate']:.1%}), {counters['size']:,} entries, "
+                       f"{counters['evictions']:,} evictions, {counters['invalidations']} "
+                       f"invalidations.")
+        summary = RECORDER.summary()
+        if not summary:
+            st.info("No timings recorded yet: enable recording and execute a prediction.")
+            return
+        rows = [
+            {
+                'stage': name,
+                'count': stats['count'],
+                'p50 (ms)': round(stats['p50'] * 1e3, 3),
+                'p95 (ms)': round(stats['p95'] * 1e3, 3),
+                'p99 (ms)': round(stats['p99'] * 1e3, 3),
+            }
+            for name, stats in summary.items()
+        ]
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        if st.button("Reset metrics"):
+            RECORDER.reset()
+        st.code(RECORDER.render_text(), language='text')
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
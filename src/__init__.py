@@ -0,0 +1,9 @@
+"""
+InsureAI source package.
+
+Production-side code shared by the Streamlit dashboard (`app/main.py`) and the
+offline tooling. Modules are intentionally flat and import each other through
+the `src.` prefix, so commands are executed from the repository root, e.g.:
+
+    python -m src.forest_engine
+"""
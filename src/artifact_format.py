@@ -0,0 +1,241 @@
+"""
+Memory-mapped, zero-copy model artifact format.
+
+Layout of a `.bin` artifact (all offsets are absolute and 64-byte aligned):
+
+    +---------------------------------------------------------------+
+    | magic  b"INSUREAI" (8) | version uint32 | reserved uint32     |
+    | header length uint64                                          |
+    | header: UTF-8 JSON (array table, scaler, feature schema, ...) |
+    | payload: contiguous node arrays + scaler arrays               |
+    +---------------------------------------------------------------+
+
+The header records dtype/shape/offset for every array and a SHA-256 of the
+payload. Opening an artifact maps the file with `np.memmap`, so every worker
+process shares a single page-cache copy and loading is independent of model size.
+
+Usage (from the repository root):
+
+    python -m src.artifact_format                 # convert the champion .pkl files
+    python -m src.artifact_format --verify-only   # validate an existing artifact
+"""
+import argparse
+import hashlib
+import json
+import struct
+
+import numpy as np
+
+from src.forest_engine import CompiledForest
+from src.runtime import InferenceRuntime, runtime_from_sklearn
+
+MAGIC = b'INSUREAI'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DEFAULT_ARTIFACT_PATH = 'models/champion_forest.bin'
+
+# magic, version, reserved, header length
+_PREAMBLE = struct.Struct('<8sIIQ')
+
+# Scaler parameters travel as arrays so they stay bit-exact
+_SCALER_FIELDS = ('scaler_mean', 'scaler_scale', 'scaled_columns')
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+# ==============================================================================
+# 1. WRITER
+# ==============================================================================
+def write_artifact(runtime, path=DEFAULT_ARTIFACT_PATH):
+    """
+    Serializes an `InferenceRuntime` into the memory-mappable artifact format.
+
+    Returns:
+        str: Hex SHA-256 of the payload (also stored in the header).
+    """
+    forest = runtime.forest
+    arrays = dict(forest.arrays())
+    arrays['compare_threshold'] = forest.compare_threshold
+    arrays['scaler_mean'] = runtime.scaler_mean
+    arrays['scaler_scale'] = runtime.scaler_scale
+    arrays['scaled_columns'] = runtime.scaled_columns
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+
+    # Payload offsets are relative until the header size is known
+    table, relative = {}, 0
+    for name, arr in arrays.items():
+        relative = _align(relative)
+        table[name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': relative}
+        relative += arr.nbytes
+    payload_size = relative
+
+    payload = bytearray(payload_size)
+    for name, arr in arrays.items():
+        start = table[name]['offset']
+        payload[start:start + arr.nbytes] = arr.tobytes()
+    checksum = hashlib.sha256(payload).hexdigest()
+
+    header = {
+        'arrays': table,
+        'payload_size': payload_size,
+        'payload_sha256': checksum,
+        'max_depth': forest.max_depth,
+        'n_features': forest.n_features,
+        'float32_inputs': forest.float32_inputs,
+        'forest_metadata': forest.metadata,
+        'feature_names': runtime.feature_names,
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    payload_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    with open(path, 'wb') as fh:
+        fh.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header_bytes)))
+        fh.write(header_bytes)
+        fh.write(b'\0' * (payload_start - _PREAMBLE.size - len(header_bytes)))
+        fh.write(payload)
+    return checksum
+
+
+# ==============================================================================
+# 2. READER
+# ==============================================================================
+def read_header(path):
+    """
+    Reads and validates the preamble and JSON header without touching the payload.
+
+    Returns:
+        tuple: (header dict, absolute payload offset)
+
+    Raises:
+        ValueError: If the file is not an artifact or has an unsupported version.
+    """
+    with open(path, 'rb') as fh:
+        preamble = fh.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise ValueError(f"{path} is too short to be a model artifact.")
+        magic, version, _, header_len = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an InsureAI model artifact.")
+        if version != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported artifact version {version} (expected {FORMAT_VERSION})."
+            )
+        header = json.loads(fh.read(header_len).decode('utf-8'))
+    return header, _align(_PREAMBLE.size + header_len)
+
+
+def open_artifact(path=DEFAULT_ARTIFACT_PATH, verify=True):
+    """
+    Maps an artifact into memory and wraps it in an `InferenceRuntime`.
+
+    Node arrays are read-only views into the shared mapping (no per-process copy).
+
+    Args:
+        path (str): Artifact location.
+        verify (bool): Recompute the payload SHA-256 and compare with the header.
+
+    Returns:
+        InferenceRuntime: Runtime whose `checksum` is the payload SHA-256.
+
+    Raises:
+        ValueError: On malformed headers, truncated files or checksum mismatch.
+    """
+    header, payload_start = read_header(path)
+    mapping = np.memmap(path, dtype=np.uint8, mode='r')
+    payload = mapping[payload_start:]
+    if payload.shape[0] < header['payload_size']:
+        raise ValueError(f"{path} is truncated.")
+    if verify:
+        digest = hashlib.sha256(payload[:header['payload_size']]).hexdigest()
+        if digest != header['payload_sha256']:
+            raise ValueError(f"Checksum mismatch for {path}: artifact is corrupted.")
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        arrays[name] = np.ndarray(
+            shape=tuple(spec['shape']), dtype=np.dtype(spec['dtype']),
+            buffer=payload, offset=spec['offset'],
+        )
+
+    forest = CompiledForest(
+        **{name: arrays[name] for name in CompiledForest.ARRAY_FIELDS},
+        max_depth=header['max_depth'],
+        n_features=header['n_features'],
+        float32_inputs=header['float32_inputs'],
+        metadata=header['forest_metadata'],
+        compare_threshold=arrays['compare_threshold'],
+    )
+    return InferenceRuntime(
+        forest=forest,
+        **{name: arrays[name] for name in _SCALER_FIELDS},
+        feature_names=header['feature_names'],
+        checksum=header['payload_sha256'],
+    )
+
+
+# ==============================================================================
+# 3. CONVERTER (.pkl -> .bin)
+# ==============================================================================
+def convert_pickles(model_path='models/champion_random_forest.pkl',
+                    scaler_path='models/scaler.pkl',
+                    output_path=DEFAULT_ARTIFACT_PATH,
+                    x_test_path='data/X_test.csv',
+                    raw_space=True):
+    """
+    Converts the joblib pickles into an artifact and verifies parity.
+
+    By default the scaler is folded into the split thresholds (raw-space variant,
+    see `src/raw_space.py`) so serving skips the per-request transform.
+
+    Raises:
+        RuntimeError: If the re-opened artifact does not reproduce the pickles.
+    """
+    import joblib
+    import pandas as pd
+
+    from src.raw_space import boundary_profiles, sample_raw_profiles
+
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    reference = runtime_from_sklearn(model, scaler)
+    X_test = pd.read_csv(x_test_path)
+    if not np.array_equal(reference.predict(X_test.to_numpy()), model.predict(X_test)):
+        raise RuntimeError(f"Compiled forest does not reproduce {model_path}.")
+
+    write_artifact(reference.to_raw_space() if raw_space else reference, output_path)
+    runtime = open_artifact(output_path)
+
+    # Raw-unit inputs exercise both variants, including values on split boundaries
+    X_raw = sample_raw_profiles(10_000)
+    if runtime.input_space == 'raw':
+        X_raw = np.vstack([X_raw, boundary_profiles(runtime, X_raw)])
+    if not np.array_equal(runtime.predict_raw(X_raw), reference.predict_raw(X_raw)):
+        raise RuntimeError(f"Artifact {output_path} does not reproduce {model_path}.")
+    return runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert/validate memory-mapped model artifacts.")
+    parser.add_argument('--model', default='models/champion_random_forest.pkl')
+    parser.add_argument('--scaler', default='models/scaler.pkl')
+    parser.add_argument('--output', default=DEFAULT_ARTIFACT_PATH)
+    parser.add_argument('--scaled', action='store_true',
+                        help="Keep scaled-space thresholds instead of folding the scaler.")
+    parser.add_argument('--verify-only', action='store_true',
+                        help="Only validate the checksum of an existing artifact.")
+    args = parser.parse_args()
+
+    if args.verify_only:
+        runtime = open_artifact(args.output, verify=True)
+        print(f"✅ Artifact '{args.output}' is valid (sha256 {runtime.checksum[:12]}...).")
+        return
+
+    runtime = convert_pickles(args.model, args.scaler, args.output, raw_space=not args.scaled)
+    print(f"✅ Artifact saved to '{args.output}' "
+          f"({runtime.forest.n_trees} trees, {runtime.input_space}-space, sha256 {runtime.checksum[:12]}...).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Vectorized batch prediction API.
+
+`predict_batch(records)` takes raw applicant profiles in the schema of
+`data/medical_insurance_data.csv` (age, sex, bmi, children, smoker, region) and
+returns one premium per row. Profiles are encoded by the encode stage of
+`src.feature_pipeline` (the pipeline training uses), so the dashboard, the HTTP
+service and bulk jobs share one encoder with the preprocessing.
+
+Accepted inputs:
+    * pandas DataFrame with the raw columns;
+    * dict of column -> list / array;
+    * list of dicts (one per applicant).
+"""
+import hashlib
+import os
+import threading
+import time
+
+from src.artifact_format import DEFAULT_ARTIFACT_PATH, open_artifact
+from src.feature_pipeline import RAW_COLUMNS, encode_batch
+from src.instrumentation import stage
+from src.runtime import DEFAULT_BUNDLE_PATH, load_bundle, runtime_from_sklearn
+from src.schema import FEATURE_SCHEMA, out_of_range, verify_order
+
+# ==============================================================================
+# 1. RUNTIME RESOLUTION & PREDICTION
+# ==============================================================================
+PICKLE_PATHS = ('models/champion_random_forest.pkl', 'models/scaler.pkl')
+DEFAULT_RELOAD_CHECK_SECONDS = 5.0
+
+
+def artifact_paths():
+    """
+    Files of the runtime `load_default_runtime` would load.
+
+    Returns:
+        tuple[str]: The `.bin` artifact, the `.npz` bundle or both pickles, or ()
+            when no artifacts are available.
+    """
+    if os.path.exists(DEFAULT_ARTIFACT_PATH):
+        return (DEFAULT_ARTIFACT_PATH,)
+    if os.path.exists(DEFAULT_BUNDLE_PATH):
+        return (DEFAULT_BUNDLE_PATH,)
+    if all(os.path.exists(path) for path in PICKLE_PATHS):
+        return PICKLE_PATHS
+    return ()
+
+
+def artifact_fingerprint():
+    """Cheap change detector for the serving artifacts: (path, mtime_ns, size) per file."""
+    fingerprint = []
+    for path in artifact_paths():
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        fingerprint.append((path, info.st_mtime_ns, info.st_size))
+    return tuple(fingerprint)
+
+
+def load_default_runtime():
+    """
+    Loads the serving runtime, always in raw space (scaler folded into thresholds).
+
+    Loader priority:
+        1. Memory-mapped `.bin` artifact (shared page cache, checksum validated).
+        2. NumPy-only `.npz` bundle (no scikit-learn import).
+        3. joblib pickles (fallback, requires scikit-learn).
+
+    The runtime's feature order is checked against `src.schema`, which is the
+    column order `encode_batch` produces. Its `checksum` identifies the model
+    content on every path (payload SHA-256, bundle file SHA-256, or SHA-256 of
+    both pickles), so caches keyed on it see a swapped model.
+
+    Returns:
+        InferenceRuntime: The runtime, or None when no artifacts are available.
+
+    Raises:
+        ValueError: If an artifact is truncated or corrupted (whatever the
+            loader raised is chained), or its feature order differs from the schema.
+    """
+    paths = artifact_paths()
+    if not paths:
+        return None
+    source = DEFAULT_ARTIFACT_PATH if paths[0] == DEFAULT_ARTIFACT_PATH else \
+        DEFAULT_BUNDLE_PATH if paths[0] == DEFAULT_BUNDLE_PATH else 'models/*.pkl'
+    try:
+        if source == DEFAULT_ARTIFACT_PATH:
+            runtime = open_artifact(DEFAULT_ARTIFACT_PATH)
+        elif source == DEFAULT_BUNDLE_PATH:
+            runtime = load_bundle(DEFAULT_BUNDLE_PATH)
+        else:
+            import joblib
+            model = joblib.load(PICKLE_PATHS[0])
+            scaler = joblib.load(PICKLE_PATHS[1])
+            runtime = runtime_from_sklearn(model, scaler)
+            digest = hashlib.sha256()
+            for path in PICKLE_PATHS:
+                with open(path, 'rb') as fh:
+                    digest.update(fh.read())
+            runtime.checksum = digest.hexdigest()
+    except (ValueError, OSError):
+        raise
+    except Exception as e:  # e.g. BadZipFile, EOFError, UnpicklingError on a truncated file
+        raise ValueError(f"Cannot load '{source}': {type(e).__name__}: {e}") from e
+    if runtime.feature_names:
+        verify_order(runtime.feature_names, f"'{source}'")
+    return runtime.to_raw_space()
+
+
+class RuntimeWatcher:
+    """
+    The default runtime, reloaded when its artifact files change on disk.
+
+    At most every `check_seconds` the files are stat-ed (mtime, size); on a
+    change the runtime is reloaded, and its new checksum clears any
+    `PredictionCache` it feeds. A file caught mid-write fails to load and keeps
+    the previous runtime until the next check.
+
+    Args:
+        check_seconds (float): Minimum interval between two stat checks.
+
+    Attributes:
+        reloads (int): Successful (re)loads, the first one included.
+    """
+
+    def __init__(self, check_seconds=DEFAULT_RELOAD_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self.reloads = 0
+        self._runtime = None
+        self._fingerprint = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """
+        Returns:
+            InferenceRuntime: The up-to-date runtime, or None when no artifacts exist.
+
+        Raises:
+            ValueError: If the first load fails (later failures keep the old runtime).
+        """
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_seconds:
+            return self._runtime
+        with self._lock:
+            self._checked = now
+            fingerprint = artifact_fingerprint()
+            if fingerprint != self._fingerprint:
+                try:
+                    self._runtime = load_default_runtime()
+                except (OSError, ValueError):
+                    if self._runtime is None:
+                        raise
+                else:
+                    self._fingerprint = fingerprint
+                    self.reloads += 1
+        return self._runtime
+
+    @property
+    def checksum(self):
+        runtime = self.current()
+        return None if runtime is None else runtime.checksum
+
+
+_default_watcher = RuntimeWatcher()
+
+
+def check_ranges(X):
+    """
+    Raises if an encoded raw-unit row violates the schema (see `schema.out_of_range`).
+
+    Raises:
+        ValueError: Naming the first offending row and its bad columns.
+    """
+    bad = out_of_range(X)
+    if not bad.any():
+        return
+    row = int(bad.argmax())
+    columns = [f"{spec['name']}={value:g}" for spec, value in zip(FEATURE_SCHEMA, X[row])
+               if not spec['min'] <= value <= spec['max']
+               or (spec['kind'] != 'continuous' and value != round(value))]
+    raise ValueError(f"Profile {row} has missing or out-of-range values: {', '.join(columns)} "
+                     f"({int(bad.sum())} invalid row(s)).")
+
+
+def _predict_encoded(X, runtime):
+    """Model prediction for encoded raw-unit rows (scaling only for scaled-space runtimes)."""
+    if runtime.input_space == 'raw':
+        # Scaler already folded into the thresholds: there is no scaling stage
+        with stage('inference'):
+            return runtime.predict_raw(X)
+    with stage('scale'):
+        X_scaled = runtime.scale(X)
+    with stage('inference'):
+        return runtime.predict(X_scaled)
+
+
+def predict_batch(records, runtime=None, cache=None):
+    """
+    Predicts the annual premium for every profile in one vectorized call.
+
+    Args:
+        records: DataFrame, dict of arrays or list of dicts with `RAW_COLUMNS`.
+        runtime (InferenceRuntime | RuntimeWatcher, optional): Defaults to the
+            module's watcher over `load_default_runtime()`.
+        cache (PredictionCache, optional): Answers repeated profiles without
+            running the model; only the misses are predicted.
+
+    Returns:
+        np.ndarray[float64]: One premium per input row.
+
+    Raises:
+        ValueError: On unknown labels, or missing / out-of-range numeric values.
+    """
+    if runtime is None:
+        runtime = _default_watcher
+    if isinstance(runtime, RuntimeWatcher):
+        runtime = runtime.current()
+    if runtime is None:
+        raise FileNotFoundError("No model artifact found in 'models/'.")
+    X = encode_batch(records)
+    check_ranges(X)
+    if cache is None:
+        return _predict_encoded(X, runtime)
+    return cache.predict(X, lambda X_missing: _predict_encoded(X_missing, runtime),
+                         runtime.checksum)
+
+
+def predict_requests(requests, runtime=None, cache=None):
+    """
+    Scores several independent requests (each a list of profile dicts) with one
+    vectorized call. If the combined batch fails to encode, each request is
+    re-scored on its own so one invalid profile only fails its own request.
+
+    Args:
+        requests (list[list[dict]]): Profiles grouped by request.
+        runtime (InferenceRuntime | RuntimeWatcher, optional): See `predict_batch`.
+        cache (PredictionCache, optional): See `predict_batch`.
+
+    Returns:
+        list[tuple]: One (predictions ndarray, None) or (None, ValueError) per request.
+    """
+    records = [profile for profiles in requests for profile in profiles]
+    try:
+        predictions = predict_batch(records, runtime, cache)
+    except (KeyError, ValueError, TypeError):
+        results = []
+        for profiles in requests:
+            try:
+                results.append((predict_batch(profiles, runtime, cache), None))
+            except (KeyError, ValueError, TypeError) as e:
+                results.append((None, ValueError(str(e))))
+        return results
+    results, offset = [], 0
+    for profiles in requests:
+        results.append((predictions[offset:offset + len(profiles)], None))
+        offset += len(profiles)
+    return results
@@ -0,0 +1,459 @@
+"""
+Benchmark suite for the prediction path.
+
+Measures, for the champion forest and every alternative engine:
+    * single-profile latency (p50 / p95 / p99 / mean over many one-row calls);
+    * batch throughput (rows/s) at several batch sizes;
+    * artifact load time and the import time of the modules the engine needs;
+    * peak resident set size (RSS);
+    * refit time of the champion configuration (training regressions).
+
+Each engine runs in its own fresh interpreter so load time, import time and RSS
+are not polluted by the other engines. The import time of `app/main.py`'s
+dependencies is measured the same way, one cold interpreter per module.
+Results are written as JSON so runs on the same hardware can be compared.
+
+Engines:
+    sklearn         joblib pickles + StandardScaler (the original dashboard path)
+    compiled_npz    NumPy compiled forest from the `.npz` bundle (scaled inputs)
+    compiled_bin    memory-mapped `.bin` artifact, scaler folded (default serving path)
+    bucket_cube     exact threshold-bucket cube (`python -m src.bucket_cube`)
+    premium_table   dense premium table, one index per profile (`python -m src.premium_table`)
+
+Usage (from the repository root):
+
+    python -m src.benchmark
+    python -m src.benchmark --engines compiled_bin bucket_cube --batch-sizes 1 1000 100000
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_RESULTS_PATH = 'data/processed/benchmark_results.json'
+RESULTS_SCHEMA_VERSION = 1
+
+ENGINES = ('sklearn', 'compiled_npz', 'compiled_bin', 'bucket_cube', 'premium_table')
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1_000, 10_000, 100_000)
+DEFAULT_LATENCY_SAMPLES = 2_000
+LATENCY_WARMUP = 50
+
+# Minimum wall time and repeat count per throughput measurement
+MIN_BENCH_SECONDS = 0.25
+MIN_BENCH_REPEATS = 3
+
+APP_PATH = 'app/main.py'
+# Array stack every `src` module pulls in, timed on its own
+CORE_IMPORTS = ('numpy', 'pandas')
+# Legacy pickle stack, timed next to the dashboard's imports for comparison
+LEGACY_IMPORTS = ('joblib', 'sklearn.ensemble')
+IMPORT_REPEATS = 3
+TRAINING_REPEATS = 3
+
+
+def _peak_rss_mb():
+    """Peak RSS of the current process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# ==============================================================================
+# 1. WORKLOAD
+# ==============================================================================
+def build_workload(n_rows, seed=0):
+    """
+    Resamples real applicants from `medical_insurance_data.csv` and encodes them.
+
+    Returns:
+        tuple: (raw-unit model matrix (n_rows, 9), records DataFrame)
+    """
+    import pandas as pd
+
+    from src.batch import RAW_COLUMNS, encode_batch
+
+    data = pd.read_csv('data/medical_insurance_data.csv')[list(RAW_COLUMNS)].dropna()
+    rng = np.random.default_rng(seed)
+    records = data.iloc[rng.integers(0, len(data), n_rows)].reset_index(drop=True)
+    # Snap BMI to the dashboard's 0.1 grid so every engine, including the premium
+    # table, answers the same profiles
+    records['bmi'] = records['bmi'].round(1)
+    return encode_batch(records), records
+
+
+# ==============================================================================
+# 2. ENGINE LOADERS
+# ==============================================================================
+# Each loader returns predict(X_raw) -> np.ndarray for encoded, unscaled rows.
+def _load_sklearn():
+    import joblib
+    import pandas as pd
+
+    model = joblib.load('models/champion_random_forest.pkl')
+    scaler = joblib.load('models/scaler.pkl')
+    feature_names = list(model.feature_names_in_)
+    scaled_names = list(scaler.feature_names_in_)
+
+    def predict(X):
+        frame = pd.DataFrame(X, columns=feature_names)
+        frame[scaled_names] = scaler.transform(frame[scaled_names])
+        return model.predict(frame)
+    return predict
+
+
+def _load_compiled_npz():
+    from src.runtime import DEFAULT_BUNDLE_PATH, load_bundle
+
+    return load_bundle(DEFAULT_BUNDLE_PATH).predict_raw
+
+
+def _load_compiled_bin():
+    from src.artifact_format import DEFAULT_ARTIFACT_PATH, open_artifact
+
+    return open_artifact(DEFAULT_ARTIFACT_PATH).to_raw_space().predict_raw
+
+
+def _load_bucket_cube():
+    from src.bucket_cube import DEFAULT_CUBE_PATH, open_bucket_cube
+
+    return open_bucket_cube(DEFAULT_CUBE_PATH).predict
+
+
+def _load_premium_table():
+    from src.premium_table import (AGE_MIN, BMI_MIN, BMI_STEPS_PER_UNIT, DEFAULT_TABLE_PATH,
+                                   PremiumTable)
+
+    table = PremiumTable.open(DEFAULT_TABLE_PATH).table
+    flat = table.reshape(-1)
+
+    def predict(X):
+        # Vectorized form of PremiumTable.index for encoded rows (region one-hot -> code)
+        region = X[:, 5] * 1 + X[:, 6] * 2 + X[:, 7] * 3
+        index = np.ravel_multi_index((
+            X[:, 0].astype(np.int64) - AGE_MIN,
+            np.rint((X[:, 2] - BMI_MIN) * BMI_STEPS_PER_UNIT).astype(np.int64),
+            X[:, 1].astype(np.int64),
+            X[:, 3].astype(np.int64),
+            X[:, 4].astype(np.int64),
+            region.astype(np.int64),
+        ), table.shape)
+        return flat[index].astype(np.float64)
+    return predict
+
+
+ENGINE_LOADERS = {
+    'sklearn': _load_sklearn,
+    'compiled_npz': _load_compiled_npz,
+    'compiled_bin': _load_compiled_bin,
+    'bucket_cube': _load_bucket_cube,
+    'premium_table': _load_premium_table,
+}
+
+
+# ==============================================================================
+# 3. MEASUREMENTS (run inside the per-engine worker process)
+# ==============================================================================
+def measure_latency(predict, X, n_samples=DEFAULT_LATENCY_SAMPLES):
+    """
+    Times one-row predictions, cycling through the workload rows.
+
+    Returns:
+        dict: 'p50_us', 'p95_us', 'p99_us', 'mean_us', 'std_us' and 'samples'.
+    """
+    rows = [X[i:i + 1] for i in range(min(len(X), n_samples))]
+    for row in rows[:LATENCY_WARMUP]:
+        predict(row)
+    timings = np.empty(n_samples)
+    for i in range(n_samples):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        predict(row)
+        timings[i] = time.perf_counter() - start
+    timings *= 1e6
+    return {
+        'samples': n_samples,
+        'p50_us': float(np.percentile(timings, 50)),
+        'p95_us': float(np.percentile(timings, 95)),
+        'p99_us': float(np.percentile(timings, 99)),
+        'mean_us': float(timings.mean()),
+        'std_us': float(timings.std(ddof=1)),
+    }
+
+
+def measure_throughput(predict, X, batch_sizes=DEFAULT_BATCH_SIZES):
+    """
+    Times full-batch predictions; repeats until `MIN_BENCH_SECONDS` have elapsed.
+
+    Returns:
+        dict: batch size (str) -> {'best_seconds', 'median_seconds', 'rows_per_second',
+        'mean_rows_per_second', 'std_rows_per_second', 'repeats'}
+    """
+    results = {}
+    for size in batch_sizes:
+        batch = X[:size]
+        predict(batch)  # warm-up
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < MIN_BENCH_REPEATS or time.perf_counter() - started < MIN_BENCH_SECONDS:
+            start = time.perf_counter()
+            predict(batch)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        rates = size / np.maximum(timings, 1e-12)
+        results[str(size)] = {
+            'best_seconds': best,
+            'median_seconds': float(np.median(timings)),
+            'rows_per_second': size / best if best else None,
+            'mean_rows_per_second': float(rates.mean()),
+            'std_rows_per_second': float(rates.std(ddof=1)),
+            'repeats': len(timings),
+        }
+    return results
+
+
+def run_engine(name, batch_sizes=DEFAULT_BATCH_SIZES, latency_samples=DEFAULT_LATENCY_SAMPLES,
+               seed=0):
+    """
+    Benchmarks one engine in the current process. Intended to run in a fresh
+    interpreter (see `benchmark_engine`) so import time and RSS are isolated.
+
+    Returns:
+        dict: Engine measurements.
+    """
+    X, _ = build_workload(max(max(batch_sizes), latency_samples), seed=seed)
+    baseline_rss = _peak_rss_mb()
+
+    loaded_before = set(sys.modules)
+    start = time.perf_counter()
+    predict = ENGINE_LOADERS[name]()
+    load_seconds = time.perf_counter() - start
+
+    return {
+        'engine': name,
+        'load_seconds': load_seconds,
+        'modules_imported_by_load': len(set(sys.modules) - loaded_before),
+        'latency': measure_latency(predict, X, latency_samples),
+        'throughput': measure_throughput(predict, X, batch_sizes),
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def measure_training(repeats=TRAINING_REPEATS):
+    """
+    Times refits of the champion configuration on the golden training split.
+
+    Returns:
+        dict: 'mean_seconds', 'std_seconds', 'min_seconds' and 'repeats'.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    from src.training import load_golden_data
+
+    X_train, _, y_train, _ = load_golden_data()
+    timings = []
+    for _ in range(repeats):
+        model = RandomForestRegressor(n_estimators=100, max_depth=7, random_state=42)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings)
+    return {
+        'mean_seconds': float(timings.mean()),
+        'std_seconds': float(timings.std(ddof=1)) if repeats > 1 else 0.0,
+        'min_seconds': float(timings.min()),
+        'repeats': repeats,
+    }
+
+
+# ==============================================================================
+# 4. ORCHESTRATION (parent process)
+# ==============================================================================
+def _run_python(args, timeout=None):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    return subprocess.run([sys.executable] + args, capture_output=True, text=True,
+                          env=env, timeout=timeout)
+
+
+def benchmark_engine(name, batch_sizes, latency_samples, seed=0):
+    """
+    Runs `run_engine` in a fresh interpreter.
+
+    Returns:
+        dict: Engine measurements, or {'engine', 'error'} when the engine is unavailable.
+    """
+    proc = _run_python(['-m', 'src.benchmark', '--worker', name, '--seed', str(seed),
+                        '--latency-samples', str(latency_samples),
+                        '--batch-sizes'] + [str(b) for b in batch_sizes])
+    if proc.returncode != 0:
+        last_line = (proc.stderr.strip().splitlines() or ['unknown error'])[-1]
+        return {'engine': name, 'error': last_line}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def app_imports(path=APP_PATH):
+    """
+    Non-standard-library modules imported at the top level of the dashboard,
+    read from its source so the list follows app/main.py.
+
+    Returns:
+        tuple[str]: `CORE_IMPORTS`, the module names in import order, then
+            `LEGACY_IMPORTS`.
+    """
+    import ast
+
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    modules = [module for module in modules
+               if module.split('.')[0] not in sys.stdlib_module_names]
+    return tuple(dict.fromkeys(list(CORE_IMPORTS) + modules + list(LEGACY_IMPORTS)))
+
+
+def measure_import_times(modules=None, repeats=IMPORT_REPEATS):
+    """
+    Times `import <module>` in a cold interpreter, `repeats` times per module
+    (default: `app_imports()`).
+
+    Returns:
+        dict: module -> {'median_seconds', 'min_seconds', 'mean_seconds', 'std_seconds'}
+        or {'error'} if the module is not installed.
+    """
+    code = ("import time; t = time.perf_counter(); import {mod}; "
+            "print(time.perf_counter() - t)")
+    results = {}
+    for module in modules or app_imports():
+        timings = []
+        for _ in range(repeats):
+            proc = _run_python(['-c', code.format(mod=module)])
+            if proc.returncode != 0:
+                timings = None
+                last_line = (proc.stderr.strip().splitlines() or ['unknown error'])[-1]
+                results[module] = {'error': last_line}
+                break
+            timings.append(float(proc.stdout.strip().splitlines()[-1]))
+        if timings:
+            results[module] = {'median_seconds': float(np.median(timings)),
+                               'min_seconds': min(timings),
+                               'mean_seconds': float(np.mean(timings)),
+                               'std_seconds': float(np.std(timings, ddof=1)) if repeats > 1 else 0.0}
+    return results
+
+
+def machine_info():
+    """Hardware / interpreter description stored with every result file."""
+    return {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+
+
+def run_suite(engines=ENGINES, batch_sizes=DEFAULT_BATCH_SIZES,
+              latency_samples=DEFAULT_LATENCY_SAMPLES, seed=0, training=True, log=sys.stderr):
+    """
+    Runs the full suite.
+
+    Returns:
+        dict: JSON-serializable results ('machine', 'config', 'imports', 'engines',
+        'training').
+    """
+    results = {
+        'schema_version': RESULTS_SCHEMA_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'machine': machine_info(),
+        'config': {'batch_sizes': list(batch_sizes), 'latency_samples': latency_samples,
+                   'seed': seed, 'import_repeats': IMPORT_REPEATS},
+        'imports': {},
+        'engines': {},
+        'training': {},
+    }
+    if log is not None:
+        print("  measuring import times ...", file=log)
+    results['imports'] = measure_import_times()
+    for name in engines:
+        if log is not None:
+            print(f"  benchmarking {name} ...", file=log)
+        results['engines'][name] = benchmark_engine(name, batch_sizes, latency_samples, seed)
+    if training:
+        if log is not None:
+            print("  timing champion training ...", file=log)
+        try:
+            results['training']['champion_rf'] = measure_training()
+        except ImportError as e:
+            results['training']['champion_rf'] = {'error': str(e)}
+    return results
+
+
+def format_report(results):
+    """Human-readable summary table of a results dict."""
+    import pandas as pd
+
+    rows = []
+    for name, res in results['engines'].items():
+        if 'error' in res:
+            rows.append({'engine': name, 'status': res['error']})
+            continue
+        row = {
+            'engine': name,
+            'load_ms': round(res['load_seconds'] * 1e3, 1),
+            'p50_us': round(res['latency']['p50_us'], 1),
+            'p99_us': round(res['latency']['p99_us'], 1),
+            'peak_rss_mb': round(res['peak_rss_mb'], 1),
+        }
+        for size, stats in res['throughput'].items():
+            row[f'rows/s@{size}'] = round(stats['rows_per_second'])
+        rows.append(row)
+    imports = {mod: (round(v['median_seconds'] * 1e3, 1) if 'error' not in v else 'missing')
+               for mod, v in results['imports'].items()}
+    report = (pd.DataFrame(rows).to_string(index=False)
+              + "\n\nImport time (ms, cold interpreter):\n"
+              + pd.Series(imports).to_string())
+    for name, res in results.get('training', {}).items():
+        if 'error' not in res:
+            report += f"\n\nTraining {name}: {res['mean_seconds']:.2f}s mean over {res['repeats']} fits"
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction engines.")
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=ENGINES)
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument('--latency-samples', type=int, default=DEFAULT_LATENCY_SAMPLES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-training', action='store_true',
+                        help="Do not time the champion model refit.")
+    parser.add_argument('--output', default=DEFAULT_RESULTS_PATH)
+    parser.add_argument('--worker', choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Child process: emit one JSON line for the parent
+        print(json.dumps(run_engine(args.worker, args.batch_sizes, args.latency_samples, args.seed)))
+        return
+
+    results = run_suite(args.engines, args.batch_sizes, args.latency_samples, args.seed,
+                        training=not args.skip_training)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as fh:
+        json.dump(results, fh, indent=2)
+    print(format_report(results))
+    print(f"\n✅ Benchmark results saved to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
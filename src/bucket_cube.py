@@ -0,0 +1,320 @@
+"""
+Threshold-bucket lookup cube: exact piecewise-constant compilation of the forest.
+
+A depth-7 forest is constant between consecutive split thresholds of each
+feature. For every feature the distinct thresholds ("cuts") define buckets;
+`np.searchsorted` maps an input to its bucket, and the prediction for every
+reachable bucket combination is precomputed. Any input, including off-grid BMI
+values, is then answered by one gather from the cube, bit-for-bit equal to the
+forest (the cube is stored in float64).
+
+Reachability of the encoded feature space is used to keep the cube small:
+    * one-hot columns (region_*) form a single axis of valid patterns;
+    * integer-valued columns (age, children, Cluster_Label) merge cuts that do
+      not separate two integers.
+
+    python -m src.bucket_cube             # build from models/champion_forest.bin
+    python -m src.bucket_cube --verify    # compare against the forest
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from src.artifact_format import DEFAULT_ARTIFACT_PATH, open_artifact, read_header
+from src.forest_engine import CompiledForest
+
+DEFAULT_CUBE_PATH = 'models/bucket_cube.npy'
+
+# Encoded layout: [age, sex, bmi, children, smoker, region_nw, region_se, region_sw, Cluster_Label]
+ONE_HOT_GROUPS = ((5, 6, 7),)
+INTEGER_FEATURES = (0, 3, 8)
+
+BUILD_BATCH_CELLS = 1 << 18
+
+
+def _sidecar_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+# ==============================================================================
+# 1. BUCKET CUBE
+# ==============================================================================
+class BucketCube:
+    """
+    Piecewise-constant lookup table equivalent to a `CompiledForest`.
+
+    Attributes:
+        cuts (list[np.ndarray]): Sorted distinct thresholds per feature.
+        axes (list[tuple[int]]): Features covered by each cube axis, in axis order.
+        patterns (list[np.ndarray | None]): For one-hot axes, the reachable
+            per-feature bucket patterns (n_patterns x n_group_features).
+        integer_features (tuple[int]): Features whose inputs must be integral.
+        float32_inputs (bool): Inputs are cast to float32 before bucketing.
+        cube (np.ndarray[float64]): Precomputed predictions, one dimension per axis.
+        model_checksum (str): Checksum of the artifact the cube was compiled from.
+    """
+
+    def __init__(self, cuts, axes, patterns, integer_features, float32_inputs,
+                 cube=None, model_checksum=None):
+        self.cuts = [np.asarray(c, dtype=np.float64) for c in cuts]
+        self.axes = [tuple(a) for a in axes]
+        self.patterns = [None if p is None else np.asarray(p, dtype=np.int64) for p in patterns]
+        self.integer_features = tuple(integer_features)
+        self.float32_inputs = bool(float32_inputs)
+        self.cube = cube
+        self.model_checksum = model_checksum
+
+        # Mixed-radix code of a one-hot group's bucket values -> axis position (-1 unreachable)
+        self._pattern_lookup = []
+        for features, pattern in zip(self.axes, self.patterns):
+            if pattern is None:
+                self._pattern_lookup.append(None)
+                continue
+            radix = [self.n_buckets(f) for f in features]
+            lookup = np.full(int(np.prod(radix)), -1, dtype=np.int64)
+            lookup[np.ravel_multi_index(pattern.T, radix)] = np.arange(pattern.shape[0])
+            self._pattern_lookup.append((radix, lookup))
+
+    def n_buckets(self, feature):
+        return int(self.cuts[feature].shape[0]) + 1
+
+    @property
+    def shape(self):
+        return tuple(self.n_buckets(a[0]) if p is None else p.shape[0]
+                     for a, p in zip(self.axes, self.patterns))
+
+    def bucketize(self, X):
+        """
+        Maps each input value to its bucket (number of cuts strictly below it).
+
+        Returns:
+            tuple: (bucket matrix int64 (n_rows, n_features), valid mask (n_rows,))
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.float32_inputs:
+            X = X.astype(np.float32).astype(np.float64)
+        buckets = np.empty(X.shape, dtype=np.int64)
+        for f, cuts in enumerate(self.cuts):
+            buckets[:, f] = np.searchsorted(cuts, X[:, f], side='left')
+        valid = np.ones(X.shape[0], dtype=bool)
+        for f in self.integer_features:
+            valid &= X[:, f] == np.floor(X[:, f])
+        return buckets, valid
+
+    def cell_index(self, X):
+        """
+        Flat cube cell of each row; usable directly as a cache key.
+
+        Returns:
+            np.ndarray[int64]: Cell index per row, -1 where the row is unreachable
+            (invalid one-hot pattern or non-integral integer feature).
+        """
+        buckets, valid = self.bucketize(X)
+        coords = []
+        for features, lookup in zip(self.axes, self._pattern_lookup):
+            if lookup is None:
+                coords.append(buckets[:, features[0]])
+                continue
+            radix, table = lookup
+            code = np.ravel_multi_index(buckets[:, list(features)].T, radix)
+            coords.append(table[code])
+        coords = np.stack(coords)
+        valid &= (coords >= 0).all(axis=0)
+        cells = np.ravel_multi_index(np.where(valid, coords, 0), self.shape)
+        return np.where(valid, cells, -1)
+
+    def bucket_tuple(self, x):
+        """Hashable per-axis bucket coordinates of a single encoded profile (or None)."""
+        cell = int(self.cell_index(x)[0])
+        return None if cell < 0 else tuple(int(i) for i in np.unravel_index(cell, self.shape))
+
+    def predict(self, X):
+        """
+        One gather per row.
+
+        Raises:
+            ValueError: If any row falls outside the reachable encoded space.
+        """
+        cells = self.cell_index(X)
+        if np.any(cells < 0):
+            raise ValueError("Input contains profiles outside the cube's reachable space.")
+        return self.cube.reshape(-1)[cells]
+
+
+# ==============================================================================
+# 2. COMPILER
+# ==============================================================================
+def compile_cube(forest, one_hot_groups=ONE_HOT_GROUPS, integer_features=INTEGER_FEATURES):
+    """
+    Collects the cuts of every feature and builds an empty `BucketCube` layout,
+    plus a bucket-space copy of the forest used to fill it.
+
+    Returns:
+        tuple: (BucketCube without values, CompiledForest over bucket indices)
+    """
+    if forest.float32_inputs and integer_features:
+        raise ValueError("Integer bucket merging requires a raw-space forest (see to_raw_space).")
+
+    split = np.isfinite(forest.threshold)
+    cuts = []
+    for f in range(forest.n_features):
+        values = forest.threshold[split & (forest.feature == f)]
+        if f in integer_features:
+            # For integral x: x <= t  <=>  x <= floor(t)
+            values = np.floor(values)
+        cuts.append(np.unique(values))
+
+    grouped = {f for group in one_hot_groups for f in group}
+    axes = [(f,) for f in range(forest.n_features) if f not in grouped]
+    patterns = [None] * len(axes)
+    for group in one_hot_groups:
+        # Reachable encodings: the dropped baseline (all zeros) and each single 1
+        encodings = np.vstack([np.zeros(len(group)), np.eye(len(group))])
+        bucket_rows = np.stack(
+            [np.searchsorted(cuts[f], encodings[:, i], side='left') for i, f in enumerate(group)],
+            axis=1,
+        )
+        axes.append(tuple(group))
+        patterns.append(np.unique(bucket_rows, axis=0))
+
+    cube = BucketCube(cuts, axes, patterns, integer_features, forest.float32_inputs)
+
+    # Bucket-space forest: x <= cut_j  <=>  bucket(x) <= j
+    rank_threshold = np.full(forest.n_nodes, np.inf)
+    nodes = np.flatnonzero(split)
+    for f in range(forest.n_features):
+        on_f = nodes[forest.feature[nodes] == f]
+        t = forest.threshold[on_f]
+        if f in integer_features:
+            t = np.floor(t)
+        rank_threshold[on_f] = np.searchsorted(cuts[f], t, side='left')
+
+    bucket_forest = CompiledForest(
+        feature=forest.feature, threshold=rank_threshold, left=forest.left,
+        right=forest.right, value=forest.value, roots=forest.roots,
+        max_depth=forest.max_depth, n_features=forest.n_features,
+        float32_inputs=False, metadata=dict(forest.metadata, input_space='buckets'),
+    )
+    return cube, bucket_forest
+
+
+def build_bucket_cube(runtime, path=DEFAULT_CUBE_PATH):
+    """
+    Compiles `runtime`'s forest into a cube and writes it as `.npy` + `.json` sidecar.
+
+    Returns:
+        BucketCube: The cube, memory-mapped from `path`.
+    """
+    cube, bucket_forest = compile_cube(runtime.forest)
+    shape = cube.shape
+    values = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=shape)
+    flat = values.reshape(-1)
+
+    for start in range(0, flat.shape[0], BUILD_BATCH_CELLS):
+        cells = np.arange(start, min(start + BUILD_BATCH_CELLS, flat.shape[0]))
+        coords = np.unravel_index(cells, shape)
+        buckets = np.empty((cells.shape[0], runtime.forest.n_features), dtype=np.float64)
+        for axis, (features, pattern) in enumerate(zip(cube.axes, cube.patterns)):
+            if pattern is None:
+                buckets[:, features[0]] = coords[axis]
+            else:
+                buckets[:, list(features)] = pattern[coords[axis]]
+        flat[start:start + cells.shape[0]] = bucket_forest.predict(buckets)
+    values.flush()
+    del values, flat
+
+    meta = {
+        'cuts': [c.tolist() for c in cube.cuts],
+        'axes': [list(a) for a in cube.axes],
+        'patterns': [None if p is None else p.tolist() for p in cube.patterns],
+        'integer_features': list(cube.integer_features),
+        'float32_inputs': cube.float32_inputs,
+        'shape': list(shape),
+        'model_checksum': runtime.checksum,
+    }
+    with open(_sidecar_path(path), 'w') as fh:
+        json.dump(meta, fh)
+    return open_bucket_cube(path, artifact_path=None)
+
+
+def open_bucket_cube(path=DEFAULT_CUBE_PATH, artifact_path=DEFAULT_ARTIFACT_PATH):
+    """
+    Memory-maps a cube written by `build_bucket_cube`.
+
+    The cube is gitignored and never rebuilt on its own, so it is checked
+    against the current model: its recorded checksum must equal the payload
+    checksum in the header of `artifact_path` (only the header is read).
+
+    Args:
+        path (str): Cube `.npy` file.
+        artifact_path (str | None): Artifact the cube must match (None skips
+            the check, e.g. for a cube compiled from another runtime).
+
+    Raises:
+        ValueError: If the cube does not match its sidecar, or was compiled
+            from another model than the artifact (rebuild it).
+    """
+    with open(_sidecar_path(path)) as fh:
+        meta = json.load(fh)
+    cube = BucketCube(
+        cuts=meta['cuts'], axes=meta['axes'], patterns=meta['patterns'],
+        integer_features=meta['integer_features'], float32_inputs=meta['float32_inputs'],
+        cube=np.load(path, mmap_mode='r'), model_checksum=meta['model_checksum'],
+    )
+    if tuple(cube.cube.shape) != cube.shape:
+        raise ValueError(f"Bucket cube {path} does not match its sidecar metadata.")
+    if artifact_path is not None and os.path.exists(artifact_path):
+        checksum = read_header(artifact_path)[0]['payload_sha256']
+        if cube.model_checksum != checksum:
+            raise ValueError(f"Bucket cube {path} was compiled from another model than "
+                             f"'{artifact_path}'; rebuild it with `python -m src.bucket_cube`.")
+    return cube
+
+
+# ==============================================================================
+# 3. COMMAND-LINE ENTRY POINT
+# ==============================================================================
+def verify_cube(cube, runtime, n_rows=200_000, seed=7):
+    """
+    Compares cube lookups with the forest on random profiles with continuous BMI.
+
+    Returns:
+        bool: True when every prediction is identical.
+    """
+    from src.raw_space import sample_raw_profiles
+
+    X = sample_raw_profiles(n_rows, seed=seed)
+    X[:, 2] = np.random.default_rng(seed).uniform(10.0, 60.0, n_rows)  # off-grid BMI
+    expected = runtime.predict_raw(X)
+    actual = cube.predict(X)
+    exact = bool(np.array_equal(expected, actual))
+    print(f"Profiles compared: {n_rows} | Exact match: {'YES' if exact else 'NO'}")
+    return exact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the threshold-bucket cube.")
+    parser.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH)
+    parser.add_argument('--output', default=DEFAULT_CUBE_PATH)
+    parser.add_argument('--verify', action='store_true')
+    args = parser.parse_args()
+
+    runtime = open_artifact(args.artifact).to_raw_space()
+    if args.verify:
+        raise SystemExit(0 if verify_cube(open_bucket_cube(args.output, args.artifact), runtime)
+                         else 1)
+
+    start = time.perf_counter()
+    cube = build_bucket_cube(runtime, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Bucket cube saved to '{args.output}' "
+          f"(shape {cube.shape}, {cube.cube.nbytes / 1e6:.1f} MB, {elapsed:.1f}s).")
+
+
+if __name__ == '__main__':
+    main()
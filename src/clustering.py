@@ -0,0 +1,310 @@
+"""
+Clustering stage of the feature pipeline: the `Cluster_Label` feature.
+
+The notebook (03_data_preprocessing.ipynb) fits `KMeans(n_clusters=3,
+n_init=10)` on (age, bmi, charges) over the whole frame: ten full Lloyd runs,
+each touching every row per iteration. Three fitting modes are provided:
+
+    full      - the notebook's KMeans, unchanged (reproduces models/kmeans_model.pkl);
+    minibatch - `MiniBatchKMeans` over the in-memory points: each step updates
+                the centroids from one random batch of rows;
+    streaming - `MiniBatchKMeans.partial_fit` over batches cut from chunks of
+                any size, so the points never have to be in memory together
+                (`fit_streaming(iter_cluster_points(path))`).
+
+KMeans numbers its clusters arbitrarily, while the trained models (and the
+serving heuristic: smokers -> 2, others -> 1) depend on the numbering of the
+committed artifact. `align_centers` therefore reorders new centroids to the
+reference ones before they are used.
+
+`nearest_centroid` is the labelling kernel for new rows: one matrix product per
+block of rows, with no (n, k, d) distance tensor and no scikit-learn import.
+
+Usage (from the repository root):
+
+    python -m src.clustering                        # fit time / agreement vs the artifact
+    python -m src.clustering --rows 1000000 --batch-size 4096
+"""
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+# Notebook KMeans settings (03_data_preprocessing.ipynb)
+N_CLUSTERS = 3
+KMEANS_RANDOM_STATE = 42
+KMEANS_N_INIT = 10
+CLUSTER_MODES = ('full', 'minibatch', 'streaming')
+DEFAULT_BATCH_SIZE = 1024
+DEFAULT_KMEANS_PATH = 'models/kmeans_model.pkl'
+ASSIGN_BLOCK_ROWS = 8192
+
+
+# ==============================================================================
+# 1. ASSIGNMENT KERNEL
+# ==============================================================================
+def nearest_centroid(points, centers, out=None, block_rows=ASSIGN_BLOCK_ROWS):
+    """
+    Index of the nearest centroid (squared Euclidean distance) for each row.
+
+    ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2 and the first term is the same for
+    every centroid, so the argmin of ||c||^2 / 2 - x.c is taken instead (the
+    expansion KMeans.predict uses). Rows are processed in blocks through one
+    (block_rows, k) buffer, so memory stays flat whatever the batch size.
+
+    Args:
+        points (np.ndarray): Shape (n, d).
+        centers (np.ndarray): Shape (k, d).
+        out (np.ndarray, optional): Preallocated int64 buffer of shape (n,).
+
+    Returns:
+        np.ndarray[int64]: The filled buffer.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    centers = np.asarray(centers, dtype=np.float64)
+    if out is None:
+        out = np.empty(points.shape[0], dtype=np.int64)
+    half_norms = 0.5 * np.einsum('ij,ij->i', centers, centers)
+    buffer = np.empty((min(block_rows, points.shape[0]), centers.shape[0]))
+    for start in range(0, points.shape[0], block_rows):
+        block = points[start:start + block_rows]
+        scores = buffer[:block.shape[0]]
+        np.matmul(block, centers.T, out=scores)
+        np.subtract(half_norms, scores, out=scores)
+        out[start:start + block.shape[0]] = scores.argmin(axis=1)
+    return out
+
+
+def align_centers(centers, reference):
+    """
+    Reorders `centers` so that cluster i lies closest to `reference[i]`.
+
+    Tries every permutation (3! = 6 for the notebook's k) and keeps the one
+    with the smallest total squared distance to the reference centroids.
+
+    Returns:
+        tuple: (reordered centers, permutation) with
+            `reordered[i] = centers[permutation[i]]`.
+    """
+    centers = np.asarray(centers, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)
+    if centers.shape != reference.shape:
+        raise ValueError(f"Cannot align centers of shape {centers.shape} "
+                         f"to a reference of shape {reference.shape}.")
+    cost = ((centers[:, None, :] - reference[None, :, :]) ** 2).sum(axis=2)
+    best = min(itertools.permutations(range(len(centers))),
+               key=lambda perm: sum(cost[perm[i], i] for i in range(len(perm))))
+    permutation = np.array(best)
+    return centers[permutation], permutation
+
+
+# ==============================================================================
+# 2. FITTING MODES
+# ==============================================================================
+def fit_full(points, sample_weight=None):
+    """The notebook's KMeans. Returns the fitted estimator."""
+    from sklearn.cluster import KMeans
+
+    kmeans = KMeans(n_clusters=N_CLUSTERS, random_state=KMEANS_RANDOM_STATE, n_init=KMEANS_N_INIT)
+    return kmeans.fit(points, sample_weight=sample_weight)
+
+
+def fit_minibatch(points, sample_weight=None, batch_size=DEFAULT_BATCH_SIZE):
+    """In-memory `MiniBatchKMeans`. Returns the fitted estimator."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    kmeans = MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=KMEANS_RANDOM_STATE,
+                             batch_size=batch_size, n_init=3)
+    return kmeans.fit(points, sample_weight=sample_weight)
+
+
+def fit_streaming(chunks, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Mini-batch k-means over a stream of point chunks.
+
+    Each chunk is cut into batches of `batch_size` rows, and each batch is one
+    `partial_fit` step; the first batch seeds the centroids (k-means++). Only
+    one chunk is held at a time.
+
+    Args:
+        chunks: Iterable of (n_i, 3) arrays, or of (points, sample_weight) tuples.
+        batch_size (int): Rows per update step.
+
+    Returns:
+        MiniBatchKMeans: The fitted estimator (`labels_` is not computed).
+
+    Raises:
+        ValueError: If the stream is empty.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    kmeans = MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=KMEANS_RANDOM_STATE,
+                             batch_size=batch_size, compute_labels=False)
+    n_rows = 0
+    for chunk in chunks:
+        points, weights = chunk if isinstance(chunk, tuple) else (chunk, None)
+        for start in range(0, len(points), batch_size):
+            stop = start + batch_size
+            kmeans.partial_fit(points[start:stop],
+                               sample_weight=None if weights is None else weights[start:stop])
+        n_rows += len(points)
+    if n_rows == 0:
+        raise ValueError("Cannot fit clusters on an empty stream.")
+    return kmeans
+
+
+def iter_cluster_points(path, chunksize=100_000, stop=None):
+    """
+    Yields the (age, bmi, charges) points of a raw CSV chunk by chunk.
+
+    Rows are cleaned and range-checked as in `src.streaming_preprocessing`;
+    `stop` limits the read to the first bytes of the file.
+    """
+    from src.preprocessing import TARGET
+    from src.streaming_preprocessing import iter_clean_chunks
+
+    for _, chunk in iter_clean_chunks(path, chunksize, stop=stop):
+        yield np.column_stack([chunk['age'].to_numpy(np.float64), chunk['bmi'].to_numpy(np.float64),
+                               chunk[TARGET].to_numpy(np.float64)])
+
+
+def fit_centers(points=None, mode='full', sample_weight=None, batch_size=DEFAULT_BATCH_SIZE,
+                reference=None):
+    """
+    Fits the cluster centroids in one of `CLUSTER_MODES`.
+
+    Args:
+        points: (n, 3) array; for 'streaming' also an iterable of chunks
+            (see `fit_streaming`).
+        reference (np.ndarray, optional): Centroids whose numbering the result
+            must follow (see `align_centers`).
+
+    Returns:
+        np.ndarray: Centroids of shape (N_CLUSTERS, 3).
+    """
+    if mode == 'full':
+        kmeans = fit_full(points, sample_weight)
+    elif mode == 'minibatch':
+        kmeans = fit_minibatch(points, sample_weight, batch_size)
+    elif mode == 'streaming':
+        if isinstance(points, np.ndarray):
+            points = [points if sample_weight is None else (points, np.asarray(sample_weight))]
+        kmeans = fit_streaming(points, batch_size)
+    else:
+        raise ValueError(f"Unknown cluster mode {mode!r}; choose one of {CLUSTER_MODES}.")
+    centers = kmeans.cluster_centers_
+    if reference is not None:
+        centers, _ = align_centers(centers, reference)
+    return centers
+
+
+# ==============================================================================
+# 3. BENCHMARK
+# ==============================================================================
+def load_points(n_rows=None, seed=0):
+    """
+    (age, bmi, charges) of the clean raw data, optionally resampled with
+    replacement to `n_rows` rows to emulate a larger book.
+    """
+    from src.preprocessing import TARGET, load_clean
+
+    clean = load_clean()
+    points = clean[['age', 'bmi', TARGET]].to_numpy(dtype=np.float64)
+    if n_rows is not None and n_rows != len(points):
+        points = points[np.random.default_rng(seed).integers(0, len(points), n_rows)]
+    return points
+
+
+def run_benchmark(points, reference, batch_size=DEFAULT_BATCH_SIZE, chunksize=100_000,
+                  modes=CLUSTER_MODES):
+    """
+    Fits each mode on `points` and compares it with the reference centroids.
+
+    Agreement is the share of rows given the same label as the reference after
+    alignment; the adjusted Rand index measures the same without alignment.
+
+    Returns:
+        list[dict]: One row per mode with 'mode', 'fit_seconds', 'agreement',
+            'adjusted_rand' and 'max_center_shift' (largest centroid distance).
+    """
+    from sklearn.metrics import adjusted_rand_score
+
+    expected = nearest_centroid(points, reference)
+    rows = []
+    for mode in modes:
+        data = (points[i:i + chunksize] for i in range(0, len(points), chunksize)) \
+            if mode == 'streaming' else points
+        start = time.perf_counter()
+        centers = fit_centers(data, mode, batch_size=batch_size, reference=reference)
+        seconds = time.perf_counter() - start
+        labels = nearest_centroid(points, centers)
+        rows.append({
+            'mode': mode,
+            'fit_seconds': seconds,
+            'agreement': float((labels == expected).mean()),
+            'adjusted_rand': float(adjusted_rand_score(expected, labels)),
+            'max_center_shift': float(np.sqrt(((centers - reference) ** 2).sum(axis=1)).max()),
+        })
+    return rows
+
+
+def time_assignment(points, kmeans, repeats=5):
+    """
+    Best-of-`repeats` seconds of `nearest_centroid`, of the broadcast
+    (n, k, d) distance tensor it replaces in `FeaturePipeline.assign_clusters`,
+    and of `kmeans.predict`; plus whether the kernel's labels equal predict's.
+    """
+    centers = kmeans.cluster_centers_
+    labels = np.empty(points.shape[0], dtype=np.int64)
+    candidates = {
+        'kernel': lambda: nearest_centroid(points, centers, out=labels),
+        'broadcast': lambda: ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        .argmin(axis=1),
+        'sklearn': lambda: kmeans.predict(points),
+    }
+    result = {}
+    for name, run in candidates.items():
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        result[f'{name}_seconds'] = min(timings)
+    result['identical'] = bool(np.array_equal(labels, kmeans.predict(points)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the clustering modes against "
+                                                 "models/kmeans_model.pkl.")
+    parser.add_argument('--rows', type=int, default=None,
+                        help="Resample the clean data to this many rows (default: as is).")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--chunksize', type=int, default=100_000,
+                        help="Rows per chunk in streaming mode.")
+    parser.add_argument('--modes', nargs='+', default=list(CLUSTER_MODES), choices=CLUSTER_MODES)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import joblib
+
+    artifact = joblib.load(DEFAULT_KMEANS_PATH)
+    points = load_points(args.rows, args.seed)
+    print(f"{len(points):,} points, batch size {args.batch_size:,}, "
+          f"reference '{DEFAULT_KMEANS_PATH}'\n")
+    print(f"{'mode':<10} {'fit (s)':>9} {'agreement':>10} {'ARI':>7} {'max shift':>10}")
+    for row in run_benchmark(points, artifact.cluster_centers_, args.batch_size, args.chunksize,
+                             args.modes):
+        print(f"{row['mode']:<10} {row['fit_seconds']:>9.3f} {row['agreement']:>10.2%} "
+              f"{row['adjusted_rand']:>7.3f} {row['max_center_shift']:>10.1f}")
+
+    timing = time_assignment(points, artifact)
+    print(f"\nAssignment of {len(points):,} rows: kernel {timing['kernel_seconds'] * 1e3:.2f} ms, "
+          f"broadcast {timing['broadcast_seconds'] * 1e3:.2f} ms, KMeans.predict {timing['sklearn_seconds'] * 1e3:.2f} ms, "
+          f"identical labels={timing['identical']}")
+    print("\n✅ Clustering benchmark complete.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+In-process request coalescing for the Streamlit dashboard.
+
+Streamlit runs each browser session's script in its own thread, so concurrent
+form submits would otherwise each pay the full per-call overhead of the forest.
+`PredictionCoalescer` owns one dispatcher thread: sessions enqueue single
+profiles and block on a future; the dispatcher waits at most `max_wait_ms` for
+other sessions to join, predicts everything pending as one matrix and resolves
+each session's future. The dashboard shares one instance via `st.cache_resource`.
+
+    coalescer = PredictionCoalescer(runtime)
+    premium = coalescer.predict({'age': 35, 'sex': 'Male', 'bmi': 30.0, 'children': 0,
+                                 'smoker': False, 'region': 'Southeast'})
+
+    python -m src.coalescing --benchmark --sessions 200   # vs one predict per session
+"""
+import argparse
+import concurrent.futures
+import queue
+import threading
+import time
+
+import numpy as np
+
+from src.batch import load_default_runtime, predict_batch, predict_requests
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT_MS = 3.0
+DEFAULT_TIMEOUT_SECONDS = 10.0
+
+
+# ==============================================================================
+# 1. DISPATCHER
+# ==============================================================================
+class PredictionCoalescer:
+    """
+    Thread-safe batching dispatcher shared by all sessions of a process.
+
+    Args:
+        runtime (InferenceRuntime | RuntimeWatcher): Model runtime used for every
+            batch; a watcher follows artifact replacements.
+        max_batch (int): Upper bound on rows per predict call.
+        max_wait_ms (float): How long the first pending request waits for company.
+        cache (PredictionCache, optional): Answers repeated profiles without the model.
+
+    Attributes:
+        batches / rows (int): Dispatched batches and rows (mean batch = rows / batches).
+    """
+
+    def __init__(self, runtime, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 cache=None):
+        self.runtime = runtime
+        self.cache = cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='prediction-coalescer', daemon=True)
+        self._thread.start()
+
+    def submit(self, profile):
+        """
+        Queues one raw profile (dict of scalars).
+
+        Returns:
+            concurrent.futures.Future: Resolves to the premium (float).
+        """
+        if self._closed.is_set():
+            raise RuntimeError("PredictionCoalescer is closed.")
+        future = concurrent.futures.Future()
+        self._queue.put((profile, future))
+        return future
+
+    def predict(self, profile, timeout=DEFAULT_TIMEOUT_SECONDS):
+        """
+        Blocking form of `submit`, as used by a Streamlit session.
+
+        Raises:
+            ValueError: If the profile has a missing field or an unknown label.
+        """
+        return self.submit(profile).result(timeout)
+
+    def close(self):
+        """Stops the dispatcher after the pending requests have been served."""
+        self._closed.set()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is None:
+            return []
+        items = [item]
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else \
+                    self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Close requested: serve what is pending, then stop
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            if not items:
+                return
+            try:
+                results = predict_requests([[profile] for profile, _ in items], self.runtime,
+                                           self.cache)
+            except Exception as e:  # e.g. a missing model: fail the waiting sessions, keep serving
+                results = [(None, e)] * len(items)
+            self.batches += 1
+            self.rows += len(items)
+            for (_, future), (predictions, error) in zip(items, results):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(float(predictions[0]))
+
+
+# ==============================================================================
+# 2. BENCHMARK: CONCURRENT SESSIONS, COALESCED VS ONE PREDICT PER SESSION
+# ==============================================================================
+def _drive_sessions(predict_one, profiles, sessions, requests_per_session):
+    """Runs `sessions` threads, each submitting its requests one after another."""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(offset):
+        own = []
+        barrier.wait()
+        for i in range(requests_per_session):
+            start = time.perf_counter()
+            predict_one(profiles[(offset + i) % len(profiles)])
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=session, args=(s * requests_per_session,))
+               for s in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.asarray(latencies) * 1e3
+    return {
+        'requests_per_second': round(len(latencies) / elapsed),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def benchmark(runtime, sessions=200, requests_per_session=20, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """
+    Returns:
+        list[dict]: One row for direct per-session predicts, one for the coalescer.
+    """
+    from src.benchmark import build_workload
+
+    _, records = build_workload(sessions * requests_per_session)
+    profiles = records.to_dict(orient='records')
+
+    def direct(profile):
+        return float(predict_batch({col: [value] for col, value in profile.items()}, runtime)[0])
+
+    rows = [dict(mode='one predict per session', **_drive_sessions(
+        direct, profiles, sessions, requests_per_session))]
+    coalescer = PredictionCoalescer(runtime, max_wait_ms=max_wait_ms)
+    try:
+        result = _drive_sessions(coalescer.predict, profiles, sessions, requests_per_session)
+    finally:
+        coalescer.close()
+    rows.append(dict(mode='coalesced', mean_batch_rows=round(coalescer.rows / coalescer.batches, 1),
+                     **result))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-session prediction coalescing.")
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=20, help="Requests per session.")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    args = parser.parse_args()
+    if not args.benchmark:
+        parser.error("the dispatcher is used from app/main.py; only --benchmark runs standalone")
+
+    import pandas as pd
+
+    runtime = load_default_runtime()
+    if runtime is None:
+        raise SystemExit("No model artifact found in 'models/'.")
+    rows = benchmark(runtime, args.sessions, args.requests, args.max_wait_ms)
+    print(pd.DataFrame(rows).to_string(index=False))
+    speedup = rows[1]['requests_per_second'] / rows[0]['requests_per_second']
+    print(f"\n✅ Coalescing throughput: {speedup:.1f}x with {args.sessions} concurrent sessions.")
+
+
+if __name__ == '__main__':
+    main()
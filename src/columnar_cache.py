@@ -0,0 +1,411 @@
+"""
+Typed, memory-mapped columnar cache of the preprocessed train/test splits.
+
+Layout of a cache directory (one per pipeline, e.g. golden / weighted):
+
+    manifest.json            format version, source fingerprint, per-split schema
+    train/<column>.npy       one typed 1-D array per feature column
+    train/__target__.npy     y (charges)
+    train/__weight__.npy     sample weights (weighted pipeline only)
+    test/...
+
+Opening a split reads the small JSON manifest and maps each `.npy` with
+`np.load(mmap_mode='r')`: no text parsing, and the cost of the open does not
+depend on the row count. Columns are materialized only when a matrix or frame
+is requested. The manifest records the size and mtime of the raw CSV the split
+was built from, so a cache older than its source is detected without hashing.
+
+Usage (from the repository root):
+
+    python -m src.preprocessing --cache            # build data/processed/cache/golden
+    python -m src.columnar_cache --info golden     # print the manifest summary
+
+Caches without sample weights can also grow in place (`CacheAppender`, used by
+`src.ingest` for newly appended raw rows).
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+
+import numpy as np
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_ROOT = 'data/processed/cache'
+MANIFEST_NAME = 'manifest.json'
+TARGET_FILE = '__target__'
+WEIGHT_FILE = '__weight__'
+SPLITS = ('train', 'test')
+
+
+def cache_dir(name, root=DEFAULT_CACHE_ROOT):
+    """Directory of the named cache ('golden', 'weighted')."""
+    return os.path.join(root, name)
+
+
+def source_fingerprint(path):
+    """Size and mtime of a source file: a constant-time staleness check."""
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+# ==============================================================================
+# 1. WRITER
+# ==============================================================================
+def write_cache(directory, splits, source_path=None):
+    """
+    Writes train/test splits as one `.npy` per column plus a manifest.
+
+    Args:
+        directory (str): Cache directory (replaced atomically on success).
+        splits (dict): split name -> dict with 'X' (DataFrame), 'y' and
+            optionally 'w' (array-likes of the same length).
+        source_path (str, optional): Raw file the splits were derived from.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    tmp_dir = directory.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    manifest = {
+        'format_version': CACHE_FORMAT_VERSION,
+        'source': source_fingerprint(source_path) if source_path else None,
+        'splits': {},
+    }
+    for split, parts in splits.items():
+        os.makedirs(os.path.join(tmp_dir, split))
+        X = parts['X']
+        columns = []
+        for name in X.columns:
+            values = np.ascontiguousarray(X[name].to_numpy())
+            np.save(os.path.join(tmp_dir, split, f'{name}.npy'), values)
+            columns.append({'name': name, 'dtype': values.dtype.str})
+        entry = {'n_rows': len(X), 'columns': columns}
+        for key, file in (('y', TARGET_FILE), ('w', WEIGHT_FILE)):
+            if parts.get(key) is None:
+                continue
+            values = np.ascontiguousarray(np.asarray(parts[key]))
+            if values.shape != (len(X),):
+                raise ValueError(f"'{key}' of split '{split}' has shape {values.shape}, "
+                                 f"expected ({len(X)},).")
+            np.save(os.path.join(tmp_dir, split, f'{file}.npy'), values)
+            entry['target' if key == 'y' else 'weight'] = {'dtype': values.dtype.str}
+        manifest['splits'][split] = entry
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return manifest
+
+
+class CacheWriter:
+    """
+    Streaming counterpart of `write_cache` for splits whose row counts are
+    known up front: each column file gets its final `.npy` header on open and
+    chunks are appended to it sequentially, so memory stays bounded by the
+    chunk, not by the split.
+
+    Args:
+        directory (str): Cache directory (replaced atomically by `close`).
+        split_rows (dict): split name -> number of rows.
+        columns (list[tuple]): (name, dtype) of each feature column, in order.
+        source_path (str, optional): Raw file the splits are derived from.
+        target_dtype: dtype of the target column.
+    """
+
+    def __init__(self, directory, split_rows, columns, source_path=None,
+                 target_dtype=np.float64):
+        self.directory = directory
+        self.source_path = source_path
+        self.tmp_dir = directory.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self.target_dtype = np.dtype(target_dtype)
+        self.split_rows = dict(split_rows)
+        self._offsets = dict.fromkeys(split_rows, 0)
+        self._files = {}
+        for split, n_rows in self.split_rows.items():
+            os.makedirs(os.path.join(self.tmp_dir, split))
+            files = self.columns + [(TARGET_FILE, self.target_dtype)]
+            self._files[split] = [self._open(split, name, dtype, n_rows) for name, dtype in files]
+
+    def _open(self, split, name, dtype, n_rows):
+        fh = open(os.path.join(self.tmp_dir, split, f'{name}.npy'), 'wb')
+        _write_npy_header(fh, dtype, n_rows)
+        return fh, dtype
+
+    def append(self, split, X, y):
+        """
+        Appends rows to a split.
+
+        Args:
+            X (np.ndarray): Feature rows of shape (k, n_columns), in column order.
+            y (np.ndarray): Target values, shape (k,).
+
+        Raises:
+            ValueError: If the split would exceed its declared row count.
+        """
+        start = self._offsets[split]
+        stop = start + len(X)
+        if stop > self.split_rows[split]:
+            raise ValueError(f"Split '{split}' was declared with {self.split_rows[split]} rows.")
+        files = self._files[split]
+        for j, (fh, dtype) in enumerate(files[:-1]):
+            fh.write(np.ascontiguousarray(X[:, j], dtype=dtype).tobytes())
+        fh, dtype = files[-1]
+        fh.write(np.ascontiguousarray(y, dtype=dtype).tobytes())
+        self._offsets[split] = stop
+
+    def close(self):
+        """
+        Closes the column files, writes the manifest and publishes the directory.
+
+        Returns:
+            dict: The manifest that was written.
+
+        Raises:
+            ValueError: If a split received fewer rows than declared.
+        """
+        for split, n_rows in self.split_rows.items():
+            if self._offsets[split] != n_rows:
+                raise ValueError(f"Split '{split}' received {self._offsets[split]} of "
+                                 f"{n_rows} declared rows.")
+            for fh, _ in self._files[split]:
+                fh.close()
+        self._files = {}
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'source': source_fingerprint(self.source_path) if self.source_path else None,
+            'splits': {split: {
+                'n_rows': n_rows,
+                'columns': [{'name': name, 'dtype': dtype.str} for name, dtype in self.columns],
+                'target': {'dtype': self.target_dtype.str},
+            } for split, n_rows in self.split_rows.items()},
+        }
+        with open(os.path.join(self.tmp_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self.tmp_dir, self.directory)
+        return manifest
+
+
+def write_manifest(directory, manifest):
+    """Replaces the manifest of a cache directory atomically."""
+    tmp_path = os.path.join(directory, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+
+
+def _write_npy_header(fh, dtype, n_rows):
+    np.lib.format.write_array_header_1_0(
+        fh, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+             'shape': (n_rows,)})
+
+
+class CacheAppender:
+    """
+    Appends rows to the splits of an existing cache in place.
+
+    Each column file is cut back to the row count of the manifest (discarding
+    the tail of an interrupted append), rows are written after it, and `close`
+    rewrites the `.npy` headers (NumPy pads them so the row count can grow in
+    place) before replacing the manifest. The manifest is the commit point:
+    until it is replaced, readers and later appends see the previous rows.
+
+    Args:
+        directory (str): Cache directory written by `write_cache` / `CacheWriter`.
+
+    Raises:
+        ValueError: If a split carries sample weights (not appendable).
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+        self._files = {}
+        self._added = {}
+        for split, entry in self.manifest['splits'].items():
+            if 'weight' in entry:
+                raise ValueError(f"Split '{split}' of '{directory}' has sample weights; "
+                                 f"only unweighted caches can be appended to.")
+            names = [(col['name'], np.dtype(col['dtype'])) for col in entry['columns']]
+            names.append((TARGET_FILE, np.dtype(entry['target']['dtype'])))
+            self._files[split] = [self._open(split, name, dtype, entry['n_rows'])
+                                  for name, dtype in names]
+            self._added[split] = 0
+
+    def _open(self, split, name, dtype, n_rows):
+        fh = open(os.path.join(self.directory, split, f'{name}.npy'), 'r+b')
+        np.lib.format.read_magic(fh)
+        np.lib.format.read_array_header_1_0(fh)
+        data_offset = fh.tell()
+        fh.truncate(data_offset + n_rows * dtype.itemsize)
+        fh.seek(0, os.SEEK_END)
+        return fh, dtype, data_offset
+
+    def append(self, split, X, y):
+        """
+        Appends rows to a split.
+
+        Args:
+            X (np.ndarray): Feature rows of shape (k, n_columns), in manifest order.
+            y (np.ndarray): Target values, shape (k,).
+        """
+        files = self._files[split]
+        for j, (fh, dtype, _) in enumerate(files[:-1]):
+            fh.write(np.ascontiguousarray(X[:, j], dtype=dtype).tobytes())
+        fh, dtype, _ = files[-1]
+        fh.write(np.ascontiguousarray(y, dtype=dtype).tobytes())
+        self._added[split] += len(X)
+
+    def close(self, source_path=None, extra=None):
+        """
+        Publishes the appended rows.
+
+        Args:
+            source_path (str, optional): Raw file to fingerprint in the manifest.
+            extra (dict, optional): Additional top-level manifest entries.
+
+        Returns:
+            dict: The manifest that was written.
+        """
+        for split, files in self._files.items():
+            entry = self.manifest['splits'][split]
+            entry['n_rows'] += self._added[split]
+            for fh, dtype, data_offset in files:
+                header = io.BytesIO()
+                _write_npy_header(header, dtype, entry['n_rows'])
+                if header.tell() != data_offset:
+                    raise ValueError(f"'{fh.name}' header cannot grow in place.")
+                fh.flush()
+                os.fsync(fh.fileno())
+                fh.seek(0)
+                fh.write(header.getvalue())
+                fh.close()
+        self._files = {}
+        if source_path is not None:
+            self.manifest['source'] = source_fingerprint(source_path)
+        self.manifest.update(extra or {})
+        write_manifest(self.directory, self.manifest)
+        return self.manifest
+
+
+# ==============================================================================
+# 2. READER
+# ==============================================================================
+class ColumnarSplit:
+    """
+    One memory-mapped split. Column arrays are read-only views of the files.
+
+    Attributes:
+        columns (list[str]): Feature names in manifest order.
+        y (np.ndarray): Target column.
+        w (np.ndarray | None): Sample weights, if the split has them.
+    """
+
+    def __init__(self, directory, split, entry):
+        self.split = split
+        self.n_rows = entry['n_rows']
+        self.columns = [col['name'] for col in entry['columns']]
+        self._arrays = {}
+        for col in entry['columns']:
+            array = np.load(os.path.join(directory, split, f"{col['name']}.npy"), mmap_mode='r')
+            if array.dtype.str != col['dtype'] or array.shape != (self.n_rows,):
+                raise ValueError(f"Column '{col['name']}' of split '{split}' does not match "
+                                 f"the manifest ({array.dtype.str}, {array.shape}).")
+            self._arrays[col['name']] = array
+        self.y = np.load(os.path.join(directory, split, f'{TARGET_FILE}.npy'), mmap_mode='r') \
+            if 'target' in entry else None
+        self.w = np.load(os.path.join(directory, split, f'{WEIGHT_FILE}.npy'), mmap_mode='r') \
+            if 'weight' in entry else None
+
+    def __len__(self):
+        return self.n_rows
+
+    def column(self, name):
+        return self._arrays[name]
+
+    def matrix(self, dtype=np.float64, out=None):
+        """
+        Assembles the (n_rows, n_columns) feature matrix in manifest order.
+
+        Args:
+            out (np.ndarray, optional): Preallocated C-ordered output buffer.
+        """
+        if out is None:
+            out = np.empty((self.n_rows, len(self.columns)), dtype=dtype)
+        for j, name in enumerate(self.columns):
+            out[:, j] = self._arrays[name]
+        return out
+
+    def frame(self):
+        """Features as a DataFrame with the training column names."""
+        import pandas as pd
+
+        return pd.DataFrame({name: self._arrays[name] for name in self.columns})
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != CACHE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache format {manifest.get('format_version')!r} "
+                         f"in '{directory}'.")
+    return manifest
+
+
+def is_fresh(directory):
+    """
+    True when the cache exists and its source file is unchanged since it was built.
+    """
+    try:
+        manifest = read_manifest(directory)
+    except (OSError, ValueError):
+        return False
+    source = manifest.get('source')
+    if source is None:
+        return True
+    try:
+        current = source_fingerprint(source['path'])
+    except OSError:
+        return False
+    return current['size'] == source['size'] and current['mtime_ns'] == source['mtime_ns']
+
+
+def open_cache(directory):
+    """
+    Maps every split of a cache directory.
+
+    Returns:
+        dict: split name -> ColumnarSplit
+
+    Raises:
+        FileNotFoundError: If the directory has no manifest.
+        ValueError: If the manifest or a column file is inconsistent.
+    """
+    manifest = read_manifest(directory)
+    return {split: ColumnarSplit(directory, split, entry)
+            for split, entry in manifest['splits'].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a columnar split cache.")
+    parser.add_argument('--info', default='golden', metavar='NAME',
+                        help="Cache name under data/processed/cache (default: golden).")
+    args = parser.parse_args()
+
+    directory = cache_dir(args.info)
+    splits = open_cache(directory)
+    for name, split in splits.items():
+        nbytes = sum(split.column(col).nbytes for col in split.columns)
+        print(f"{name}: {len(split)} rows x {len(split.columns)} columns, "
+              f"{nbytes / 1e3:.1f} KB of features, weights={'yes' if split.w is not None else 'no'}")
+    state = "fresh" if is_fresh(directory) else "STALE (rebuild with python -m src.preprocessing --cache)"
+    print(f"\n✅ Cache '{directory}' is {state}.")
+
+
+if __name__ == '__main__':
+    main()
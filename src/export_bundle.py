@@ -0,0 +1,61 @@
+"""
+Exports the champion pickles into a scikit-learn-free inference bundle.
+
+Usage (from the repository root):
+
+    python -m src.export_bundle
+    python -m src.export_bundle --model models/champion_random_forest.pkl \
+        --scaler models/scaler.pkl --output models/champion_bundle.npz
+
+The exporter itself needs scikit-learn + joblib to unpickle the artifacts; the
+bundle it writes is consumed by `src/runtime.py` with NumPy only.
+"""
+import argparse
+
+import numpy as np
+
+from src.runtime import DEFAULT_BUNDLE_PATH, load_bundle, runtime_from_sklearn, save_bundle
+
+
+def export_bundle(model_path='models/champion_random_forest.pkl',
+                  scaler_path='models/scaler.pkl',
+                  output_path=DEFAULT_BUNDLE_PATH,
+                  x_test_path='data/X_test.csv'):
+    """
+    Converts the model/scaler pickles into a bundle and verifies it round-trips.
+
+    Returns:
+        InferenceRuntime: The runtime re-loaded from the written bundle.
+
+    Raises:
+        RuntimeError: If bundle predictions differ from the sklearn model.
+    """
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    save_bundle(runtime_from_sklearn(model, scaler), output_path)
+
+    # Round-trip check against the golden test set
+    runtime = load_bundle(output_path)
+    X_test = pd.read_csv(x_test_path)
+    if not np.array_equal(runtime.predict(X_test.to_numpy()), model.predict(X_test)):
+        raise RuntimeError(f"Exported bundle {output_path} does not reproduce {model_path}.")
+    return runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the champion model into a NumPy bundle.")
+    parser.add_argument('--model', default='models/champion_random_forest.pkl')
+    parser.add_argument('--scaler', default='models/scaler.pkl')
+    parser.add_argument('--output', default=DEFAULT_BUNDLE_PATH)
+    args = parser.parse_args()
+
+    runtime = export_bundle(args.model, args.scaler, args.output)
+    print(f"✅ Bundle saved to '{args.output}' "
+          f"({runtime.forest.n_trees} trees, {runtime.forest.n_nodes} nodes).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+"""
+Single feature pipeline shared by training and serving.
+
+Raw applicant profiles in the schema of `data/medical_insurance_data.csv`
+(age, sex, bmi, children, smoker, region) become the 9-column model matrix in
+`src.schema` order through three vectorized stages:
+
+    encode  - categorical labels -> codes -> one-hot rows through precomputed
+              lookup arrays, written into one preallocated float64 buffer;
+    cluster - Cluster_Label: nearest KMeans centroid on (age, bmi, charges)
+              (`src.clustering`)
+              when the charges are known (training / evaluation), otherwise
+              the serving heuristic (smokers -> 2, others -> 1);
+    scale   - StandardScaler arithmetic on the scaled columns, in place.
+
+`FeaturePipeline` fits the cluster and scaler parameters (with scikit-learn,
+so the fitted values match the notebook bit for bit), transforms with NumPy
+only, and saves / loads them as a small `.npz`. `src.preprocessing` builds the
+training splits with it; `src.batch.predict_batch` serves through its encode
+stage (the scale stage is folded into the raw-space artifact's thresholds).
+
+Usage (from the repository root):
+
+    python -m src.feature_pipeline --export   # models/*.pkl -> models/feature_pipeline.npz
+    python -m src.feature_pipeline --verify   # parity with data/X_test.csv
+"""
+import argparse
+
+import numpy as np
+
+from src.clustering import (DEFAULT_BATCH_SIZE, KMEANS_RANDOM_STATE, N_CLUSTERS, fit_centers,
+                            nearest_centroid)
+from src.instrumentation import stage
+from src.schema import FEATURE_NAMES, SCALED_COLUMNS
+
+RAW_COLUMNS = ('age', 'sex', 'bmi', 'children', 'smoker', 'region')
+N_FEATURES = len(FEATURE_NAMES)
+DEFAULT_PIPELINE_PATH = 'models/feature_pipeline.npz'
+PIPELINE_FORMAT_VERSION = 1
+
+# KMeans settings (N_CLUSTERS, KMEANS_RANDOM_STATE) live in src.clustering
+CLUSTER_INPUTS = ('age', 'bmi', 'charges')
+CLUSTER_COLUMN = FEATURE_NAMES.index('Cluster_Label')
+SCALED_INDEX = np.array([FEATURE_NAMES.index(name) for name in SCALED_COLUMNS])
+
+# ==============================================================================
+# 1. CATEGORICAL LOOKUP TABLES
+# ==============================================================================
+# Labels are matched case-insensitively ('Male' from the UI, 'male' from the CSV)
+SEX_CODES = {'male': 0, 'female': 1}
+SMOKER_CODES = {'no': 0, 'yes': 1, 'false': 0, 'true': 1}
+REGION_CODES = {'northeast': 0, 'northwest': 1, 'southeast': 2, 'southwest': 3}
+
+# Region code -> [region_northwest, region_southeast, region_southwest] (northeast dropped)
+REGION_ONE_HOT = np.array([
+    [0, 0, 0],
+    [1, 0, 0],
+    [0, 1, 0],
+    [0, 0, 1],
+], dtype=np.float64)
+
+# Smoker code -> Cluster_Label heuristic: smokers -> High-Risk (2), others -> Baseline (1)
+CLUSTER_BY_SMOKER = np.array([1, 2], dtype=np.float64)
+
+
+def _columns(records):
+    """Normalizes DataFrame / dict of arrays / list of dicts into column arrays."""
+    if hasattr(records, 'columns'):
+        # Categorical columns stay pandas Categoricals: encoded once per category
+        return {col: records[col].array if records[col].dtype == 'category'
+                else records[col].to_numpy() for col in RAW_COLUMNS}
+    if isinstance(records, dict):
+        return {col: np.asarray(records[col]) for col in RAW_COLUMNS}
+    records = list(records)
+    return {col: np.asarray([r[col] for r in records]) for col in RAW_COLUMNS}
+
+
+def encode_codes(values, mapping, name):
+    """
+    Converts a categorical column to integer codes.
+
+    Numeric / boolean columns are taken as codes already; string columns are
+    encoded once per distinct label (`np.unique`) and broadcast back; pandas
+    Categoricals are encoded once per category.
+
+    Raises:
+        ValueError: On labels missing from `mapping`, or numeric codes out of
+            range or not whole numbers (1.7 is not a code).
+    """
+    if hasattr(values, 'categories'):
+        if (values.codes < 0).any():
+            raise ValueError(f"Missing value in column '{name}'.")
+        # Only the categories in use must be known (a subset keeps the others)
+        categories = np.asarray(values.categories)
+        used = np.zeros(len(categories), dtype=bool)
+        used[values.codes] = True
+        table = np.zeros(len(categories), dtype=np.int64)
+        table[used] = encode_codes(categories[used], mapping, name)
+        return table[values.codes]
+    values = np.asarray(values)
+    n_codes = max(mapping.values()) + 1
+    if values.dtype.kind in 'biuf':
+        if values.dtype.kind == 'f' and (values != np.rint(values)).any():
+            raise ValueError(f"Column '{name}' has missing or non-integral codes.")
+        codes = values.astype(np.int64)
+        if codes.size and (codes.min() < 0 or codes.max() >= n_codes):
+            raise ValueError(f"Column '{name}' has codes outside [0, {n_codes - 1}].")
+        return codes
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    table = np.empty(uniques.shape[0], dtype=np.int64)
+    for i, label in enumerate(uniques):
+        key = label.strip().lower()
+        if key not in mapping:
+            raise ValueError(f"Unknown value {str(label)!r} in column '{name}'.")
+        table[i] = mapping[key]
+    return table[inverse.reshape(-1)]
+
+
+def _known_codes(values, mapping):
+    """Row mask of `encode_codes` inputs that would encode (no missing or unknown label)."""
+    if hasattr(values, 'categories'):
+        table = _known_codes(np.asarray(values.categories), mapping)
+        return (values.codes >= 0) & table[np.maximum(values.codes, 0)]
+    values = np.asarray(values)
+    if values.dtype.kind in 'biuf':
+        values = values.astype(np.float64)
+        return (values >= 0) & (values <= max(mapping.values())) & (values == np.rint(values))
+    uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+    table = np.array([label.strip().lower() in mapping for label in uniques], dtype=bool)
+    return table[inverse.reshape(-1)]
+
+
+def unknown_labels(records):
+    """
+    Rows whose sex / smoker / region would make `encode_batch` raise.
+
+    Lets bulk callers drop such rows one by one instead of failing the batch.
+
+    Args:
+        records: DataFrame, dict of arrays or list of dicts with `RAW_COLUMNS`.
+
+    Returns:
+        np.ndarray[bool]: True for rows with a missing or unknown label.
+    """
+    cols = _columns(records)
+    known = np.ones(len(cols['sex']), dtype=bool)
+    for name, mapping in (('sex', SEX_CODES), ('smoker', SMOKER_CODES),
+                          ('region', REGION_CODES)):
+        known &= _known_codes(cols[name], mapping)
+    return ~known
+
+
+# ==============================================================================
+# 2. ENCODE STAGE
+# ==============================================================================
+def encode_batch(records, out=None):
+    """
+    Encodes raw profiles into the raw-unit model matrix
+    [Age, Sex, BMI, Children, Smoker, NW, SE, SW, Cluster].
+
+    Args:
+        records: DataFrame, dict of arrays or list of dicts with `RAW_COLUMNS`.
+        out (np.ndarray, optional): Preallocated float64 buffer of shape (n, 9).
+
+    Returns:
+        np.ndarray[float64]: The filled buffer.
+    """
+    cols = _columns(records)
+    n_rows = cols['age'].shape[0]
+    if out is None:
+        out = np.empty((n_rows, N_FEATURES), dtype=np.float64)
+    elif out.shape != (n_rows, N_FEATURES):
+        raise ValueError(f"Output buffer must have shape {(n_rows, N_FEATURES)}, got {out.shape}.")
+
+    with stage('encode'):
+        sex = encode_codes(cols['sex'], SEX_CODES, 'sex')
+        smoker = encode_codes(cols['smoker'], SMOKER_CODES, 'smoker')
+        region = encode_codes(cols['region'], REGION_CODES, 'region')
+    with stage('cluster'):
+        cluster = CLUSTER_BY_SMOKER[smoker]
+    with stage('assemble'):
+        out[:, 0] = cols['age']
+        out[:, 1] = sex
+        out[:, 2] = cols['bmi']
+        out[:, 3] = cols['children']
+        out[:, 4] = smoker
+        out[:, 5:8] = REGION_ONE_HOT[region]
+        out[:, 8] = cluster
+    return out
+
+
+# ==============================================================================
+# 3. FEATURE PIPELINE
+# ==============================================================================
+class FeaturePipeline:
+    """
+    Encode -> cluster -> scale, fitted once and reused for every batch.
+
+    Args:
+        scaler_mean / scaler_scale (np.ndarray, optional): StandardScaler
+            parameters for `SCALED_COLUMNS`, in that order.
+        cluster_centers (np.ndarray, optional): KMeans centroids over
+            `CLUSTER_INPUTS`, shape (N_CLUSTERS, 3).
+    """
+
+    def __init__(self, scaler_mean=None, scaler_scale=None, cluster_centers=None):
+        self.scaler_mean = None if scaler_mean is None else np.asarray(scaler_mean, np.float64)
+        self.scaler_scale = None if scaler_scale is None else np.asarray(scaler_scale, np.float64)
+        self.cluster_centers = None if cluster_centers is None else \
+            np.asarray(cluster_centers, np.float64)
+
+    @property
+    def fitted(self):
+        return self.scaler_mean is not None and self.cluster_centers is not None
+
+    @classmethod
+    def from_sklearn(cls, scaler, kmeans):
+        """Adopts the fitted `models/scaler.pkl` and `models/kmeans_model.pkl` objects."""
+        if [str(name) for name in scaler.feature_names_in_] != list(SCALED_COLUMNS):
+            raise ValueError(f"Scaler columns {list(scaler.feature_names_in_)} do not match "
+                             f"the schema's scaled columns {list(SCALED_COLUMNS)}.")
+        return cls(scaler.mean_, scaler.scale_, kmeans.cluster_centers_)
+
+    def fit_transform(self, records, charges, train_rows=None, sample_weight=None,
+                      cluster_mode='full', batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Fits KMeans on every row (as the notebook does, before the split) and
+        the scaler on `train_rows` only, then returns the transformed matrix.
+
+        A pipeline that already has centroids keeps their cluster numbering:
+        the refitted centroids are aligned to them (`src.clustering.align_centers`).
+
+        Args:
+            records: Raw profiles (see `encode_batch`).
+            charges (array-like): Target per row; input of the clustering.
+            train_rows (np.ndarray, optional): Rows the scaler is fitted on
+                (default: all).
+            sample_weight (array-like, optional): Row multiplicities.
+            cluster_mode (str): 'full' (the notebook's KMeans), 'minibatch' or
+                'streaming' (see `src.clustering`), or 'frozen' to keep the
+                centroids the pipeline already has.
+            batch_size (int): Rows per mini-batch step.
+
+        Returns:
+            np.ndarray[float64]: Scaled model matrix, shape (n, 9).
+        """
+        from sklearn.preprocessing import StandardScaler
+
+        X = encode_batch(records)
+        weights = None if sample_weight is None else np.asarray(sample_weight, np.float64)
+        points = self._cluster_inputs(X, charges)
+        if cluster_mode == 'frozen':
+            if self.cluster_centers is None:
+                raise ValueError("FeaturePipeline has no fitted cluster centers.")
+            centers = self.cluster_centers
+        else:
+            centers = fit_centers(points, cluster_mode, weights, batch_size,
+                                  reference=self.cluster_centers)
+        X[:, CLUSTER_COLUMN] = nearest_centroid(points, centers)
+
+        rows = slice(None) if train_rows is None else np.asarray(train_rows)
+        scaler = StandardScaler().fit(X[rows][:, SCALED_INDEX],
+                                      sample_weight=None if weights is None else weights[rows])
+        self.scaler_mean, self.scaler_scale = scaler.mean_, scaler.scale_
+        self.cluster_centers = centers
+        return self.apply_scaler(X)
+
+    def fit(self, records, charges, train_rows=None, sample_weight=None, cluster_mode='full'):
+        self.fit_transform(records, charges, train_rows, sample_weight, cluster_mode)
+        return self
+
+    def transform(self, records, charges=None, out=None, scale=True):
+        """
+        Vectorized transform of a batch of raw profiles.
+
+        Args:
+            records: Raw profiles (see `encode_batch`).
+            charges (array-like, optional): When given, Cluster_Label is the
+                nearest fitted centroid; otherwise the serving heuristic.
+            out (np.ndarray, optional): Preallocated float64 buffer of shape (n, 9).
+            scale (bool): Apply the scaler (False for raw-space runtimes).
+
+        Returns:
+            np.ndarray[float64]: The filled buffer.
+        """
+        X = encode_batch(records, out)
+        if charges is not None:
+            if self.cluster_centers is None:
+                raise ValueError("FeaturePipeline has no fitted cluster centers.")
+            with stage('cluster'):
+                X[:, CLUSTER_COLUMN] = self.assign_clusters(self._cluster_inputs(X, charges))
+        if scale:
+            if self.scaler_mean is None:
+                raise ValueError("FeaturePipeline has no fitted scaler.")
+            with stage('scale'):
+                self.apply_scaler(X)
+        return X
+
+    def assign_clusters(self, points):
+        """Index of the nearest centroid for each (age, bmi, charges) row."""
+        return nearest_centroid(points, self.cluster_centers)
+
+    @staticmethod
+    def _cluster_inputs(X, charges):
+        return np.column_stack([X[:, FEATURE_NAMES.index('age')], X[:, FEATURE_NAMES.index('bmi')],
+                                np.asarray(charges, dtype=np.float64)])
+
+    def apply_scaler(self, X):
+        """Scales a raw-unit matrix (`transform(..., scale=False)`) in place."""
+        # Same operations as StandardScaler.transform, hence bit-identical results
+        X[:, SCALED_INDEX] = (X[:, SCALED_INDEX] - self.scaler_mean) / self.scaler_scale
+        return X
+
+    def save(self, path=DEFAULT_PIPELINE_PATH):
+        if not self.fitted:
+            raise ValueError("Only a fitted FeaturePipeline can be saved.")
+        np.savez(path, format_version=PIPELINE_FORMAT_VERSION,
+                 feature_names=np.array(FEATURE_NAMES), scaled_columns=np.array(SCALED_COLUMNS),
+                 scaler_mean=self.scaler_mean, scaler_scale=self.scaler_scale,
+                 cluster_centers=self.cluster_centers)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PIPELINE_PATH):
+        """
+        Raises:
+            ValueError: If the file was written for another format or feature layout.
+        """
+        with np.load(path) as data:
+            if int(data['format_version']) != PIPELINE_FORMAT_VERSION:
+                raise ValueError(f"Unsupported pipeline format {int(data['format_version'])}.")
+            if tuple(str(f) for f in data['feature_names']) != FEATURE_NAMES or \
+                    tuple(str(f) for f in data['scaled_columns']) != SCALED_COLUMNS:
+                raise ValueError(f"'{path}' was saved for a different feature layout.")
+            return cls(data['scaler_mean'], data['scaler_scale'], data['cluster_centers'])
+
+
+def verify_parity(pipeline, data_path='data/medical_insurance_data.csv', x_test_path='data/X_test.csv'):
+    """
+    Transforms the raw rows of the golden test split and compares them with
+    `X_test.csv`.
+
+    Returns:
+        float: Maximum absolute difference.
+    """
+    import pandas as pd
+
+    from src.preprocessing import load_clean, split_indices
+
+    clean = load_clean(data_path)
+    _, test_rows = split_indices(len(clean))
+    test = clean.iloc[test_rows]
+    X = pipeline.transform(test, test['charges'])
+    expected = pd.read_csv(x_test_path)
+    if list(expected.columns) != list(FEATURE_NAMES):
+        raise ValueError(f"'{x_test_path}' columns differ from the schema order.")
+    return float(np.abs(X - expected.to_numpy(dtype=np.float64)).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export / verify the shared feature pipeline.")
+    parser.add_argument('--export', action='store_true',
+                        help="Build the pipeline from models/scaler.pkl and models/kmeans_model.pkl.")
+    parser.add_argument('--verify', action='store_true', help="Parity check against X_test.csv.")
+    parser.add_argument('--path', default=DEFAULT_PIPELINE_PATH)
+    args = parser.parse_args()
+    if not (args.export or args.verify):
+        parser.error("choose --export and/or --verify")
+
+    if args.export:
+        import joblib
+
+        pipeline = FeaturePipeline.from_sklearn(joblib.load('models/scaler.pkl'),
+                                                joblib.load('models/kmeans_model.pkl'))
+        pipeline.save(args.path)
+        print(f"✅ Feature pipeline saved to '{args.path}'.")
+    if args.verify:
+        err = verify_parity(FeaturePipeline.load(args.path))
+        if err > 1e-9:
+            raise SystemExit(f"❌ Pipeline output differs from data/X_test.csv (max abs diff {err:.3g}).")
+        print(f"✅ Pipeline reproduces data/X_test.csv (max abs diff {err:.1e}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+"""
+NumPy-only inference engine for tree ensembles.
+
+The champion `RandomForestRegressor` is compiled into flat struct-of-arrays
+(feature, threshold, left, right, value) covering every node of every tree.
+Prediction then walks all trees and all rows together, one depth level per
+iteration, instead of dispatching 100 Python-level `tree.predict` calls.
+
+Run the module directly to verify exact parity with `model.predict`:
+
+    python -m src.forest_engine
+"""
+import time
+
+import numpy as np
+
+# sklearn marks leaves with -1 in `children_left` / `children_right`
+TREE_LEAF = -1
+
+# Rows are traversed in blocks so the (n_trees x n_rows) index matrix stays cache-sized
+DEFAULT_BLOCK_ROWS = 512
+
+
+def _float32_floor(threshold):
+    """
+    Largest float32 value <= each float64 threshold.
+
+    For any float32 input x, `x <= t` (compared in float64) is equivalent to
+    `x <= _float32_floor(t)` compared in float32, which halves gather traffic.
+    """
+    t32 = threshold.astype(np.float32)
+    too_high = t32.astype(np.float64) > threshold
+    return np.where(too_high, np.nextafter(t32, np.float32(-np.inf)), t32)
+
+
+# ==============================================================================
+# 1. COMPILED FOREST CONTAINER
+# ==============================================================================
+class CompiledForest:
+    """
+    Flat, pointer-free representation of a fitted regression forest.
+
+    Node arrays are concatenated across trees; `roots[t]` is the global index of
+    tree t's root. Siblings are stored next to each other (`right == left + 1`
+    for every split node), so a step is `idx = left[idx] + (x > threshold[idx])`.
+    Leaves point to themselves with an infinite threshold, so every row can take
+    exactly `max_depth` steps without masking.
+
+    Attributes:
+        feature (np.ndarray[int32]): Split feature per node.
+        threshold (np.ndarray[float64]): Split threshold per node (go left if x <= t).
+        left / right (np.ndarray[int32]): Global child indices per node.
+        value (np.ndarray[float64]): Leaf output per node.
+        roots (np.ndarray[int32]): Root node index of each tree.
+        max_depth (int): Number of traversal steps needed to reach any leaf.
+        n_features (int): Width of the expected input matrix.
+        float32_inputs (bool): Cast inputs to float32 before comparing, as sklearn does.
+        metadata (dict): Free-form descriptive fields (feature names, source, ...).
+        compare_threshold (np.ndarray, optional): Precomputed comparison thresholds
+            (see `comparison_threshold`); derived from `threshold` when omitted.
+    """
+
+    ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 n_features, float32_inputs=True, metadata=None, compare_threshold=None):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.float32_inputs = bool(float32_inputs)
+        self.metadata = dict(metadata or {})
+
+        split = self.left != np.arange(self.n_nodes)
+        if not np.array_equal(self.right[split], self.left[split] + 1):
+            raise ValueError("Node layout must store siblings adjacently (right == left + 1).")
+
+        # Comparison thresholds in the dtype the inputs are cast to
+        if compare_threshold is None:
+            compare_threshold = self.comparison_threshold(self.threshold, self.float32_inputs)
+        self._cmp_threshold = compare_threshold
+
+    @staticmethod
+    def comparison_threshold(threshold, float32_inputs):
+        """Thresholds in the input dtype, equivalent to comparing against `threshold`."""
+        if float32_inputs:
+            return _float32_floor(threshold)
+        return threshold
+
+    @property
+    def compare_threshold(self):
+        """Thresholds actually used during traversal (input dtype)."""
+        return self._cmp_threshold
+
+    @property
+    def n_trees(self):
+        return int(self.roots.shape[0])
+
+    @property
+    def n_nodes(self):
+        return int(self.feature.shape[0])
+
+    def arrays(self):
+        """Returns the node arrays keyed by field name (used by exporters)."""
+        return {name: getattr(self, name) for name in self.ARRAY_FIELDS}
+
+    def _prepare(self, X):
+        dtype = np.float32 if self.float32_inputs else np.float64
+        X = np.asarray(X, dtype=dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(
+                f"Expected {self.n_features} features, got input with shape {X.shape}."
+            )
+        return np.ascontiguousarray(X)
+
+    def leaf_indices(self, X):
+        """
+        Routes every row through every tree, one depth level per iteration.
+
+        Returns:
+            np.ndarray[int32]: Global leaf index with shape (n_trees, n_rows).
+        """
+        X = self._prepare(X)
+        n_rows = X.shape[0]
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int32) * self.n_features)[None, :]
+        idx = np.repeat(self.roots[:, None], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            x = np.take(flat, np.take(self.feature, idx) + row_offset)
+            idx = np.take(self.left, idx) + (x > np.take(self._cmp_threshold, idx))
+        return idx
+
+    def predict(self, X, block_rows=DEFAULT_BLOCK_ROWS):
+        """
+        Vectorized forest prediction.
+
+        Leaf values are summed tree by tree (reduction over axis 0) and divided by
+        the number of trees, reproducing sklearn's accumulation order so results
+        are bit-for-bit identical to `RandomForestRegressor.predict`.
+
+        Args:
+            X (array-like): Matrix of shape (n_rows, n_features) or a single row.
+            block_rows (int): Maximum rows traversed per block.
+
+        Returns:
+            np.ndarray[float64]: Predictions with shape (n_rows,).
+        """
+        X = self._prepare(X)
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], block_rows):
+            block = X[start:start + block_rows]
+            leaves = self.leaf_indices(block)
+            out[start:start + block.shape[0]] = np.take(self.value, leaves).sum(axis=0)
+        out /= self.n_trees
+        return out
+
+
+# ==============================================================================
+# 2. COMPILER (sklearn estimator -> CompiledForest)
+# ==============================================================================
+def compile_forest(model):
+    """
+    Compiles a fitted sklearn tree ensemble into a `CompiledForest`.
+
+    Only the public `tree_` attributes are read, so this module never imports
+    scikit-learn itself. Works for `RandomForestRegressor`, `ExtraTreesRegressor`
+    and a bare `DecisionTreeRegressor` (treated as a forest of one).
+
+    Args:
+        model: Fitted single-output tree regressor or forest of such trees.
+
+    Returns:
+        CompiledForest: The flattened ensemble.
+    """
+    estimators = getattr(model, 'estimators_', None) or [model]
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in estimators:
+        tree = est.tree_
+        if tree.value.shape[1] != 1:
+            raise ValueError("Only single-output regression trees are supported.")
+
+        # Breadth-first relayout: children of a split node get consecutive ids
+        order = [0]
+        for node in order:
+            if tree.children_left[node] != TREE_LEAF:
+                order.extend((tree.children_left[node], tree.children_right[node]))
+        order = np.asarray(order, dtype=np.int64)
+        new_id = np.empty(tree.node_count, dtype=np.int64)
+        new_id[order] = np.arange(order.shape[0]) + offset
+
+        is_leaf = tree.children_left[order] == TREE_LEAF
+        own_id = new_id[order]
+        left = np.where(is_leaf, own_id, new_id[tree.children_left[order]])
+        right = np.where(is_leaf, own_id, new_id[tree.children_right[order]])
+
+        features.append(np.where(is_leaf, 0, tree.feature[order]))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+        lefts.append(left)
+        rights.append(right)
+        values.append(tree.value[order, 0, 0])
+        roots.append(offset)
+
+        offset += order.shape[0]
+        max_depth = max(max_depth, int(tree.max_depth))
+
+    feature_names = getattr(model, 'feature_names_in_', None)
+    metadata = {
+        'source': type(model).__name__,
+        'input_space': 'scaled',
+        'feature_names': [str(f) for f in feature_names] if feature_names is not None else None,
+    }
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots),
+        max_depth=max_depth,
+        n_features=int(model.n_features_in_),
+        metadata=metadata,
+    )
+
+
+# ==============================================================================
+# 3. SCALER FOLDING (scaled-space thresholds -> raw-space thresholds)
+# ==============================================================================
+_INT64_MIN = np.iinfo(np.int64).min
+
+
+def _to_ordered(x):
+    """Maps float64 values to int64 keys with the same ordering."""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & np.int64(0x7FFFFFFFFFFFFFFF)) - 1, bits)
+
+
+def _from_ordered(key):
+    """Inverse of `_to_ordered`."""
+    key = np.asarray(key, dtype=np.int64)
+    bits = np.where(key < 0, (-key - 1) | np.int64(_INT64_MIN), key)
+    return bits.view(np.float64)
+
+
+def fold_affine(forest, columns, mean, scale):
+    """
+    Rewrites split thresholds so the forest consumes unscaled inputs directly.
+
+    The scaled pipeline routes a raw value x left when
+    `float32((x - mean) / scale) <= t`. That predicate is monotone in x, so it is
+    equivalent to `x <= T` for a unique float64 boundary T, which is found per
+    node by bisecting over the ordered float64 bit patterns around
+    `t * scale + mean`. The folded forest therefore reproduces the
+    StandardScaler + sklearn pipeline bit-for-bit for every float64 input.
+
+    Args:
+        forest (CompiledForest): Forest trained on scaled features (float32 inputs).
+        columns (array-like[int]): Feature positions transformed by the scaler.
+        mean / scale (array-like[float]): StandardScaler `mean_` and `scale_`.
+
+    Returns:
+        CompiledForest: Raw-space copy (float64 inputs, `input_space='raw'`).
+    """
+    if forest.metadata.get('input_space', 'scaled') != 'scaled' or not forest.float32_inputs:
+        raise ValueError("Only scaled-space forests with float32 inputs can be folded.")
+
+    threshold = np.array(forest.threshold, dtype=np.float64)
+    for col, m, s in zip(np.asarray(columns), np.asarray(mean, dtype=np.float64),
+                         np.asarray(scale, dtype=np.float64)):
+        nodes = np.flatnonzero((forest.feature == col) & np.isfinite(threshold))
+        if nodes.size == 0:
+            continue
+        t = threshold[nodes]
+
+        def goes_left(x):
+            # Same operations, in the same order, as StandardScaler.transform + check_array
+            return ((x - m) / s).astype(np.float32).astype(np.float64) <= t
+
+        guess = t * s + m
+        margin = (np.abs(guess) + s) * 1e-4
+        lo, hi = guess - margin, guess + margin
+        if not (goes_left(lo).all() and not goes_left(hi).any()):
+            raise ValueError(f"Could not bracket folded thresholds for column {col}.")
+
+        # Largest float64 x with goes_left(x) is the new inclusive threshold
+        lo_key, hi_key = _to_ordered(lo), _to_ordered(hi)
+        while np.any(hi_key - lo_key > 1):
+            mid_key = lo_key + (hi_key - lo_key) // 2
+            left = goes_left(_from_ordered(mid_key))
+            lo_key = np.where(left, mid_key, lo_key)
+            hi_key = np.where(left, hi_key, mid_key)
+        threshold[nodes] = _from_ordered(lo_key)
+
+    metadata = dict(forest.metadata, input_space='raw')
+    return CompiledForest(
+        feature=forest.feature,
+        threshold=threshold,
+        left=forest.left,
+        right=forest.right,
+        value=forest.value,
+        roots=forest.roots,
+        max_depth=forest.max_depth,
+        n_features=forest.n_features,
+        float32_inputs=False,
+        metadata=metadata,
+    )
+
+
+# ==============================================================================
+# 4. PARITY VERIFICATION (Sanity Check)
+# ==============================================================================
+def verify_parity(model_path='models/champion_random_forest.pkl',
+                  x_test_path='data/X_test.csv'):
+    """
+    Compiles the champion pickle and checks that predictions on the golden test
+    set are exactly equal to `model.predict`. Requires scikit-learn and pandas.
+
+    Returns:
+        bool: True when every prediction matches bit-for-bit.
+    """
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(model_path)
+    X_test = pd.read_csv(x_test_path)
+
+    forest = compile_forest(model)
+    expected = model.predict(X_test)
+    actual = forest.predict(X_test.to_numpy())
+    exact = bool(np.array_equal(expected, actual))
+
+    # Single-row latency comparison (median of repeated calls)
+    row = X_test.to_numpy()[:1]
+    timings = {}
+    for name, fn in (('sklearn', lambda: model.predict(X_test.iloc[:1])),
+                     ('compiled', lambda: forest.predict(row))):
+        samples = []
+        for _ in range(200):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        timings[name] = float(np.median(samples)) * 1e6
+
+    print("=" * 50)
+    print("COMPILED FOREST PARITY REPORT")
+    print("-" * 50)
+    print(f"Trees / Nodes / Depth:   {forest.n_trees} / {forest.n_nodes} / {forest.max_depth}")
+    print(f"Rows compared:           {len(X_test)}")
+    print(f"Max abs difference:      {np.max(np.abs(expected - actual)):.3e}")
+    print(f"Exact match:             {'YES' if exact else 'NO'}")
+    print(f"Single-row latency (us): sklearn {timings['sklearn']:.1f} | compiled {timings['compiled']:.1f}")
+    print("=" * 50)
+    return exact
+
+
+if __name__ == '__main__':
+    raise SystemExit(0 if verify_parity() else 1)
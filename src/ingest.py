@@ -0,0 +1,273 @@
+"""
+Incremental ingestion of newly appended raw policies into the training store.
+
+The training store is a streaming columnar cache (`src.streaming_preprocessing`,
+default `data/processed/cache/streaming`). Its manifest carries a watermark of
+the raw CSV it has consumed:
+
+    offset / rows     bytes and raw rows read (always ending on a full line)
+    header_sha256     hash of the header line
+    tail_sha256       hash of the last `TAIL_WINDOW` bytes before `offset`
+    moments           count / mean / M2 of the scaled columns over every
+                      training row ingested so far (raw units)
+    invalid_rows      complete rows skipped so far because they are outside
+                      the schema ranges or carry an unknown label
+
+An ingest run checks that the file still starts with what was consumed (same
+header, same bytes just before the watermark; a rewritten or truncated file
+fails this), then reads only the bytes after the offset. The new rows are
+split by the same row-number hash, encoded and scaled with the frozen pipeline
+saved in the store, and appended in place (`src.columnar_cache.CacheAppender`).
+Its cost therefore follows the size of the appended data, not of the file.
+Invalid rows are skipped and counted (`src.streaming_preprocessing.iter_clean_chunks`),
+and the watermark moves past them, so one bad row never blocks later ones.
+
+The frozen scaler is kept until it drifts from the statistics of all ingested
+training rows: when a column's mean moves by more than `--max-drift` of its
+frozen standard deviation, or its standard deviation changes by more than that
+fraction, the store is rebuilt by a full two-pass refit.
+
+Usage (from the repository root):
+
+    python -m src.ingest                                   # data/medical_insurance_data.csv
+    python -m src.ingest --input claims.csv --name claims --max-drift 0.05 --check
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from src.columnar_cache import CacheAppender, cache_dir, open_cache, read_manifest, write_manifest
+from src.feature_pipeline import (DEFAULT_PIPELINE_PATH, SCALED_INDEX,
+                                  FeaturePipeline)
+from src.preprocessing import RAW_DATA_PATH, TARGET
+from src.schema import SCALED_COLUMNS
+from src.streaming_preprocessing import (DEFAULT_CACHE_NAME, DEFAULT_CHUNKSIZE, RunningMoments,
+                                         complete_length, is_test_row, iter_clean_chunks,
+                                         read_header, stream_preprocess, usable_rows)
+
+DEFAULT_MAX_DRIFT = 0.05
+TAIL_WINDOW = 1 << 16
+PIPELINE_FILE = 'feature_pipeline.npz'
+
+
+# ==============================================================================
+# 1. WATERMARK
+# ==============================================================================
+def _sha256_range(path, start, stop):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        digest.update(f.read(stop - start))
+    return digest.hexdigest()
+
+
+def _header_length(path):
+    with open(path, 'rb') as f:
+        return len(f.readline())
+
+
+def make_watermark(path, offset, rows, moments, invalid_rows=0):
+    """
+    Watermark of the first `offset` bytes (`rows` raw rows, `invalid_rows` of
+    them skipped) of `path`.
+
+    Returns:
+        dict: JSON-serializable watermark (see the module docstring).
+    """
+    return {
+        'offset': offset,
+        'rows': rows,
+        'columns': read_header(path),
+        'header_sha256': _sha256_range(path, 0, _header_length(path)),
+        'tail_sha256': _sha256_range(path, max(0, offset - TAIL_WINDOW), offset),
+        'moments': moments.state(),
+        'invalid_rows': invalid_rows,
+    }
+
+
+def check_watermark(path, watermark):
+    """
+    Whether `path` still begins with the bytes the watermark describes.
+
+    Returns:
+        str | None: Why it does not (the store must be rebuilt), or None.
+    """
+    offset = watermark['offset']
+    if os.path.getsize(path) < offset:
+        return f"file is shorter than the watermark ({offset:,} bytes)"
+    if _sha256_range(path, 0, _header_length(path)) != watermark['header_sha256']:
+        return "header changed"
+    if _sha256_range(path, max(0, offset - TAIL_WINDOW), offset) != watermark['tail_sha256']:
+        return "content before the watermark changed"
+    return None
+
+
+def scaler_drift(pipeline, moments):
+    """
+    Largest relative drift of the running statistics from the frozen scaler.
+
+    Returns:
+        tuple: (drift, column) where drift is the max over scaled columns of
+            |mean - frozen mean| / frozen scale and |scale / frozen scale - 1|.
+    """
+    mean_shift = np.abs(moments.mean - pipeline.scaler_mean) / pipeline.scaler_scale
+    scale_shift = np.abs(moments.scale / pipeline.scaler_scale - 1.0)
+    drift = np.maximum(mean_shift, scale_shift)
+    worst = int(drift.argmax())
+    return float(drift[worst]), SCALED_COLUMNS[worst]
+
+
+# ==============================================================================
+# 2. INGEST
+# ==============================================================================
+def full_build(path, name=DEFAULT_CACHE_NAME, chunksize=DEFAULT_CHUNKSIZE,
+               pipeline_path=DEFAULT_PIPELINE_PATH):
+    """
+    Rebuilds the store with a two-pass refit of the scaler and records the watermark.
+
+    Returns:
+        dict: The `stream_preprocess` result.
+    """
+    result = stream_preprocess(path, name, chunksize, pipeline_path)
+    manifest = read_manifest(result['directory'])
+    manifest['watermark'] = make_watermark(path, result['source_offset'], result['source_rows'],
+                                           result['moments'], result['invalid_rows'])
+    write_manifest(result['directory'], manifest)
+    return result
+
+
+def ingest(path=RAW_DATA_PATH, name=DEFAULT_CACHE_NAME, chunksize=DEFAULT_CHUNKSIZE,
+           max_drift=DEFAULT_MAX_DRIFT, pipeline_path=DEFAULT_PIPELINE_PATH):
+    """
+    Brings the store up to date with `path`, appending only the new rows.
+
+    Args:
+        path (str): Raw CSV that only ever grows by appended rows.
+        name (str): Store name under `data/processed/cache/`.
+        chunksize (int): Raw rows held in memory at a time.
+        max_drift (float): Scaler drift that triggers a full refit.
+        pipeline_path (str): Pipeline supplying the centroids of a full build.
+
+    Returns:
+        dict: 'action' ('up-to-date', 'appended', 'refit' or 'built'),
+            'reason', 'new_rows', 'train_rows', 'test_rows', 'invalid_rows' and
+            'first_invalid_row' (rows skipped by this run), 'drift',
+            'drift_column' and 'seconds'.
+    """
+    start = time.perf_counter()
+    directory = cache_dir(name)
+    try:
+        watermark = read_manifest(directory).get('watermark')
+        reason = None if watermark else "store has no watermark"
+    except (OSError, ValueError):
+        watermark, reason = None, "no store"
+    reason = reason or check_watermark(path, watermark)
+    if reason:
+        return _rebuilt('built', reason, path, name, chunksize, pipeline_path, start)
+
+    stop = complete_length(path)
+    result = {'action': 'up-to-date', 'reason': None, 'new_rows': 0, 'train_rows': 0,
+              'test_rows': 0, 'invalid_rows': 0, 'first_invalid_row': None, 'drift': 0.0,
+              'drift_column': None}
+    if stop > watermark['offset']:
+        pipeline = FeaturePipeline.load(os.path.join(directory, PIPELINE_FILE))
+        moments = RunningMoments.from_state(watermark['moments'])
+        progress = {'rows': watermark['rows']}
+        appender = CacheAppender(directory)
+        buffer = np.empty((chunksize, len(appender.manifest['splits']['train']['columns'])))
+        for rows, chunk in iter_clean_chunks(path, chunksize, watermark['offset'], stop,
+                                             first_row=watermark['rows'],
+                                             names=watermark['columns'], progress=progress):
+            X = pipeline.transform(chunk, chunk[TARGET], out=buffer[:len(chunk)], scale=False)
+            y = chunk[TARGET].to_numpy(dtype=np.float64)
+            test = is_test_row(rows)
+            moments.update(X[~test][:, SCALED_INDEX])
+            pipeline.apply_scaler(X)
+            appender.append('train', X[~test], y[~test])
+            appender.append('test', X[test], y[test])
+            result['new_rows'] += len(chunk)
+            result['test_rows'] += int(test.sum())
+            result['train_rows'] += int((~test).sum())
+        result['invalid_rows'] = progress['invalid_rows']
+        result['first_invalid_row'] = progress['first_invalid_row']
+        invalid_total = watermark.get('invalid_rows', 0) + progress['invalid_rows']
+        appender.close(source_path=path, extra={
+            'watermark': make_watermark(path, stop, progress['rows'], moments, invalid_total)})
+        result['action'] = 'appended'
+        result['drift'], result['drift_column'] = scaler_drift(pipeline, moments)
+        if result['drift'] > max_drift:
+            reason = (f"scaler drift {result['drift']:.3f} on '{result['drift_column']}' "
+                      f"exceeds {max_drift}")
+            return _rebuilt('refit', reason, path, name, chunksize, pipeline_path, start)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _rebuilt(action, reason, path, name, chunksize, pipeline_path, start):
+    build = full_build(path, name, chunksize, pipeline_path)
+    return {'action': action, 'reason': reason, 'new_rows': build['rows'],
+            'train_rows': build['train_rows'], 'test_rows': build['test_rows'],
+            'invalid_rows': build['invalid_rows'], 'first_invalid_row': build['first_invalid_row'],
+            'drift': 0.0, 'drift_column': None, 'seconds': time.perf_counter() - start}
+
+
+def check_store(name=DEFAULT_CACHE_NAME, path=RAW_DATA_PATH):
+    """
+    Transforms every row up to the watermark in memory with the store's frozen
+    pipeline and compares the result with the store.
+
+    Returns:
+        float: Maximum absolute difference over features and targets.
+    """
+    import pandas as pd
+
+    directory = cache_dir(name)
+    watermark = read_manifest(directory)['watermark']
+    pipeline = FeaturePipeline.load(os.path.join(directory, PIPELINE_FILE))
+    raw = pd.read_csv(path, nrows=watermark['rows'])
+    clean = raw[usable_rows(raw)[1]]
+    test = is_test_row(clean.index.to_numpy())
+    splits = open_cache(directory)
+    diff = 0.0
+    for split, rows in (('train', ~test), ('test', test)):
+        expected = pipeline.transform(clean[rows], clean[TARGET][rows])
+        diff = max(diff, float(np.abs(splits[split].matrix() - expected).max()),
+                   float(np.abs(splits[split].y - clean[TARGET][rows].to_numpy()).max()))
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append newly arrived raw rows to the "
+                                                 "training store.")
+    parser.add_argument('--input', default=RAW_DATA_PATH)
+    parser.add_argument('--name', default=DEFAULT_CACHE_NAME,
+                        help="Store name under data/processed/cache (default: streaming).")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--max-drift', type=float, default=DEFAULT_MAX_DRIFT,
+                        help="Relative scaler drift that triggers a full refit (default: 0.05).")
+    parser.add_argument('--pipeline', default=DEFAULT_PIPELINE_PATH,
+                        help="Saved FeaturePipeline supplying the centroids of a full build.")
+    parser.add_argument('--check', action='store_true',
+                        help="Compare the store with an in-memory transform (loads the whole file).")
+    args = parser.parse_args()
+
+    result = ingest(args.input, args.name, args.chunksize, args.max_drift, args.pipeline)
+    detail = f" ({result['reason']})" if result['reason'] else ""
+    print(f"✅ {result['action']}{detail}: {result['new_rows']:,} rows "
+          f"({result['train_rows']:,} train / {result['test_rows']:,} test) in "
+          f"{result['seconds']:.2f}s")
+    if result['invalid_rows']:
+        print(f"⚠️ Skipped {result['invalid_rows']:,} rows outside the schema ranges or with "
+              f"unknown labels (first: raw row {result['first_invalid_row']}).")
+    if result['action'] == 'appended':
+        print(f"   scaler drift {result['drift']:.4f} on '{result['drift_column']}' "
+              f"(refit above {args.max_drift})")
+    if args.check:
+        print(f"   store vs in-memory transform: max abs diff {check_store(args.name, args.input):.1e}")
+
+
+if __name__ == '__main__':
+    main()
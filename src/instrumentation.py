@@ -0,0 +1,200 @@
+"""
+Lightweight per-stage latency instrumentation for the inference pipeline.
+
+Stages are timed with a context manager and recorded into fixed-bucket latency
+histograms (one per stage), from which p50/p95/p99 are estimated. When
+instrumentation is disabled, `stage()` returns a shared no-op context manager,
+so the hot path pays for one attribute check and nothing else.
+
+Enable it with the environment variable `INSUREAI_METRICS=1` or at runtime via
+`RECORDER.enabled = True` (the dashboard's hidden admin panel does this).
+
+    from src.instrumentation import stage
+    with stage('inference'):
+        prediction = runtime.predict_raw(X)
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the histogram buckets: 1us ... 1s, then +Inf
+BUCKET_BOUNDS = (
+    1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4,
+    1e-3, 2e-3, 5e-3, 1e-2, 2e-2, 5e-2, 1e-1, 2e-1, 5e-1, 1.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = 'insureai_stage_latency_seconds'
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+# ==============================================================================
+# 1. FIXED-BUCKET HISTOGRAM
+# ==============================================================================
+class LatencyHistogram:
+    """
+    Cumulative-free latency histogram with fixed bucket bounds.
+
+    Attributes:
+        counts (list[int]): Observations per bucket; the last bucket is +Inf.
+        total (float): Sum of observed durations (seconds).
+        count (int): Number of observations.
+    """
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def copy(self):
+        clone = LatencyHistogram(self.bounds)
+        clone.counts = list(self.counts)
+        clone.total = self.total
+        clone.count = self.count
+        return clone
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by linear interpolation inside the target bucket.
+
+        Returns:
+            float: Duration in seconds (0.0 when empty).
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+
+# ==============================================================================
+# 2. STAGE RECORDER
+# ==============================================================================
+class StageRecorder:
+    """
+    Thread-safe collection of per-stage histograms.
+
+    Attributes:
+        enabled (bool): When False, `stage()` is a no-op.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._counter_sources = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = LatencyHistogram()
+            hist.observe(seconds)
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def stage(self, name):
+        """Context manager timing one pipeline stage (no-op when disabled)."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name)
+
+    def register_counters(self, name, source):
+        """
+        Exports the counters returned by `source()` (dict of name -> number)
+        next to the latency histograms, as `insureai_<name>_<counter>`.
+        Registering the same name again replaces the previous source.
+        """
+        with self._lock:
+            self._counter_sources[name] = source
+
+    def counters(self):
+        """
+        Returns:
+            dict: source name -> its current counters.
+        """
+        with self._lock:
+            sources = dict(self._counter_sources)
+        return {name: source() for name, source in sorted(sources.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Consistent copies of all histograms, keyed by stage name."""
+        with self._lock:
+            return {name: hist.copy() for name, hist in sorted(self._histograms.items())}
+
+    def summary(self):
+        """
+        Returns:
+            dict: stage -> {'count', 'mean', 'p50', 'p95', 'p99'} (seconds).
+        """
+        out = {}
+        for name, hist in self.snapshot().items():
+            stats = {'count': hist.count, 'mean': hist.total / hist.count if hist.count else 0.0}
+            for q in QUANTILES:
+                stats[f'p{int(q * 100)}'] = hist.quantile(q)
+            out[name] = stats
+        return out
+
+    def render_text(self):
+        """
+        Renders all histograms in the Prometheus text exposition format, followed
+        by the estimated p50/p95/p99 per stage and the registered counters.
+
+        Returns:
+            str: Metrics text (bucket counts are cumulative, as the format requires).
+        """
+        snapshot = self.snapshot()
+        labels = [repr(b) for b in BUCKET_BOUNDS] + ['+Inf']
+        lines = [
+            f'# HELP {METRIC_NAME} Per-stage latency of the inference pipeline.',
+            f'# TYPE {METRIC_NAME} histogram',
+        ]
+        for name, hist in snapshot.items():
+            cumulative = 0
+            for label, n in zip(labels, hist.counts):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{label}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {hist.total:.9f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {hist.count}')
+        lines.append(f'# TYPE {METRIC_NAME}_quantile gauge')
+        for name, hist in snapshot.items():
+            for q in QUANTILES:
+                lines.append(f'{METRIC_NAME}_quantile{{stage="{name}",quantile="{q}"}} '
+                             f'{hist.quantile(q):.9f}')
+        for source, values in self.counters().items():
+            for counter, value in values.items():
+                lines.append(f'insureai_{source}_{counter} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide recorder shared by the app, the batch API and the CLIs
+RECORDER = StageRecorder(enabled=os.environ.get('INSUREAI_METRICS', '0') == '1')
+
+
+def stage(name):
+    """Shortcut for `RECORDER.stage(name)`."""
+    return RECORDER.stage(name)
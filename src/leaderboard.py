@@ -0,0 +1,261 @@
+"""
+Artifact-driven model leaderboard: accuracy and serving cost side by side.
+
+Replaces the hand-typed scores of `model_Comparison_FINAL.ipynb`. Every model
+artifact listed in `src.training.MODEL_SPECS` is loaded in its own interpreter,
+scored on `data/X_test.csv`, and timed: p99 single-row latency, batch
+throughput, artifact size and resident memory. The champion is additionally
+evaluated through its compiled serving engines (memory-mapped `.bin` artifact and,
+when built, the bucket cube), since those are what the dashboard actually runs.
+
+Two files are written:
+
+    data/processed/final_model_comparison.csv   tracked: the original accuracy
+        columns plus the serving engine, for committed artifacts only, so a
+        clean checkout regenerates it byte for byte;
+    data/processed/leaderboard_costs.csv        hardware-specific (gitignored):
+        every row, optional local engines included, with the cost columns and
+        the Pareto-optimal flag (no other row is both at least as accurate and
+        at least as fast at p99).
+
+Usage (from the repository root):
+
+    python -m src.leaderboard
+    python -m src.leaderboard --train-missing   # first train competitors without an artifact
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.training import CHAMPION_KEY, MODEL_SPECS, SPECS_BY_KEY, load_golden_data
+
+DEFAULT_COMPARISON_PATH = 'data/processed/final_model_comparison.csv'
+DEFAULT_COSTS_PATH = 'data/processed/leaderboard_costs.csv'
+THROUGHPUT_BATCH_ROWS = 10_000
+LATENCY_SAMPLES = 1_000
+
+# Champion serving engines evaluated in addition to its sklearn pickle
+CHAMPION_ENGINES = (
+    ('compiled_bin', 'models/champion_forest.bin'),
+    ('bucket_cube', 'models/bucket_cube.npy'),
+)
+# Engines built locally and gitignored: reported with the costs, not in the tracked table
+OPTIONAL_ENGINES = ('bucket_cube',)
+COMPARISON_COLUMNS = ('Model Name', 'R2_Score', 'MAE', 'R2_Score_Formatted', 'Serving_Engine',
+                      'Status')
+ENGINE_LABELS = {
+    'sklearn': 'scikit-learn pickle',
+    'compiled_bin': 'compiled forest (.bin)',
+    'bucket_cube': 'bucket cube (.npy)',
+}
+
+
+def _artifact_mb(*paths):
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p)) / 1e6
+
+
+# ==============================================================================
+# 1. ENGINE LOADERS (worker side)
+# ==============================================================================
+def _load(key, engine, X_test):
+    """
+    Loads one (model, engine) pair.
+
+    Returns:
+        tuple: (predict callable, input matrix for it, list of artifact paths)
+    """
+    if engine == 'sklearn':
+        import joblib
+        import pandas as pd
+
+        path = SPECS_BY_KEY[key]['artifact']
+        model = joblib.load(path)
+        columns = list(X_test.columns)
+        # DataFrame input, as in the notebooks (the estimators were fitted with feature names)
+        return (lambda X: model.predict(pd.DataFrame(X, columns=columns)),
+                X_test.to_numpy(), [path])
+
+    from src.artifact_format import DEFAULT_ARTIFACT_PATH, open_artifact
+    from src.bucket_cube import INTEGER_FEATURES
+
+    runtime = open_artifact(DEFAULT_ARTIFACT_PATH).to_raw_space()
+    X_raw = runtime.unscale(X_test.to_numpy())
+    # Undo the float noise of the inverse transform: serving inputs are exact integers
+    X_raw[:, list(INTEGER_FEATURES)] = np.rint(X_raw[:, list(INTEGER_FEATURES)])
+    if engine == 'compiled_bin':
+        return runtime.predict_raw, X_raw, [DEFAULT_ARTIFACT_PATH]
+    if engine == 'bucket_cube':
+        from src.bucket_cube import DEFAULT_CUBE_PATH, _sidecar_path, open_bucket_cube
+
+        cube = open_bucket_cube(DEFAULT_CUBE_PATH)
+        return cube.predict, X_raw, [DEFAULT_CUBE_PATH, _sidecar_path(DEFAULT_CUBE_PATH)]
+    raise ValueError(f"Unknown engine {engine!r}.")
+
+
+def evaluate(key, engine):
+    """
+    Scores and times one (model, engine) pair in the current process.
+
+    Returns:
+        dict: Accuracy and serving-cost measurements.
+    """
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    from src.benchmark import _peak_rss_mb, measure_latency, measure_throughput
+
+    _, X_test, _, y_test = load_golden_data()
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    predict, X, paths = _load(key, engine, X_test)
+    load_seconds = time.perf_counter() - start
+
+    y_pred = predict(X)
+    batch = np.resize(X, (THROUGHPUT_BATCH_ROWS, X.shape[1]))
+    throughput = measure_throughput(predict, batch, (THROUGHPUT_BATCH_ROWS,))
+    latency = measure_latency(predict, X, LATENCY_SAMPLES)
+    return {
+        'key': key,
+        'engine': engine,
+        'r2': float(r2_score(y_test, y_pred)),
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'p99_latency_ms': latency['p99_us'] / 1e3,
+        'throughput_rows_s': throughput[str(THROUGHPUT_BATCH_ROWS)]['rows_per_second'],
+        'load_seconds': load_seconds,
+        'artifact_mb': _artifact_mb(*paths),
+        'model_rss_mb': _peak_rss_mb() - rss_before,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+# ==============================================================================
+# 2. LEADERBOARD (parent side)
+# ==============================================================================
+def candidates():
+    """(model key, engine) pairs whose artifacts exist, champion engines included."""
+    pairs = [(spec['key'], 'sklearn') for spec in MODEL_SPECS if os.path.exists(spec['artifact'])]
+    pairs += [(CHAMPION_KEY, engine) for engine, path in CHAMPION_ENGINES if os.path.exists(path)]
+    return pairs
+
+
+def evaluate_isolated(key, engine):
+    """Runs `evaluate` in a fresh interpreter so memory figures are not shared."""
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    proc = subprocess.run([sys.executable, '-m', 'src.leaderboard', '--worker', key, engine],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Evaluation of {key}/{engine} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _status(key, engine):
+    if key != CHAMPION_KEY:
+        return 'Competitor'
+    return '🏆 CHAMPION ARTIFACT' if engine == 'sklearn' else 'Champion serving engine'
+
+
+def pareto_optimal(r2, latency):
+    """True where no other row is at least as accurate and as fast, and strictly better in one."""
+    r2, latency = np.asarray(r2), np.asarray(latency)
+    dominated = ((r2[None, :] >= r2[:, None]) & (latency[None, :] <= latency[:, None])
+                 & ((r2[None, :] > r2[:, None]) | (latency[None, :] < latency[:, None])))
+    return ~dominated.any(axis=1)
+
+
+def build_leaderboard(results):
+    """
+    Assembles the comparison table in the layout of `final_model_comparison.csv`.
+
+    Returns:
+        pd.DataFrame: Rows sorted by R2 (then p99 latency).
+    """
+    import pandas as pd
+
+    rows = []
+    for res in results:
+        spec = SPECS_BY_KEY[res['key']]
+        name = spec['name'] if res['engine'] == 'sklearn' else \
+            f"{spec['name']} [{ENGINE_LABELS[res['engine']]}]"
+        rows.append({
+            'Model Name': name,
+            'R2_Score': round(res['r2'], 4),
+            'MAE': round(res['mae'], 2),
+            'R2_Score_Formatted': f"{res['r2'] * 100:.2f}%",
+            'Serving_Engine': ENGINE_LABELS[res['engine']],
+            'p99_Latency_ms': round(res['p99_latency_ms'], 3),
+            'Throughput_rows_per_s': round(res['throughput_rows_s']),
+            'Load_Time_ms': round(res['load_seconds'] * 1e3, 1),
+            'Artifact_MB': round(res['artifact_mb'], 3),
+            'Model_RSS_MB': round(res['model_rss_mb'], 1),
+            'Peak_RSS_MB': round(res['peak_rss_mb'], 1),
+            'Status': _status(res['key'], res['engine']),
+        })
+    frame = pd.DataFrame(rows)
+    frame['Pareto_Optimal'] = pareto_optimal(frame['R2_Score'], frame['p99_Latency_ms'])
+    return frame.sort_values(['R2_Score', 'p99_Latency_ms'], ascending=[False, True]) \
+        .reset_index(drop=True)
+
+
+def comparison_table(leaderboard):
+    """
+    Reproducible part of the leaderboard: accuracy columns, committed engines only.
+
+    Returns:
+        pd.DataFrame: The rows of `final_model_comparison.csv`.
+    """
+    optional = [ENGINE_LABELS[engine] for engine in OPTIONAL_ENGINES]
+    rows = leaderboard[~leaderboard['Serving_Engine'].isin(optional)]
+    # Ties in R2 keep the `candidates` order (pickle before its engines), not the timing order
+    order = [f"{spec['name']}{suffix}" for spec in MODEL_SPECS
+             for suffix in [''] + [f" [{ENGINE_LABELS[engine]}]" for engine, _ in CHAMPION_ENGINES]]
+    rows = rows.assign(_order=rows['Model Name'].map(order.index))
+    return rows.sort_values(['R2_Score', '_order'], ascending=[False, True]) \
+        [list(COMPARISON_COLUMNS)].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate every model artifact on X_test.")
+    parser.add_argument('--train-missing', action='store_true',
+                        help="Train competitors without an artifact first (src.training).")
+    parser.add_argument('--output', default=DEFAULT_COMPARISON_PATH)
+    parser.add_argument('--costs-output', default=DEFAULT_COSTS_PATH,
+                        help="Hardware-specific table with the cost columns.")
+    parser.add_argument('--worker', nargs=2, metavar=('MODEL', 'ENGINE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(evaluate(*args.worker)))
+        return
+
+    if args.train_missing:
+        from src.training import missing_models, train_model
+        for key in missing_models():
+            train_model(key)
+            print(f"  trained {key}", file=sys.stderr)
+
+    missing = [spec['name'] for spec in MODEL_SPECS if not os.path.exists(spec['artifact'])]
+    if missing:
+        print(f"⚠️ Skipping models without an artifact: {', '.join(missing)} "
+              "(run with --train-missing).", file=sys.stderr)
+
+    results = []
+    for key, engine in candidates():
+        print(f"  evaluating {key} / {engine} ...", file=sys.stderr)
+        results.append(evaluate_isolated(key, engine))
+    leaderboard = build_leaderboard(results)
+
+    for path in (args.output, args.costs_output):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    comparison_table(leaderboard).to_csv(args.output, index=False)
+    leaderboard.to_csv(args.costs_output, index=False)
+    print(leaderboard.drop(columns=['R2_Score']).to_string(index=False))
+    print(f"\n✅ Leaderboard saved to '{args.output}', serving costs to "
+          f"'{args.costs_output}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+"""
+Make-style runner for the training workflow: data -> features -> models ->
+evaluation -> verified serving artifacts.
+
+The notebooks are run by hand in the order 01 -> 02 -> 03 -> five model
+notebooks -> model_Comparison_FINAL -> model_Verification_FINAL. Here the same
+work is a DAG of the stages of `src.stage_cache`:
+
+    clusters -> split -> fit/random_forest  \\ -> verify
+                      -> fit/decision_tree   |
+                      -> fit/knn             +-> evaluate
+                      -> fit/linear          |
+                      -> fit/lasso          /
+
+Every stage is content-addressed, so the whole plan (all keys) is known before
+anything runs. A target is stale when its cache entry is missing; only stale
+targets that an up-to-date goal does not already cover are built (a fresh
+`split` makes a stale `clusters` irrelevant, as in Make). Stale targets run
+in separate worker interpreters as soon as their dependencies are done, up to
+`--jobs` at a time, so the five fits proceed in parallel and a full retrain
+takes about the critical path rather than the sum of the stages.
+
+Each worker reports its wall time and peak RSS. Every run is appended to
+`data/processed/pipeline_runs.jsonl` together with the git commit, and the
+evaluation is written to `data/processed/pipeline_metrics.csv`.
+
+Stages only write to the cache. With `--publish`, a successful run copies the
+fitted models to their `models/*.pkl` paths, and the verified champion
+artifacts (`.bin`, `.npz`, `scaler.pkl`) and the split's feature pipeline to
+`models/`, so a full retrain reaches the serving artifacts.
+
+Usage (from the repository root):
+
+    python -m src.orchestrator                     # build what is stale
+    python -m src.orchestrator --dry-run           # print the plan only
+    python -m src.orchestrator --jobs 4 --models random_forest knn
+    python -m src.orchestrator --publish           # then update models/
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from src.stage_cache import (DEFAULT_MAX_BYTES, DEFAULT_STAGE_CACHE_ROOT, StageCache,
+                             load_stage_metrics, load_stage_verification, plan_pipeline)
+
+DEFAULT_RUN_LOG_PATH = 'data/processed/pipeline_runs.jsonl'
+DEFAULT_METRICS_PATH = 'data/processed/pipeline_metrics.csv'
+
+
+# ==============================================================================
+# 1. PLANNING
+# ==============================================================================
+def stale_targets(plan, cache):
+    """
+    Targets that must be built for every sink of the plan to be up to date.
+
+    A fresh target needs nothing; a stale one needs itself plus whatever its
+    dependencies need.
+
+    Returns:
+        set[str]: Stage names to build.
+    """
+    needed = set()
+
+    def visit(name):
+        if name in needed or cache.has(plan[name]['key']):
+            return
+        needed.add(name)
+        for dep in plan[name]['deps']:
+            visit(dep)
+
+    dependents = {dep for spec in plan.values() for dep in spec['deps']}
+    for name in plan:
+        if name not in dependents:
+            visit(name)
+    return needed
+
+
+def critical_path(plan, seconds):
+    """
+    Longest chain of stage times through the DAG.
+
+    Args:
+        seconds (dict): stage name -> wall seconds (0 for targets not built).
+
+    Returns:
+        tuple: (total seconds, list of stage names along the path)
+    """
+    finish, previous = {}, {}
+    for name, spec in plan.items():
+        slowest = max(spec['deps'], key=lambda dep: finish[dep], default=None)
+        finish[name] = seconds.get(name, 0.0) + (finish[slowest] if slowest else 0.0)
+        previous[name] = slowest
+    name = max(finish, key=finish.get)
+    total, path = finish[name], []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return total, path[::-1]
+
+
+# ==============================================================================
+# 2. WORKER (one stage per interpreter)
+# ==============================================================================
+def run_target(stage, models, raw_path, root):
+    """
+    Builds one stage in the current process. Eviction is left to the parent so
+    that concurrent workers never delete each other's inputs.
+
+    Returns:
+        dict: The `StageCache.run` result plus 'peak_rss_mb'.
+    """
+    from src.benchmark import _peak_rss_mb
+
+    spec = plan_pipeline(models, raw_path)[stage]
+    result = StageCache(root, max_bytes=None).run_spec(spec)
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+
+def run_isolated(stage, models, raw_path, root):
+    """Runs `run_target` in a fresh interpreter, so time and memory are per stage."""
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    args = [sys.executable, '-m', 'src.orchestrator', '--worker', stage, '--root', root,
+            '--models'] + list(models) + (['--input', raw_path] if raw_path else [])
+    start = time.perf_counter()
+    proc = subprocess.run(args, capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Stage '{stage}' failed:\n{proc.stderr}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['started'] = start
+    result['wall_seconds'] = time.perf_counter() - start
+    return result
+
+
+# ==============================================================================
+# 3. SCHEDULER
+# ==============================================================================
+def run_pipeline(models, raw_path=None, jobs=None, root=DEFAULT_STAGE_CACHE_ROOT,
+                 max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Builds the stale targets of the plan, each as soon as its dependencies are
+    done, with at most `jobs` workers at a time.
+
+    Returns:
+        dict: 'stages' (per-stage records in completion order), 'wall_seconds',
+            'serial_seconds' (sum of stage times), 'critical_path_seconds',
+            'critical_path', 'jobs' and the entry directory of every stage
+            ('directories', stage name -> directory).
+
+    Raises:
+        RuntimeError: If a stage fails; running stages finish, no new ones start.
+    """
+    start = time.perf_counter()
+    jobs = jobs or os.cpu_count() or 1
+    cache = StageCache(root, max_bytes)
+    plan = plan_pipeline(models, raw_path)
+    todo = stale_targets(plan, cache)
+    done = set(plan) - todo
+    records = [{'stage': name, 'key': plan[name]['key'], 'status': 'up-to-date',
+                'wall_seconds': 0.0, 'peak_rss_mb': None, 'started_at': 0.0}
+               for name in plan if name in done]
+    running = {}
+    with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+        while todo or running:
+            for name in [name for name in plan if name in todo
+                         and all(dep in done for dep in plan[name]['deps'])]:
+                todo.discard(name)
+                future = pool.submit(run_isolated, name, models, raw_path, root)
+                running[future] = name
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    result = future.result()
+                except RuntimeError:
+                    todo.clear()
+                    raise
+                done.add(name)
+                records.append({'stage': name, 'key': result['key'], 'status': 'built',
+                                'wall_seconds': result['wall_seconds'],
+                                'stage_seconds': result['seconds'],
+                                'peak_rss_mb': result['peak_rss_mb'],
+                                'started_at': result['started'] - start})
+    cache.evict(keep={spec['key'] for spec in plan.values()})
+
+    seconds = {record['stage']: record['wall_seconds'] for record in records}
+    path_seconds, path = critical_path(plan, seconds)
+    return {
+        'stages': records,
+        'wall_seconds': time.perf_counter() - start,
+        'serial_seconds': sum(seconds.values()),
+        'critical_path_seconds': path_seconds,
+        'critical_path': path,
+        'jobs': jobs,
+        'directories': {name: cache.entry_dir(spec['key']) for name, spec in plan.items()},
+    }
+
+
+def record_run(run, models, path=DEFAULT_RUN_LOG_PATH):
+    """Appends one orchestrator run to the JSONL log."""
+    from src.perf_history import git_state
+
+    record = {
+        'recorded_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        **git_state(),
+        'models': list(models),
+        **{key: run[key] for key in ('jobs', 'wall_seconds', 'serial_seconds',
+                                     'critical_path_seconds', 'critical_path', 'stages')},
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as fh:
+        fh.write(json.dumps(record, sort_keys=True) + '\n')
+    return record
+
+
+def write_metrics(evaluate_dir, path=DEFAULT_METRICS_PATH):
+    """Copies the evaluation of the run to a CSV and returns its rows."""
+    import pandas as pd
+
+    metrics = load_stage_metrics(evaluate_dir)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    pd.DataFrame(metrics).to_csv(path, index=False)
+    return metrics
+
+
+def publish(directories, models_dir='models'):
+    """
+    Copies the outputs of a finished run to the serving paths.
+
+    Args:
+        directories (dict): stage name -> entry directory (`run_pipeline`).
+        models_dir (str): Destination of the champion artifacts.
+
+    Returns:
+        list[str]: The written paths.
+    """
+    from src.training import SPECS_BY_KEY
+
+    copies = [(os.path.join(directory, 'model.pkl'), SPECS_BY_KEY[name[len('fit/'):]]['artifact'])
+              for name, directory in directories.items() if name.startswith('fit/')]
+    if 'verify' in directories:
+        copies += [(os.path.join(directories['verify'], name), os.path.join(models_dir, name))
+                   for name in ('champion_forest.bin', 'champion_bundle.npz', 'scaler.pkl')]
+        copies.append((os.path.join(directories['split'], 'feature_pipeline.npz'),
+                       os.path.join(models_dir, 'feature_pipeline.npz')))
+    for source, destination in copies:
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        # Copy then rename, so a running server never loads a half-written file
+        shutil.copyfile(source, f'{destination}.tmp')
+        os.replace(f'{destination}.tmp', destination)
+    return [destination for _, destination in copies]
+
+
+def main():
+    from src.training import MODEL_SPECS, SPECS_BY_KEY
+
+    parser = argparse.ArgumentParser(description="Build the stale stages of the training DAG.")
+    parser.add_argument('--models', nargs='+', choices=list(SPECS_BY_KEY),
+                        default=[spec['key'] for spec in MODEL_SPECS])
+    parser.add_argument('--input', default=None, help="Raw CSV (default: the notebook data).")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Concurrent stage workers (default: CPU count).")
+    parser.add_argument('--root', default=DEFAULT_STAGE_CACHE_ROOT)
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 2 ** 20,
+                        help="Stage cache LRU size limit in MiB (default: 512).")
+    parser.add_argument('--dry-run', action='store_true', help="Print the plan and exit.")
+    parser.add_argument('--publish', action='store_true',
+                        help="Copy the fitted models and verified artifacts to models/.")
+    parser.add_argument('--worker', metavar='STAGE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_target(args.worker, args.models, args.input, args.root)))
+        return
+
+    if args.dry_run:
+        plan = plan_pipeline(args.models, args.input)
+        stale = stale_targets(plan, StageCache(args.root))
+        for name, spec in plan.items():
+            deps = ', '.join(spec['deps']) or '-'
+            print(f"{'build' if name in stale else 'fresh'}  {name:<22} {spec['key'][:12]}  "
+                  f"<- {deps}")
+        print(f"\n✅ {len(stale)} of {len(plan)} targets stale.")
+        return
+
+    run = run_pipeline(args.models, args.input, args.jobs, args.root, int(args.max_mb * 2 ** 20))
+    record_run(run, args.models)
+    print(f"{'stage':<22} {'status':<11} {'start (s)':>9} {'wall (s)':>9} {'peak RSS':>9}")
+    for record in sorted(run['stages'], key=lambda record: record['started_at']):
+        rss = f"{record['peak_rss_mb']:.0f} MB" if record['peak_rss_mb'] else '-'
+        print(f"{record['stage']:<22} {record['status']:<11} {record['started_at']:>9.2f} "
+              f"{record['wall_seconds']:>9.2f} {rss:>9}")
+    print(f"\nWall {run['wall_seconds']:.2f}s with {run['jobs']} jobs; stages sum to "
+          f"{run['serial_seconds']:.2f}s; critical path {run['critical_path_seconds']:.2f}s "
+          f"({' -> '.join(run['critical_path'])}).")
+    directories = run['directories']
+    if 'evaluate' in directories:
+        metrics = write_metrics(directories['evaluate'])
+        print()
+        for row in metrics:
+            print(f"{row['model']:<16} R² {row['r2']:.4f}  MAE {row['mae']:,.0f}  "
+                  f"RMSE {row['rmse']:,.0f}")
+        print(f"\n✅ Metrics written to '{DEFAULT_METRICS_PATH}', run logged to "
+              f"'{DEFAULT_RUN_LOG_PATH}'.")
+    if 'verify' in directories:
+        verification = load_stage_verification(directories['verify'])
+        print(f"✅ {verification['model']} exported and verified: R² {verification['r2']:.4f}, "
+              f"MAE {verification['mae']:,.0f}.")
+    if args.publish:
+        for path in publish(directories):
+            print(f"✅ Published '{path}'.")
+    elif 'verify' in directories:
+        print(f"   Artifacts stay in '{directories['verify']}'; rerun with --publish to "
+              f"update models/.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Multi-process sharded batch scoring with shared read-only model memory.
+
+The input CSV is split into byte-range shards aligned on line boundaries. Each
+worker process parses its own shard, predicts it and returns the rendered CSV
+rows; the parent writes shards back in input order. The forest is never pickled
+to the workers: every worker opens the same memory-mapped `.bin` artifact
+(`src/artifact_format.py`), so all processes share one page-cache copy of the
+node arrays. At most `2 x workers` shards are in flight, which keeps memory
+bounded on extracts of any size.
+
+Usage (from the repository root):
+
+    python -m src.parallel_scoring applicants.csv scored.csv --workers 8
+    python -m src.parallel_scoring --benchmark --rows 2000000
+"""
+import argparse
+import io
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.artifact_format import DEFAULT_ARTIFACT_PATH, open_artifact, write_artifact
+from src.batch import RAW_COLUMNS, load_default_runtime
+from src.schema import RAW_READ_DTYPES
+from src.score_csv import PREDICTION_COLUMN, restore_integers, score_chunk
+
+DEFAULT_SHARD_BYTES = 8 * 1024 * 1024
+
+# Per-process runtime, opened once by the pool initializer
+_worker_runtime = None
+
+
+# ==============================================================================
+# 1. SHARD PLANNING
+# ==============================================================================
+def plan_shards(path, shard_bytes=DEFAULT_SHARD_BYTES):
+    """
+    Splits a CSV into line-aligned byte ranges (header excluded).
+
+    Note: assumes no quoted field contains a newline, which holds for the raw
+    applicant schema.
+
+    Returns:
+        tuple: (header bytes, list of (start, end) offsets)
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as fh:
+        header = fh.readline()
+        shards, start = [], fh.tell()
+        while start < size:
+            fh.seek(min(start + shard_bytes, size))
+            fh.readline()  # advance to the end of the current line
+            end = min(fh.tell(), size)
+            shards.append((start, end))
+            start = end
+    return header, shards
+
+
+# ==============================================================================
+# 2. WORKER SIDE
+# ==============================================================================
+def _init_worker(artifact_path):
+    global _worker_runtime
+    # The parent already validated the checksum; workers only map the file
+    _worker_runtime = open_artifact(artifact_path, verify=False)
+
+
+def _score_shard(task):
+    """Parses, scores and renders one shard. Runs inside a worker process."""
+    path, header, start, end, predictions_only = task
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        data = fh.read(end - start)
+    chunk = pd.read_csv(io.BytesIO(header + data), dtype=RAW_READ_DTYPES)
+    predictions = np.round(score_chunk(chunk, _worker_runtime), 4)
+    if predictions_only:
+        out = pd.DataFrame({PREDICTION_COLUMN: predictions})
+    else:
+        out = restore_integers(chunk).assign(**{PREDICTION_COLUMN: predictions})
+    return len(chunk), out.to_csv(index=False, header=False).encode('utf-8')
+
+
+# ==============================================================================
+# 3. PARENT SIDE
+# ==============================================================================
+def score_csv_parallel(input_path, output_path, workers=None, shard_bytes=DEFAULT_SHARD_BYTES,
+                       predictions_only=False, artifact_path=DEFAULT_ARTIFACT_PATH, log=sys.stderr):
+    """
+    Scores `input_path` across a process pool and writes `output_path` in input order.
+
+    If no `.bin` artifact exists, the default runtime is written to a temporary
+    artifact so workers can still share it through the page cache.
+
+    Returns:
+        dict: Summary with 'rows', 'seconds', 'rows_per_second' and 'workers'.
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    temp_artifact = None
+    if not os.path.exists(artifact_path):
+        runtime = load_default_runtime()
+        if runtime is None:
+            raise FileNotFoundError("No model artifact found in 'models/'.")
+        fd, temp_artifact = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        write_artifact(runtime, temp_artifact)
+        artifact_path = temp_artifact
+    else:
+        open_artifact(artifact_path, verify=True)
+
+    header, shards = plan_shards(input_path, shard_bytes)
+    columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+    missing = [col for col in RAW_COLUMNS if col not in columns]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {missing}")
+    # Header comes from the plan, so an input without rows still gets one
+    columns = [PREDICTION_COLUMN] if predictions_only else columns + [PREDICTION_COLUMN]
+
+    rows = 0
+    try:
+        ctx = mp.get_context('spawn' if sys.platform == 'win32' else 'fork')
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(artifact_path,)) as pool, \
+                open(output_path, 'wb') as out:
+            out.write(pd.DataFrame(columns=columns).to_csv(index=False).encode('utf-8'))
+            pending = deque()
+            tasks = iter(shards)
+            while True:
+                # Keep a bounded number of shards in flight
+                while len(pending) < 2 * workers:
+                    shard = next(tasks, None)
+                    if shard is None:
+                        break
+                    task = (input_path, header, shard[0], shard[1], predictions_only)
+                    pending.append(pool.apply_async(_score_shard, (task,)))
+                if not pending:
+                    break
+                n_rows, body = pending.popleft().get()
+                out.write(body)
+                rows += n_rows
+                if log is not None:
+                    elapsed = time.perf_counter() - start
+                    print(f"  {rows:,} rows scored ({rows / elapsed:,.0f} rows/s)", file=log)
+    finally:
+        if temp_artifact:
+            os.remove(temp_artifact)
+
+    seconds = time.perf_counter() - start
+    return {'rows': rows, 'seconds': seconds, 'workers': workers,
+            'rows_per_second': rows / seconds if seconds else 0.0}
+
+
+# ==============================================================================
+# 4. SYNTHETIC DATA & SCALING BENCHMARK
+# ==============================================================================
+def write_synthetic_applicants(path, n_rows, seed=0, chunk_rows=500_000):
+    """
+    Writes a synthetic extract in the raw applicant schema, drawn from the
+    marginal distributions of `medical_insurance_data.csv`.
+    """
+    rng = np.random.default_rng(seed)
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        n = min(chunk_rows, n_rows - start)
+        frame = pd.DataFrame({
+            'age': rng.integers(18, 65, n),
+            'sex': rng.choice(['male', 'female'], n),
+            'bmi': np.round(np.clip(rng.normal(30.7, 6.1, n), 15.0, 53.0), 2),
+            'children': rng.choice(6, n, p=[0.43, 0.24, 0.18, 0.12, 0.02, 0.01]),
+            'smoker': rng.choice(['yes', 'no'], n, p=[0.2, 0.8]),
+            'region': rng.choice(['southeast', 'southwest', 'northwest', 'northeast'], n),
+        })
+        frame.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+
+
+def benchmark_scaling(input_paths, worker_counts, shard_bytes=DEFAULT_SHARD_BYTES):
+    """
+    Times `score_csv_parallel` for each worker count and input file.
+
+    Returns:
+        list[dict]: One record per (input, workers) with rows/s and speedup.
+    """
+    results = []
+    for path in input_paths:
+        baseline = None
+        for workers in worker_counts:
+            with tempfile.NamedTemporaryFile(suffix='.csv') as out:
+                summary = score_csv_parallel(path, out.name, workers=workers,
+                                             shard_bytes=shard_bytes, predictions_only=True, log=None)
+            baseline = baseline or summary['rows_per_second']
+            results.append({
+                'input': os.path.basename(path),
+                'workers': workers,
+                'rows': summary['rows'],
+                'seconds': round(summary['seconds'], 3),
+                'rows_per_second': round(summary['rows_per_second']),
+                'speedup': round(summary['rows_per_second'] / baseline, 2),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded multi-process scoring of applicant CSVs.")
+    parser.add_argument('input', nargs='?')
+    parser.add_argument('output', nargs='?')
+    parser.add_argument('--workers', type=int, default=None, help="Default: all CPU cores.")
+    parser.add_argument('--shard-mb', type=float, default=DEFAULT_SHARD_BYTES / (1024 * 1024))
+    parser.add_argument('--predictions-only', action='store_true')
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Measure scaling on a synthetic extract and the real dataset.")
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help="Synthetic rows for --benchmark.")
+    args = parser.parse_args()
+    shard_bytes = int(args.shard_mb * 1024 * 1024)
+
+    if args.benchmark:
+        cores = os.cpu_count() or 1
+        counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+        with tempfile.TemporaryDirectory() as tmp:
+            synthetic = os.path.join(tmp, 'synthetic_applicants.csv')
+            write_synthetic_applicants(synthetic, args.rows)
+            results = benchmark_scaling([synthetic, 'data/medical_insurance_data.csv'],
+                                        counts, shard_bytes)
+        print(pd.DataFrame(results).to_string(index=False))
+        return
+
+    if not (args.input and args.output):
+        parser.error("input and output are required unless --benchmark is given")
+    summary = score_csv_parallel(args.input, args.output, args.workers, shard_bytes,
+                                 args.predictions_only)
+    print(f"✅ Scored {summary['rows']:,} rows with {summary['workers']} workers in "
+          f"{summary['seconds']:.2f}s ({summary['rows_per_second']:,.0f} rows/s) -> '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
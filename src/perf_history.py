@@ -0,0 +1,396 @@
+"""
+Performance regression history: `final_model_comparison.csv`, but for speed.
+
+Every benchmark run (`src/benchmark.py`) is flattened into per-metric sample
+summaries (n / mean / std) and appended to a JSONL store, keyed by git commit and
+a machine fingerprint. `compare` pools all runs of a baseline commit and of a
+candidate commit recorded on the same machine and applies Welch's t-test to each
+metric; a regression is flagged only when the slowdown is both statistically
+significant and larger than a minimum relative change.
+
+Single-valued metrics (load time, peak RSS, p99) only become testable once a
+commit has at least two runs; with one run per side they are reported as
+"untested" when they move by more than the threshold.
+
+Usage (from the repository root):
+
+    python -m src.perf_history record                     # run the suite and append
+    python -m src.perf_history record --results data/processed/benchmark_results.json
+    python -m src.perf_history list
+    python -m src.perf_history compare --baseline previous
+    python -m src.perf_history compare --baseline 5b9d1cc --candidate HEAD
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+
+DEFAULT_HISTORY_PATH = 'data/processed/perf_history.jsonl'
+DEFAULT_COMPARISON_PATH = 'data/processed/perf_comparison.csv'
+
+DEFAULT_ALPHA = 0.01
+DEFAULT_MIN_CHANGE = 0.05
+
+
+# ==============================================================================
+# 1. RUN IDENTITY (commit + machine fingerprint)
+# ==============================================================================
+def _git(*args):
+    try:
+        proc = subprocess.run(['git'] + list(args), capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.strip()
+
+
+def git_state():
+    """
+    Returns:
+        dict: 'commit' (full SHA or None) and 'dirty' (uncommitted tracked changes).
+    """
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+    }
+
+
+def resolve_commit(ref):
+    """Resolves a commit-ish (SHA prefix, HEAD~1, tag) to a full SHA, or returns `ref`."""
+    return _git('rev-parse', '--verify', '--quiet', f'{ref}^{{commit}}') or ref
+
+
+def _cpu_model():
+    try:
+        with open('/proc/cpuinfo') as fh:
+            for line in fh:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def machine_fingerprint():
+    """
+    Hash of the hardware characteristics that drive benchmark numbers. The
+    hostname is deliberately excluded (containers get a new one on every start).
+
+    Returns:
+        tuple: (12-hex-digit fingerprint, dict of the fingerprinted fields)
+    """
+    try:
+        memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        memory = None
+    fields = {
+        'system': platform.system(),
+        'machine': platform.machine(),
+        'cpu_model': _cpu_model(),
+        'cpu_count': os.cpu_count(),
+        'memory_gb': round(memory / 2 ** 30) if memory else None,
+        'python': '.'.join(platform.python_version_tuple()[:2]),
+    }
+    digest = hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+    return digest[:12], fields
+
+
+# ==============================================================================
+# 2. METRIC EXTRACTION
+# ==============================================================================
+def _metric(mean, std=0.0, n=1, unit='', higher_is_better=False):
+    return {'mean': float(mean), 'std': float(std or 0.0), 'n': int(n),
+            'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def extract_metrics(results):
+    """
+    Flattens a benchmark results dict into `name -> sample summary`.
+
+    Returns:
+        dict: Metric name -> {'mean', 'std', 'n', 'unit', 'higher_is_better'}.
+    """
+    metrics = {}
+    for engine, res in results.get('engines', {}).items():
+        if 'error' in res:
+            continue
+        lat = res['latency']
+        metrics[f'{engine}/latency_mean'] = _metric(lat['mean_us'], lat.get('std_us'),
+                                                    lat['samples'], 'us')
+        metrics[f'{engine}/latency_p99'] = _metric(lat['p99_us'], unit='us')
+        for size, stats in res['throughput'].items():
+            metrics[f'{engine}/throughput@{size}'] = _metric(
+                stats.get('mean_rows_per_second', stats['rows_per_second']),
+                stats.get('std_rows_per_second'), stats['repeats'], 'rows/s', True)
+        metrics[f'{engine}/load_time'] = _metric(res['load_seconds'] * 1e3, unit='ms')
+        metrics[f'{engine}/peak_rss'] = _metric(res['peak_rss_mb'], unit='MB')
+    for module, res in results.get('imports', {}).items():
+        if 'error' in res:
+            continue
+        metrics[f'import/{module}'] = _metric(
+            res.get('mean_seconds', res['median_seconds']) * 1e3,
+            res.get('std_seconds', 0.0) * 1e3, results['config'].get('import_repeats', 1), 'ms')
+    for name, res in results.get('training', {}).items():
+        if 'error' in res:
+            continue
+        metrics[f'training/{name}'] = _metric(res['mean_seconds'], res['std_seconds'],
+                                              res['repeats'], 's')
+    return metrics
+
+
+# ==============================================================================
+# 3. HISTORY STORE (append-only JSONL)
+# ==============================================================================
+def record_run(results, path=DEFAULT_HISTORY_PATH):
+    """
+    Appends one benchmark run to the history.
+
+    Returns:
+        dict: The stored record.
+    """
+    fingerprint, fields = machine_fingerprint()
+    record = {
+        'recorded_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'created_at': results.get('created_at'),
+        **git_state(),
+        'machine_fingerprint': fingerprint,
+        'machine': fields,
+        'config': results.get('config', {}),
+        'metrics': extract_metrics(results),
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as fh:
+        fh.write(json.dumps(record, sort_keys=True) + '\n')
+    return record
+
+
+def load_history(path=DEFAULT_HISTORY_PATH):
+    """Returns all stored runs in recording order (empty list if no history yet)."""
+    if not os.path.exists(path):
+        return []
+    with open(path) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+# ==============================================================================
+# 4. STATISTICS
+# ==============================================================================
+def pool_samples(summaries):
+    """
+    Combines per-run (n, mean, std) summaries into one, keeping between-run
+    variance (parallel-variance formula).
+
+    Returns:
+        tuple: (n, mean, variance)
+    """
+    n = sum(s['n'] for s in summaries)
+    mean = sum(s['n'] * s['mean'] for s in summaries) / n
+    m2 = sum((s['n'] - 1) * s['std'] ** 2 + s['n'] * (s['mean'] - mean) ** 2 for s in summaries)
+    return n, mean, m2 / (n - 1) if n > 1 else 0.0
+
+
+def _betainc(a, b, x):
+    """Regularized incomplete beta I_x(a, b) by Lentz's continued fraction."""
+    if x <= 0.0 or x >= 1.0:
+        return 0.0 if x <= 0.0 else 1.0
+    if x > (a + 1.0) / (a + b + 2.0):
+        # The fraction converges fast only below the mean; use the symmetry
+        return 1.0 - _betainc(b, a, 1.0 - x)
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x)) / a
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= c * d
+        if abs(c * d - 1.0) < 1e-15:
+            break
+    return front * result
+
+
+def welch_test(n1, mean1, var1, n2, mean2, var2):
+    """
+    Two-sided Welch's t-test on summary statistics.
+
+    The Student t tail comes from the regularized incomplete beta function
+    (P(|T| > t) = I_{dof / (dof + t²)}(dof / 2, 1 / 2)), so no SciPy is needed.
+
+    Returns:
+        float | None: p-value, or None when either side has fewer than two
+        samples or both variances are zero.
+    """
+    if n1 < 2 or n2 < 2:
+        return None
+    se2 = var1 / n1 + var2 / n2
+    if se2 == 0:
+        return None if mean1 == mean2 else 0.0
+    t = (mean2 - mean1) / math.sqrt(se2)
+    dof = se2 ** 2 / ((var1 / n1) ** 2 / (n1 - 1) + (var2 / n2) ** 2 / (n2 - 1))
+    return _betainc(dof / 2.0, 0.5, dof / (dof + t * t))
+
+
+# ==============================================================================
+# 5. COMPARISON
+# ==============================================================================
+def _runs_for(history, commit, fingerprint):
+    return [r for r in history if r['commit'] == commit and r['machine_fingerprint'] == fingerprint]
+
+
+def select_commits(history, baseline, candidate=None, fingerprint=None):
+    """
+    Resolves the baseline / candidate commits and the machine to compare on.
+
+    `candidate` defaults to the most recently recorded commit for the machine;
+    `baseline='previous'` picks the last recorded commit before it.
+
+    Raises:
+        ValueError: If either commit has no runs on the selected machine.
+    """
+    fingerprint = fingerprint or machine_fingerprint()[0]
+    runs = [r for r in history if r['machine_fingerprint'] == fingerprint]
+    if not runs:
+        raise ValueError(f"No runs recorded for machine {fingerprint}.")
+    candidate = resolve_commit(candidate) if candidate else runs[-1]['commit']
+    if baseline == 'previous':
+        earlier = [r['commit'] for r in runs if r['commit'] != candidate]
+        if not earlier:
+            raise ValueError("No earlier commit recorded on this machine to compare with.")
+        baseline = earlier[-1]
+    else:
+        baseline = resolve_commit(baseline)
+    for label, commit in (('Baseline', baseline), ('Candidate', candidate)):
+        if not _runs_for(history, commit, fingerprint):
+            raise ValueError(f"{label} commit {commit} has no runs on machine {fingerprint}.")
+    return baseline, candidate, fingerprint
+
+
+def compare_runs(history, baseline, candidate, fingerprint,
+                 alpha=DEFAULT_ALPHA, min_change=DEFAULT_MIN_CHANGE):
+    """
+    Compares every metric present in both commits' runs.
+
+    Returns:
+        pd.DataFrame: One row per metric with the change, p-value and status,
+        regressions first.
+    """
+    import pandas as pd
+
+    base_runs = _runs_for(history, baseline, fingerprint)
+    cand_runs = _runs_for(history, candidate, fingerprint)
+    names = sorted(set.intersection(*[set(r['metrics']) for r in base_runs + cand_runs]))
+
+    rows = []
+    for name in names:
+        base = [r['metrics'][name] for r in base_runs]
+        cand = [r['metrics'][name] for r in cand_runs]
+        n1, mean1, var1 = pool_samples(base)
+        n2, mean2, var2 = pool_samples(cand)
+        higher_is_better = base[0]['higher_is_better']
+        change = (mean2 - mean1) / mean1 if mean1 else 0.0
+        worse = change < 0 if higher_is_better else change > 0
+        p_value = welch_test(n1, mean1, var1, n2, mean2, var2)
+
+        if abs(change) < min_change:
+            status = 'No significant change'
+        elif p_value is None:
+            status = '⚠️ Untested regression' if worse else 'Untested improvement'
+        elif p_value >= alpha:
+            status = 'No significant change'
+        else:
+            status = '🔴 REGRESSION' if worse else '🟢 Improvement'
+        rows.append({
+            'Metric': name,
+            'Unit': base[0]['unit'],
+            'Baseline': round(mean1, 4),
+            'Candidate': round(mean2, 4),
+            'Change_%': round(100 * change, 2),
+            'p_value': None if p_value is None else float(f'{p_value:.3g}'),
+            'Runs': f'{len(base_runs)} vs {len(cand_runs)}',
+            'Status': status,
+        })
+    order = {'🔴 REGRESSION': 0, '⚠️ Untested regression': 1, '🟢 Improvement': 2}
+    frame = pd.DataFrame(rows)
+    if frame.empty:
+        return frame
+    return frame.sort_values('Status', key=lambda s: s.map(order).fillna(3), kind='stable')
+
+
+# ==============================================================================
+# 6. COMMAND-LINE ENTRY POINT
+# ==============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Record and compare benchmark runs across commits.")
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="Run the benchmark suite (or import a result file) and append it.")
+    rec.add_argument('--results', help="Existing `python -m src.benchmark` JSON to import.")
+    rec.add_argument('--skip-training', action='store_true')
+
+    sub.add_parser('list', help="Show recorded runs.")
+
+    cmp_ = sub.add_parser('compare', help="Flag significant regressions against a baseline commit.")
+    cmp_.add_argument('--baseline', default='previous',
+                      help="Commit-ish, or 'previous' for the last other recorded commit.")
+    cmp_.add_argument('--candidate', default=None, help="Default: latest recorded commit.")
+    cmp_.add_argument('--machine', default=None, help="Fingerprint. Default: this machine.")
+    cmp_.add_argument('--alpha', type=float, default=DEFAULT_ALPHA)
+    cmp_.add_argument('--min-change', type=float, default=DEFAULT_MIN_CHANGE,
+                      help="Minimum relative change to report (0.05 = 5%%).")
+    cmp_.add_argument('--output', default=DEFAULT_COMPARISON_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        if args.results:
+            with open(args.results) as fh:
+                results = json.load(fh)
+        else:
+            from src.benchmark import run_suite
+            results = run_suite(training=not args.skip_training)
+        record = record_run(results, args.history)
+        dirty = ' (uncommitted changes)' if record['dirty'] else ''
+        print(f"✅ Recorded {len(record['metrics'])} metrics for commit "
+              f"{(record['commit'] or 'unknown')[:10]}{dirty} on machine "
+              f"{record['machine_fingerprint']} -> '{args.history}'")
+        return
+
+    history = load_history(args.history)
+    if args.command == 'list':
+        import pandas as pd
+        if not history:
+            print(f"No runs recorded in '{args.history}'.")
+            return
+        print(pd.DataFrame([{
+            'recorded_at': r['recorded_at'], 'commit': (r['commit'] or '')[:10],
+            'dirty': r['dirty'], 'machine': r['machine_fingerprint'], 'metrics': len(r['metrics']),
+        } for r in history]).to_string(index=False))
+        return
+
+    try:
+        baseline, candidate, fingerprint = select_commits(history, args.baseline,
+                                                          args.candidate, args.machine)
+    except ValueError as e:
+        parser.error(str(e))
+    report = compare_runs(history, baseline, candidate, fingerprint, args.alpha, args.min_change)
+    report.to_csv(args.output, index=False)
+    print(f"Baseline {baseline[:10]} vs candidate {candidate[:10]} on machine {fingerprint}\n")
+    print(report.to_string(index=False, float_format=lambda v: f'{v:.6g}'))
+    regressions = int((report['Status'] == '🔴 REGRESSION').sum()) if not report.empty else 0
+    print(f"\n{'❌' if regressions else '✅'} {regressions} significant regression(s) "
+          f"(alpha={args.alpha}, min change={args.min_change:.0%}). Report saved to '{args.output}'.")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
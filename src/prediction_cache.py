@@ -0,0 +1,148 @@
+"""
+Bounded LRU / TTL cache of premiums, keyed on the canonical encoded profile.
+
+Keys are the bytes of the encoded 9-feature row produced by `encode_batch`, so
+'Male' / 'male', 30 / 30.0 and bool / 'yes' spellings of the same applicant hit
+the same entry. Entries expire after `ttl_seconds` and the least recently used
+ones are evicted beyond `max_entries`. The cache remembers the checksum of the
+model that produced its entries and clears itself when a different checksum is
+presented. Callers that serve through `src.batch.RuntimeWatcher` (the server,
+the dashboard, `predict_batch` without a runtime) reload a replaced artifact
+within seconds, so a swapped model never serves stale premiums.
+
+    cache = PredictionCache(max_entries=50_000, ttl_seconds=3600)
+    predict_batch(records, runtime, cache=cache)
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.instrumentation import stage
+
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with per-entry expiry.
+
+    Args:
+        max_entries (int): Capacity; the least recently used entry is evicted beyond it.
+        ttl_seconds (float | None): Entry lifetime (None = no expiry).
+
+    Attributes:
+        hits / misses / evictions / expirations / invalidations (int): Counters.
+        model_checksum (str | None): Checksum of the model the entries belong to.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.model_checksum = None
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (premium, expires_at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def keys_for(X):
+        """Canonical keys of encoded rows (`+ 0.0` folds -0.0 into 0.0)."""
+        X = np.ascontiguousarray(X, dtype=np.float64) + 0.0
+        return [row.tobytes() for row in X]
+
+    def _check_model(self, model_checksum):
+        # Caller holds the lock
+        if model_checksum != self.model_checksum:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self.model_checksum = model_checksum
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_many(self, keys, model_checksum=None):
+        """
+        Returns:
+            tuple: (premiums float64 array with NaN for misses, indices of the misses)
+        """
+        values = np.full(len(keys), np.nan)
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            self._check_model(model_checksum)
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.append(i)
+                    continue
+                self._entries.move_to_end(key)
+                values[i] = entry[0]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return values, np.asarray(missing, dtype=np.int64)
+
+    def put_many(self, keys, premiums, model_checksum=None):
+        expires_at = None if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._check_model(model_checksum)
+            for key, premium in zip(keys, premiums):
+                self._entries[key] = (float(premium), expires_at)
+                self._entries.move_to_end(key)
+            overflow = len(self._entries) - self.max_entries
+            for _ in range(max(overflow, 0)):
+                self._entries.popitem(last=False)
+            self.evictions += max(overflow, 0)
+
+    def predict(self, X, compute, model_checksum=None):
+        """
+        Answers encoded rows from the cache and computes only the misses, once
+        per distinct profile, with a single `compute(X_missing)` call.
+
+        Args:
+            X (np.ndarray): Encoded raw-unit rows, shape (n, 9).
+            compute (callable): Model prediction for encoded rows.
+            model_checksum (str, optional): Checksum of the model behind `compute`.
+
+        Returns:
+            np.ndarray[float64]: One premium per row.
+        """
+        with stage('cache_lookup'):
+            keys = self.keys_for(X)
+            values, missing = self.get_many(keys, model_checksum)
+        if missing.size:
+            # Duplicate profiles within the batch are predicted once
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            unique_rows = np.fromiter(first.values(), dtype=np.int64, count=len(first))
+            premiums = compute(X[unique_rows])
+            by_key = dict(zip(first, premiums))
+            values[missing] = [by_key[keys[i]] for i in missing]
+            self.put_many(list(first), premiums, model_checksum)
+        return values
+
+    def stats(self):
+        """
+        Returns:
+            dict: Counters plus 'size' and 'hit_rate', for the metrics export.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'expirations': self.expirations, 'invalidations': self.invalidations,
+                'size': len(self._entries), 'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,217 @@
+"""
+Precomputed dense premium table over the dashboard's entire input domain.
+
+The form in `app/main.py` only admits a finite domain:
+
+    age 18-100 (int) x BMI 10.0-60.0 (0.1 steps) x sex (2) x children 0-5
+    x smoker (2) x region (4)  ~= 4.0M profiles
+
+`build_premium_table` evaluates the champion forest over that whole grid in
+vectorized batches and stores the premiums as a float32 `.npy` (memory-mapped on
+load) plus a JSON sidecar describing the axes and the source model checksum.
+Each request then becomes a single array index.
+
+    python -m src.premium_table              # build from models/champion_forest.bin
+    python -m src.premium_table --verify     # spot-check the table against the model
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from src.artifact_format import DEFAULT_ARTIFACT_PATH, open_artifact
+from src.batch import encode_batch
+
+DEFAULT_TABLE_PATH = 'models/premium_table.npy'
+
+# ==============================================================================
+# 1. INPUT DOMAIN (mirrors the widgets in app/main.py)
+# ==============================================================================
+AGE_MIN, AGE_MAX = 18, 100
+BMI_MIN, BMI_MAX, BMI_STEPS_PER_UNIT = 10.0, 60.0, 10
+SEXES = ('Male', 'Female')                                   # encoded 0 / 1
+CHILDREN_MAX = 5
+SMOKER = (False, True)                                       # encoded 0 / 1
+REGIONS = ('Northeast', 'Northwest', 'Southeast', 'Southwest')  # one-hot order (NE dropped)
+
+N_AGE = AGE_MAX - AGE_MIN + 1
+N_BMI = int(round((BMI_MAX - BMI_MIN) * BMI_STEPS_PER_UNIT)) + 1
+SHAPE = (N_AGE, N_BMI, len(SEXES), CHILDREN_MAX + 1, len(SMOKER), len(REGIONS))
+AXES = ('age', 'bmi', 'sex', 'children', 'smoker', 'region')
+
+# BMI values further than this from the 0.1 grid are answered by the model instead
+BMI_GRID_TOLERANCE = 1e-6
+
+BMI_GRID = np.round(BMI_MIN + np.arange(N_BMI) / BMI_STEPS_PER_UNIT, 1)
+
+
+def _sidecar_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def encode_profile(age, sex, bmi, children, smoker, region):
+    """Encodes one form submission into the raw-unit model vector (shape (1, 9))."""
+    return encode_batch({
+        'age': [age], 'sex': [sex], 'bmi': [bmi], 'children': [children],
+        'smoker': [smoker], 'region': [region],
+    })
+
+
+# ==============================================================================
+# 2. BUILD STEP
+# ==============================================================================
+def _age_slice_matrix(age):
+    """
+    Encoded raw-unit matrix for every (bmi, sex, children, smoker, region) at one age,
+    in C order of the table's trailing axes.
+    """
+    bmi, sex, children, smoker, region = np.meshgrid(
+        BMI_GRID, np.arange(len(SEXES)), np.arange(CHILDREN_MAX + 1),
+        np.arange(len(SMOKER)), np.arange(len(REGIONS)), indexing='ij',
+    )
+    return encode_batch({
+        'age': np.full(bmi.size, age),
+        'sex': sex.ravel(),
+        'bmi': bmi.ravel(),
+        'children': children.ravel(),
+        'smoker': smoker.ravel(),
+        'region': region.ravel(),  # axis order == REGION_CODES order
+    })
+
+
+def build_premium_table(runtime, path=DEFAULT_TABLE_PATH):
+    """
+    Evaluates `runtime` over the full input domain, one age slice per batch.
+
+    Args:
+        runtime (InferenceRuntime): Model used to fill the table.
+        path (str): Output `.npy` location (a `.json` sidecar is written next to it).
+
+    Returns:
+        dict: The sidecar metadata.
+    """
+    table = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=SHAPE)
+    for i, age in enumerate(range(AGE_MIN, AGE_MAX + 1)):
+        premiums = runtime.predict_raw(_age_slice_matrix(age))
+        table[i] = premiums.reshape(SHAPE[1:])
+    table.flush()
+    del table
+
+    meta = {
+        'axes': list(AXES),
+        'shape': list(SHAPE),
+        'age_min': AGE_MIN,
+        'bmi_min': BMI_MIN,
+        'bmi_steps_per_unit': BMI_STEPS_PER_UNIT,
+        'sexes': list(SEXES),
+        'regions': list(REGIONS),
+        'model_checksum': runtime.checksum,
+    }
+    with open(_sidecar_path(path), 'w') as fh:
+        json.dump(meta, fh, indent=2)
+    return meta
+
+
+# ==============================================================================
+# 3. LOOKUP PATH
+# ==============================================================================
+class PremiumTable:
+    """
+    Read-only, memory-mapped premium table.
+
+    Attributes:
+        table (np.memmap[float32]): Premiums with shape `SHAPE`.
+        model_checksum (str): Checksum of the artifact the table was built from.
+    """
+
+    def __init__(self, table, model_checksum=None):
+        self.table = table
+        self.model_checksum = model_checksum
+
+    @classmethod
+    def open(cls, path=DEFAULT_TABLE_PATH):
+        """
+        Maps a table built by `build_premium_table`.
+
+        Raises:
+            ValueError: If the stored table does not match the current domain.
+        """
+        with open(_sidecar_path(path)) as fh:
+            meta = json.load(fh)
+        table = np.load(path, mmap_mode='r')
+        if tuple(table.shape) != SHAPE or tuple(meta['shape']) != SHAPE:
+            raise ValueError(f"Premium table {path} was built for a different input domain.")
+        return cls(table, meta.get('model_checksum'))
+
+    def index(self, age, sex, bmi, children, smoker, region):
+        """
+        Converts one form submission into a table index.
+
+        Returns:
+            tuple | None: Index into `table`, or None when the profile is off-grid.
+        """
+        bmi_pos = int(round((bmi - BMI_MIN) * BMI_STEPS_PER_UNIT))
+        if not (AGE_MIN <= age <= AGE_MAX and 0 <= bmi_pos < N_BMI
+                and 0 <= children <= CHILDREN_MAX and int(children) == children
+                and int(age) == age):
+            return None
+        if abs(BMI_GRID[bmi_pos] - bmi) > BMI_GRID_TOLERANCE:
+            return None
+        if sex not in SEXES or region not in REGIONS:
+            return None
+        return (int(age) - AGE_MIN, bmi_pos, SEXES.index(sex), int(children),
+                int(bool(smoker)), REGIONS.index(region))
+
+    def lookup(self, age, sex, bmi, children, smoker, region):
+        """
+        Returns:
+            float | None: Precomputed premium, or None if the profile is outside the table.
+        """
+        idx = self.index(age, sex, bmi, children, smoker, region)
+        if idx is None:
+            return None
+        return float(self.table[idx])
+
+
+# ==============================================================================
+# 4. COMMAND-LINE ENTRY POINT
+# ==============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the dense premium table.")
+    parser.add_argument('--artifact', default=DEFAULT_ARTIFACT_PATH)
+    parser.add_argument('--output', default=DEFAULT_TABLE_PATH)
+    parser.add_argument('--verify', action='store_true',
+                        help="Compare random table cells with the model instead of building.")
+    args = parser.parse_args()
+
+    runtime = open_artifact(args.artifact)
+    if not args.verify:
+        start = time.perf_counter()
+        build_premium_table(runtime, args.output)
+        elapsed = time.perf_counter() - start
+        size_mb = os.path.getsize(args.output) / 1e6
+        print(f"✅ Premium table saved to '{args.output}' "
+              f"({np.prod(SHAPE):,} profiles, {size_mb:.1f} MB, {elapsed:.1f}s).")
+        return
+
+    table = PremiumTable.open(args.output)
+    rng = np.random.default_rng(0)
+    worst = 0.0
+    for _ in range(2000):
+        age = int(rng.integers(AGE_MIN, AGE_MAX + 1))
+        bmi = float(BMI_GRID[rng.integers(0, N_BMI)])
+        sex = SEXES[rng.integers(0, 2)]
+        children = int(rng.integers(0, CHILDREN_MAX + 1))
+        smoker = bool(rng.integers(0, 2))
+        region = REGIONS[rng.integers(0, 4)]
+        expected = runtime.predict_raw(encode_profile(age, sex, bmi, children, smoker, region))[0]
+        worst = max(worst, abs(table.lookup(age, sex, bmi, children, smoker, region) - expected))
+    stale = table.model_checksum != runtime.checksum
+    print(f"Max abs difference over 2000 profiles: {worst:.4f} (float32 storage)")
+    print(f"Model checksum matches: {'NO (rebuild required)' if stale else 'YES'}")
+
+
+if __name__ == '__main__':
+    main()
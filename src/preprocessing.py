@@ -0,0 +1,400 @@
+"""
+Preprocessing of `data/medical_insurance_data.csv`, ported from
+`notebooks/03_data_preprocessing.ipynb`, with duplicate-aware weighting.
+
+The raw file repeats most applicants verbatim (2,736 complete rows, 1,337
+distinct), so the notebook split trains every model on each profile about twice
+and lets the same profile land in both `X_train.csv` and `X_test.csv`. Two
+pipelines are provided:
+
+    * golden   - the notebook's steps (dropna, binary / one-hot encoding, KMeans
+                 on age/bmi/charges, 80/20 split, StandardScaler), run through the
+                 shared `src.feature_pipeline.FeaturePipeline`. It reproduces the
+                 committed `data/X_*.csv` / `data/y_*.csv`.
+    * weighted - exact duplicates are collapsed into unique rows carrying an
+                 integer `sample_weight` (their multiplicity). KMeans and the
+                 scaler are fitted with those weights and the split is drawn over
+                 unique profiles, so no profile crosses it. Fitting a model on the
+                 unique rows with `sample_weight` is equivalent to fitting on the
+                 repeated rows, at about half the rows.
+
+Usage (from the repository root):
+
+    python -m src.preprocessing --verify    # golden pipeline vs the committed CSVs
+    python -m src.preprocessing --leakage   # duplicates crossing the golden split
+    python -m src.preprocessing --cache     # golden split -> columnar cache
+    python -m src.preprocessing --weighted  # weighted split -> columnar cache
+    python -m src.preprocessing --weighted --csv   # ... plus an optional CSV export
+    python -m src.preprocessing --compare-fit      # weighted vs repeated-row fits
+
+Both splits are stored as memory-mapped columns (`src.columnar_cache`) under
+`data/processed/cache/<golden|weighted>/`; training maps them instead of
+parsing the CSVs.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.columnar_cache import cache_dir, is_fresh, open_cache, write_cache
+from src.feature_pipeline import FeaturePipeline
+from src.schema import FEATURE_NAMES, compact_frame, raw_out_of_range, verify_order
+
+RAW_DATA_PATH = 'data/medical_insurance_data.csv'
+DEFAULT_WEIGHTED_DIR = 'data/processed/weighted'
+DEFAULT_LEAKAGE_PATH = 'data/processed/duplicate_leakage.csv'
+
+RAW_COLUMNS = ('age', 'sex', 'bmi', 'children', 'smoker', 'region', 'charges')
+TARGET = 'charges'
+WEIGHT = 'sample_weight'
+
+# Notebook split settings (KMeans / scaler settings live in src.feature_pipeline)
+TEST_SIZE = 0.2
+SPLIT_RANDOM_STATE = 101
+
+
+# ==============================================================================
+# 1. NOTEBOOK STEPS
+# ==============================================================================
+def load_clean(path=RAW_DATA_PATH):
+    """Loads the raw CSV and drops incomplete rows (notebook: `df.dropna()`)."""
+    import pandas as pd
+
+    return pd.read_csv(path).dropna().reset_index(drop=True)
+
+
+def split_indices(n_rows):
+    """
+    Row positions of the notebook's 80/20 split (random_state=101).
+
+    `train_test_split` shuffles by row count only, so these are the rows the
+    notebook's split of the encoded frame selected.
+
+    Returns:
+        tuple: (train row positions, test row positions)
+    """
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(n_rows), test_size=TEST_SIZE,
+                            random_state=SPLIT_RANDOM_STATE)
+
+
+def build_split(df, weights=None, cluster_centers=None):
+    """
+    Splits raw rows and transforms them with a `FeaturePipeline` fitted as in
+    the notebook: KMeans on every row, the scaler on the training rows only.
+    Outputs are checked against, and downcast to, the feature schema.
+
+    Args:
+        df (pd.DataFrame): Clean raw rows including `charges`.
+        weights (array-like, optional): Row multiplicities.
+        cluster_centers (np.ndarray, optional): Already fitted KMeans centroids
+            (e.g. from the stage cache); KMeans is then not refitted.
+
+    Returns:
+        dict: X_train, X_test (DataFrames), y_train, y_test (Series), w_train,
+            w_test (arrays, None without weights) and the fitted `pipeline`.
+
+    Raises:
+        ValueError: If age / bmi / children fall outside `src.schema` ranges.
+    """
+    import pandas as pd
+
+    bad = raw_out_of_range(df)
+    if bad.any():
+        raise ValueError(f"{int(bad.sum())} rows fall outside the schema ranges.")
+    train_rows, test_rows = split_indices(len(df))
+    pipeline = FeaturePipeline(cluster_centers=cluster_centers)
+    X = pipeline.fit_transform(df, df[TARGET], train_rows, weights,
+                               cluster_mode='full' if cluster_centers is None else 'frozen')
+    y = df[TARGET].reset_index(drop=True)
+    split = {'pipeline': pipeline}
+    for name, rows in (('train', train_rows), ('test', test_rows)):
+        split[f'X_{name}'] = compact_frame(pd.DataFrame(X[rows], columns=list(FEATURE_NAMES)))
+        split[f'y_{name}'] = y.iloc[rows].reset_index(drop=True)
+        split[f'w_{name}'] = None if weights is None else np.asarray(weights)[rows]
+    return split
+
+
+def golden_split(path=RAW_DATA_PATH):
+    """
+    The notebook pipeline, unchanged: duplicates are kept as separate rows.
+
+    Returns:
+        dict: As `build_split`.
+    """
+    return build_split(load_clean(path))
+
+
+# ==============================================================================
+# 2. DUPLICATE COLLAPSING
+# ==============================================================================
+def collapse_duplicates(df):
+    """
+    Collapses exact duplicate rows into unique rows with an integer weight.
+
+    Returns:
+        pd.DataFrame: Unique rows in order of first appearance, with a
+            `sample_weight` column holding each row's multiplicity.
+    """
+    columns = list(df.columns)
+    counts = df.groupby(columns, sort=False, dropna=False).size()
+    return counts.rename(WEIGHT).reset_index()
+
+
+def weighted_split(path=RAW_DATA_PATH):
+    """
+    Duplicate-aware pipeline: unique profiles with multiplicity weights.
+
+    The split is drawn over unique profiles, so every copy of a profile is on
+    the same side. KMeans and the scaler see each profile with its weight, the
+    same objective as fitting them on the repeated rows.
+
+    Returns:
+        dict: As `build_split`, with weights.
+    """
+    unique = collapse_duplicates(load_clean(path))
+    weights = unique.pop(WEIGHT).to_numpy()
+    return build_split(unique, weights)
+
+
+def save_split_cache(split, name, directory=None, source_path=RAW_DATA_PATH):
+    """
+    Writes a split as a memory-mapped columnar cache (`src.columnar_cache`).
+
+    Args:
+        directory (str, optional): Target directory instead of the named cache.
+
+    Returns:
+        str: The cache directory.
+    """
+    directory = directory or cache_dir(name)
+    write_cache(directory, {
+        'train': {'X': split['X_train'], 'y': split['y_train'], 'w': split['w_train']},
+        'test': {'X': split['X_test'], 'y': split['y_test'], 'w': split['w_test']},
+    }, source_path=source_path)
+    return directory
+
+
+def load_split_cache(name, directory=None):
+    """
+    Maps a cached split without parsing.
+
+    Args:
+        directory (str, optional): Cache directory instead of the named cache.
+
+    Returns:
+        tuple: (X_train DataFrame, X_test DataFrame, y_train, y_test, w_train, w_test)
+            with the targets and weights as read-only 1-D arrays (weights None
+            for the golden split).
+
+    Raises:
+        FileNotFoundError: If the cache was never built.
+    """
+    splits = open_cache(directory or cache_dir(name))
+    train, test = splits['train'], splits['test']
+    verify_order(train.columns, f"cache '{name}'")
+    verify_order(test.columns, f"cache '{name}'")
+    return train.frame(), test.frame(), train.y, test.y, train.w, test.w
+
+
+def export_split_csv(split, output_dir=DEFAULT_WEIGHTED_DIR):
+    """Optional CSV export in the layout of the golden `data/` files."""
+    import pandas as pd
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name in ('X_train', 'X_test', 'y_train', 'y_test', 'w_train', 'w_test'):
+        if split[name] is None:
+            continue
+        # Weights are plain arrays; frames and target Series keep their own headers
+        values = split[name] if hasattr(split[name], 'to_csv') else \
+            pd.Series(split[name], name=WEIGHT)
+        values.to_csv(os.path.join(output_dir, f'{name}.csv'), index=False)
+
+
+def load_weighted_split(data_dir=None):
+    """
+    Loads the weighted split: from the columnar cache, or from a CSV export
+    (`export_split_csv`) when `data_dir` is given.
+
+    Returns:
+        tuple: (X_train DataFrame, X_test DataFrame, y_train, y_test, w_train, w_test)
+            with the targets and weights as 1-D arrays.
+    """
+    if data_dir is None:
+        if not is_fresh(cache_dir('weighted')):
+            raise FileNotFoundError("The weighted split cache is missing or stale; "
+                                    "run: python -m src.preprocessing --weighted")
+        return load_split_cache('weighted')
+
+    import pandas as pd
+
+    def column(name):
+        return pd.read_csv(os.path.join(data_dir, f'{name}.csv')).values.ravel()
+
+    X_train = compact_frame(pd.read_csv(os.path.join(data_dir, 'X_train.csv')))
+    X_test = compact_frame(pd.read_csv(os.path.join(data_dir, 'X_test.csv')))
+    return (X_train, X_test, column('y_train'), column('y_test'),
+            column('w_train'), column('w_test'))
+
+
+# ==============================================================================
+# 3. LEAKAGE REPORT
+# ==============================================================================
+def leakage_report(path=RAW_DATA_PATH):
+    """
+    Lists the raw profiles that the golden split puts on both sides.
+
+    Returns:
+        pd.DataFrame: One row per crossing profile (raw columns, `train_copies`,
+            `test_copies`), most duplicated first.
+    """
+    clean = load_clean(path)
+    _, test_idx = split_indices(len(clean))
+    side = np.full(len(clean), 'train_copies', dtype=object)
+    side[test_idx] = 'test_copies'
+    columns = list(RAW_COLUMNS)
+    counts = clean.assign(side=side).groupby(columns + ['side'], sort=False).size() \
+        .unstack('side', fill_value=0)
+    crossing = counts[(counts['train_copies'] > 0) & (counts['test_copies'] > 0)]
+    return crossing.reset_index().rename_axis(columns=None) \
+        .sort_values(['test_copies', 'train_copies'], ascending=False, kind='stable') \
+        .reset_index(drop=True)
+
+
+# ==============================================================================
+# 4. WEIGHTED VS REPEATED-ROW FITS
+# ==============================================================================
+def fit_with_weights(model, X, y, sample_weight):
+    """
+    Fits `model` with integer sample weights.
+
+    Estimators whose `fit` has no `sample_weight` (KNeighborsRegressor) get the
+    rows repeated by their weight instead, which is exactly what the weight means.
+
+    Returns:
+        The fitted model.
+    """
+    import inspect
+
+    if 'sample_weight' in inspect.signature(model.fit).parameters:
+        return model.fit(X, y, sample_weight=sample_weight)
+    repeats = np.asarray(sample_weight, dtype=np.int64)
+    X_rep = X.loc[X.index.repeat(repeats)] if hasattr(X, 'loc') else np.repeat(X, repeats, axis=0)
+    return model.fit(X_rep, np.repeat(np.asarray(y), repeats))
+
+
+def compare_fits(split, repeats=3):
+    """
+    Fits every leaderboard model on the repeated rows and on the weighted
+    unique rows of the same split, and compares fit time and predictions.
+
+    Linear / Lasso / KNN agree to rounding. The trees reach the same training
+    fit, but random tie-breaking between equally good splits (and, for the
+    forest, bootstrap draws over a different row count) makes them distinct
+    draws of the same estimator, so their test predictions differ.
+
+    Returns:
+        list[dict]: One row per model.
+    """
+    from src.training import MODEL_SPECS, build_estimator
+
+    X, y, w = split['X_train'], np.asarray(split['y_train']), np.asarray(split['w_train'])
+    X_rep = X.loc[X.index.repeat(w)]
+    y_rep = np.repeat(y, w)
+    rows = []
+    for spec in MODEL_SPECS:
+        timings = {'repeated': [], 'weighted': []}
+        for _ in range(repeats):
+            start = time.perf_counter()
+            repeated = build_estimator(spec).fit(X_rep, y_rep)
+            timings['repeated'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            weighted = fit_with_weights(build_estimator(spec), X, y, w)
+            timings['weighted'].append(time.perf_counter() - start)
+        train_diff = np.abs(repeated.predict(X) - weighted.predict(X))
+        diff = np.abs(repeated.predict(split['X_test']) - weighted.predict(split['X_test']))
+        rows.append({
+            'model': spec['key'],
+            'train_rows_repeated': len(X_rep),
+            'train_rows_weighted': len(X),
+            'fit_ms_repeated': round(min(timings['repeated']) * 1e3, 2),
+            'fit_ms_weighted': round(min(timings['weighted']) * 1e3, 2),
+            'max_abs_train_diff': float(train_diff.max()),
+            'max_abs_pred_diff': float(diff.max()),
+            'mean_abs_pred_diff': round(float(diff.mean()), 4),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notebook 03 preprocessing, duplicate-aware.")
+    parser.add_argument('--verify', action='store_true',
+                        help="Rebuild the golden split and compare with data/X_*.csv.")
+    parser.add_argument('--leakage', action='store_true',
+                        help="Report profiles present in both golden train and test.")
+    parser.add_argument('--cache', action='store_true',
+                        help="Write the golden split as a memory-mapped columnar cache.")
+    parser.add_argument('--weighted', action='store_true',
+                        help="Write the weighted unique-row split as a columnar cache.")
+    parser.add_argument('--csv', action='store_true',
+                        help="Also export the weighted split as CSV to --output-dir.")
+    parser.add_argument('--compare-fit', action='store_true',
+                        help="Compare repeated-row and weighted fits of every model.")
+    parser.add_argument('--output-dir', default=DEFAULT_WEIGHTED_DIR)
+    args = parser.parse_args()
+    if not (args.verify or args.leakage or args.cache or args.weighted or args.compare_fit):
+        parser.error("choose at least one of --verify, --leakage, --cache, --weighted, "
+                     "--compare-fit")
+
+    import pandas as pd
+
+    if args.verify:
+        split = golden_split()
+        for name in ('X_train', 'X_test', 'y_train', 'y_test'):
+            committed = pd.read_csv(os.path.join('data', f'{name}.csv'))
+            rebuilt = np.asarray(split[name], dtype=np.float64).reshape(committed.shape)
+            err = np.abs(committed.to_numpy(dtype=np.float64) - rebuilt).max()
+            if err > 1e-9:
+                raise SystemExit(f"❌ {name} differs from data/{name}.csv (max abs diff {err:.3g}).")
+        print("✅ Golden pipeline reproduces data/X_train, X_test, y_train, y_test.")
+
+    if args.cache:
+        directory = save_split_cache(golden_split(), 'golden')
+        start = time.perf_counter()
+        pd.read_csv('data/X_train.csv'), pd.read_csv('data/y_train.csv')
+        csv_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        open_cache(directory)
+        open_ms = (time.perf_counter() - start) * 1e3
+        print(f"✅ Golden split cached in '{directory}' "
+              f"(open {open_ms:.2f} ms vs {csv_ms:.2f} ms to parse the training CSVs).")
+
+    if args.leakage:
+        report = leakage_report()
+        os.makedirs(os.path.dirname(DEFAULT_LEAKAGE_PATH), exist_ok=True)
+        report.to_csv(DEFAULT_LEAKAGE_PATH, index=False)
+        print(report.head(20).to_string(index=False))
+        print(f"\n⚠️ {len(report)} profiles cross the golden split: "
+              f"{report['test_copies'].sum()} test rows also appear in training "
+              f"(report saved to '{DEFAULT_LEAKAGE_PATH}').")
+
+    if args.weighted or args.compare_fit:
+        split = weighted_split()
+        n_rows = int(split['w_train'].sum() + split['w_test'].sum())
+        n_unique = len(split['X_train']) + len(split['X_test'])
+        if args.weighted:
+            directory = save_split_cache(split, 'weighted')
+            print(f"✅ Weighted split cached in '{directory}': {n_unique} unique rows "
+                  f"standing for {n_rows} ({len(split['X_train'])} train / "
+                  f"{len(split['X_test'])} test, no profile on both sides).")
+            if args.csv:
+                export_split_csv(split, args.output_dir)
+                print(f"✅ CSV export written to '{args.output_dir}'.")
+        if args.compare_fit:
+            print(pd.DataFrame(compare_fits(split)).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Raw-space model variant: parity check for the scaler folded into the thresholds.
+
+The dashboard feeds the forest unscaled inputs ([Age, Sex, BMI, Children,
+Smoker, NW, SE, SW, Cluster]); `InferenceRuntime.to_raw_space()` rewrites the
+split thresholds so no StandardScaler transform runs per request. This module
+checks that the folded variant matches the original scaler + sklearn pipeline.
+
+    python -m src.raw_space
+"""
+import numpy as np
+
+from src.runtime import runtime_from_sklearn
+
+
+def sample_raw_profiles(n_rows, seed=42):
+    """
+    Draws random encoded profiles over the dashboard's input domain (raw units).
+
+    Returns:
+        np.ndarray[float64]: Matrix of shape (n_rows, 9).
+    """
+    rng = np.random.default_rng(seed)
+    region = rng.integers(0, 4, n_rows)
+    X = np.zeros((n_rows, 9), dtype=np.float64)
+    X[:, 0] = rng.integers(18, 101, n_rows)                 # age
+    X[:, 1] = rng.integers(0, 2, n_rows)                    # sex
+    X[:, 2] = np.round(rng.uniform(10.0, 60.0, n_rows), 1)  # bmi
+    X[:, 3] = rng.integers(0, 6, n_rows)                    # children
+    X[:, 4] = rng.integers(0, 2, n_rows)                    # smoker
+    X[:, 5:8] = np.eye(4)[region][:, 1:]                    # region_northwest/southeast/southwest
+    X[:, 8] = rng.integers(0, 3, n_rows)                    # Cluster_Label
+    return X
+
+
+def boundary_profiles(raw_runtime, base):
+    """
+    Places each scaled column exactly on, just below and just above every folded
+    threshold (the hardest inputs for a threshold rewrite).
+    """
+    forest = raw_runtime.forest
+    rows = []
+    for col in raw_runtime.scaled_columns:
+        cuts = np.unique(forest.threshold[(forest.feature == col) & np.isfinite(forest.threshold)])
+        for values in (cuts, np.nextafter(cuts, -np.inf), np.nextafter(cuts, np.inf)):
+            block = np.repeat(base[:1], values.shape[0], axis=0)
+            block[:, col] = values
+            rows.append(block)
+    return np.vstack(rows)
+
+
+def verify_raw_parity(model_path='models/champion_random_forest.pkl',
+                      scaler_path='models/scaler.pkl', n_samples=200_000):
+    """
+    Compares the raw-space runtime with `model.predict(scaler.transform(...))`.
+    Requires scikit-learn (reference pipeline only).
+
+    Returns:
+        bool: True when every prediction is bit-for-bit identical.
+    """
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    raw_runtime = runtime_from_sklearn(model, scaler).to_raw_space()
+
+    X_raw = sample_raw_profiles(n_samples)
+    X_raw = np.vstack([X_raw, boundary_profiles(raw_runtime, X_raw)])
+
+    # Reference: the original pipeline (scaler on named columns, then the forest)
+    names = list(model.feature_names_in_)
+    frame = pd.DataFrame(X_raw, columns=names)
+    scaled_names = list(scaler.feature_names_in_)
+    frame[scaled_names] = scaler.transform(frame[scaled_names])
+    expected = model.predict(frame)
+    actual = raw_runtime.predict_raw(X_raw)
+    exact = bool(np.array_equal(expected, actual))
+
+    print("=" * 50)
+    print("RAW-SPACE (FOLDED SCALER) PARITY REPORT")
+    print("-" * 50)
+    print(f"Profiles compared:  {X_raw.shape[0]}")
+    print(f"Max abs difference: {np.max(np.abs(expected - actual)):.3e}")
+    print(f"Exact match:        {'YES' if exact else 'NO'}")
+    print("=" * 50)
+    return exact
+
+
+if __name__ == '__main__':
+    raise SystemExit(0 if verify_raw_parity() else 1)
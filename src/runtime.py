@@ -0,0 +1,183 @@
+"""
+Scikit-learn-free inference runtime.
+
+Loads an exported model bundle (compiled forest + scaler parameters + feature
+schema) and predicts with NumPy only, so the dashboard can cold-start without
+importing scikit-learn. Bundles are produced by `src/export_bundle.py`.
+"""
+import hashlib
+import json
+
+import numpy as np
+
+from src.forest_engine import CompiledForest, compile_forest, fold_affine
+
+BUNDLE_FORMAT_VERSION = 1
+DEFAULT_BUNDLE_PATH = 'models/champion_bundle.npz'
+
+
+# ==============================================================================
+# 1. RUNTIME
+# ==============================================================================
+class InferenceRuntime:
+    """
+    Encoded-feature -> premium predictor built from plain arrays.
+
+    The runtime accepts the 9-column encoded matrix in *raw* units
+    ([Age, Sex, BMI, Children, Smoker, NW, SE, SW, Cluster]). A scaled-space
+    forest applies the StandardScaler affine transform before traversal; a
+    raw-space forest (see `to_raw_space`) has the scaler folded into its split
+    thresholds and consumes the raw matrix directly.
+
+    Attributes:
+        forest (CompiledForest): The compiled champion ensemble.
+        scaler_mean / scaler_scale (np.ndarray[float64]): StandardScaler parameters.
+        scaled_columns (np.ndarray[int64]): Positions of the scaled columns in the vector.
+        feature_names (list[str]): Column order expected by the forest.
+        checksum (str): Content checksum of the artifact the runtime was loaded from, if known.
+    """
+
+    def __init__(self, forest, scaler_mean, scaler_scale, scaled_columns, feature_names,
+                 checksum=None):
+        self.forest = forest
+        self.scaler_mean = np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        self.scaled_columns = np.asarray(scaled_columns, dtype=np.int64)
+        self.feature_names = list(feature_names)
+        self.checksum = checksum
+
+    @property
+    def input_space(self):
+        """'raw' when the scaler is folded into the thresholds, otherwise 'scaled'."""
+        return self.forest.metadata.get('input_space', 'scaled')
+
+    def scale(self, X_raw):
+        """Returns a float64 copy of `X_raw` with the scaler applied column-wise."""
+        X = np.array(X_raw, dtype=np.float64, ndmin=2)
+        cols = self.scaled_columns
+        X[:, cols] = (X[:, cols] - self.scaler_mean) / self.scaler_scale
+        return X
+
+    def unscale(self, X_scaled):
+        """Inverse of `scale` (float64 copy)."""
+        X = np.array(X_scaled, dtype=np.float64, ndmin=2)
+        cols = self.scaled_columns
+        X[:, cols] = X[:, cols] * self.scaler_scale + self.scaler_mean
+        return X
+
+    def predict(self, X_scaled):
+        """
+        Predicts from an already scaled matrix (same layout as `X_test.csv`).
+
+        Raw-space runtimes un-scale the input first; values sitting exactly on a
+        split boundary may then round differently from the scaled pipeline.
+        """
+        if self.input_space == 'raw':
+            return self.forest.predict(self.unscale(X_scaled))
+        return self.forest.predict(X_scaled)
+
+    def predict_raw(self, X_raw):
+        """Predicts from an encoded but unscaled matrix."""
+        if self.input_space == 'raw':
+            return self.forest.predict(X_raw)
+        return self.forest.predict(self.scale(X_raw))
+
+    def to_raw_space(self):
+        """
+        Returns a runtime whose forest has the scaler folded into its thresholds.
+
+        Predictions from `predict_raw` are bit-for-bit identical to the scaled
+        pipeline, without the per-request transform and its temporary arrays.
+        """
+        if self.input_space == 'raw':
+            return self
+        forest = fold_affine(self.forest, self.scaled_columns, self.scaler_mean, self.scaler_scale)
+        return InferenceRuntime(
+            forest=forest,
+            scaler_mean=self.scaler_mean,
+            scaler_scale=self.scaler_scale,
+            scaled_columns=self.scaled_columns,
+            feature_names=self.feature_names,
+            checksum=self.checksum,
+        )
+
+
+# ==============================================================================
+# 2. BUNDLE I/O
+# ==============================================================================
+def save_bundle(runtime, path=DEFAULT_BUNDLE_PATH):
+    """
+    Writes the runtime as an uncompressed `.npz` bundle (no pickled objects).
+    """
+    forest = runtime.forest
+    meta = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'max_depth': forest.max_depth,
+        'n_features': forest.n_features,
+        'float32_inputs': forest.float32_inputs,
+        'forest_metadata': forest.metadata,
+    }
+    np.savez(
+        path,
+        meta=np.array(json.dumps(meta)),
+        scaler_mean=runtime.scaler_mean,
+        scaler_scale=runtime.scaler_scale,
+        scaled_columns=runtime.scaled_columns,
+        feature_names=np.array(runtime.feature_names),
+        **forest.arrays(),
+    )
+
+
+def load_bundle(path=DEFAULT_BUNDLE_PATH):
+    """
+    Loads a bundle written by `save_bundle`.
+
+    Returns:
+        InferenceRuntime: Ready-to-use runtime whose `checksum` is the file SHA-256.
+
+    Raises:
+        ValueError: If the bundle was written by an incompatible format version.
+    """
+    with open(path, 'rb') as fh:
+        checksum = hashlib.sha256(fh.read()).hexdigest()
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        if meta['format_version'] != BUNDLE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported bundle format {meta['format_version']} "
+                f"(expected {BUNDLE_FORMAT_VERSION})."
+            )
+        forest = CompiledForest(
+            **{name: data[name] for name in CompiledForest.ARRAY_FIELDS},
+            max_depth=meta['max_depth'],
+            n_features=meta['n_features'],
+            float32_inputs=meta['float32_inputs'],
+            metadata=meta['forest_metadata'],
+        )
+        return InferenceRuntime(
+            forest=forest,
+            scaler_mean=data['scaler_mean'],
+            scaler_scale=data['scaler_scale'],
+            scaled_columns=data['scaled_columns'],
+            feature_names=[str(f) for f in data['feature_names']],
+            checksum=checksum,
+        )
+
+
+def runtime_from_sklearn(model, scaler):
+    """
+    Builds a runtime directly from unpickled sklearn objects (export / fallback path).
+
+    Args:
+        model: Fitted tree ensemble with `feature_names_in_`.
+        scaler: Fitted StandardScaler with `feature_names_in_`.
+    """
+    feature_names = [str(f) for f in model.feature_names_in_]
+    scaled_names = [str(f) for f in scaler.feature_names_in_]
+    return InferenceRuntime(
+        forest=compile_forest(model),
+        scaler_mean=scaler.mean_,
+        scaler_scale=scaler.scale_,
+        scaled_columns=[feature_names.index(name) for name in scaled_names],
+        feature_names=feature_names,
+    )
@@ -0,0 +1,176 @@
+"""
+Central schema of the encoded model features.
+
+One registry records, for each of the 9 model columns, its position, kind,
+compact storage dtype, allowed range in raw (unscaled) units and whether the
+StandardScaler transforms it. Preprocessing, training, the columnar cache, the
+scoring CLI and the serving runtime loader (hence `app/main.py`) all check
+against it.
+
+Compact dtypes are applied only where exact: binary and integer columns fit in
+int8; a float column is stored as float32 only when every value survives the
+round trip, otherwise it stays float64. On the golden split this takes a row
+from 72 to 37 bytes without changing a single value.
+
+    python -m src.schema      # footprint of the golden split, before / after
+"""
+import argparse
+
+import numpy as np
+
+FEATURE_SCHEMA = (
+    {'name': 'age', 'kind': 'integer', 'dtype': 'int8', 'min': 0, 'max': 120, 'scaled': True},
+    {'name': 'sex', 'kind': 'binary', 'dtype': 'int8', 'min': 0, 'max': 1, 'scaled': False},
+    {'name': 'bmi', 'kind': 'continuous', 'dtype': 'float32', 'min': 5.0, 'max': 100.0,
+     'scaled': True},
+    {'name': 'children', 'kind': 'integer', 'dtype': 'int8', 'min': 0, 'max': 20, 'scaled': True},
+    {'name': 'smoker', 'kind': 'binary', 'dtype': 'int8', 'min': 0, 'max': 1, 'scaled': False},
+    {'name': 'region_northwest', 'kind': 'binary', 'dtype': 'int8', 'min': 0, 'max': 1,
+     'scaled': False},
+    {'name': 'region_southeast', 'kind': 'binary', 'dtype': 'int8', 'min': 0, 'max': 1,
+     'scaled': False},
+    {'name': 'region_southwest', 'kind': 'binary', 'dtype': 'int8', 'min': 0, 'max': 1,
+     'scaled': False},
+    {'name': 'Cluster_Label', 'kind': 'integer', 'dtype': 'int8', 'min': 0, 'max': 2,
+     'scaled': True},
+)
+FEATURE_NAMES = tuple(spec['name'] for spec in FEATURE_SCHEMA)
+SPECS_BY_NAME = {spec['name']: spec for spec in FEATURE_SCHEMA}
+SCALED_COLUMNS = tuple(spec['name'] for spec in FEATURE_SCHEMA if spec['scaled'])
+INTEGER_COLUMNS = tuple(i for i, spec in enumerate(FEATURE_SCHEMA) if spec['kind'] != 'continuous')
+
+# Raw applicant columns: categorical labels are parsed once per category
+RAW_READ_DTYPES = {'sex': 'category', 'smoker': 'category', 'region': 'category'}
+RAW_NUMERIC_COLUMNS = ('age', 'bmi', 'children')
+
+# Raw-unit bounds as arrays, for vectorized checks of encoded matrices
+RAW_MIN = np.array([spec['min'] for spec in FEATURE_SCHEMA], dtype=np.float64)
+RAW_MAX = np.array([spec['max'] for spec in FEATURE_SCHEMA], dtype=np.float64)
+
+
+# ==============================================================================
+# 1. ORDER AND RANGE CHECKS
+# ==============================================================================
+def verify_order(columns, source='input'):
+    """
+    Raises if `columns` is not exactly the schema's feature order.
+
+    Raises:
+        ValueError: On missing, extra or reordered columns.
+    """
+    columns = [str(col) for col in columns]
+    if columns == list(FEATURE_NAMES):
+        return
+    missing = [name for name in FEATURE_NAMES if name not in columns]
+    extra = [col for col in columns if col not in SPECS_BY_NAME]
+    detail = f"missing {missing}, unexpected {extra}" if missing or extra else \
+        f"order {columns}"
+    raise ValueError(f"Feature columns of {source} do not match the schema: {detail}; "
+                     f"expected {list(FEATURE_NAMES)}.")
+
+
+def out_of_range(X):
+    """
+    Rows of a raw-unit encoded matrix that violate the schema ranges.
+
+    Args:
+        X (np.ndarray): Encoded matrix of shape (n, 9), unscaled.
+
+    Returns:
+        np.ndarray[bool]: True for rows with a value outside [min, max], a NaN,
+            or a non-integral value in an integer / binary column.
+    """
+    X = np.asarray(X)
+    bad = ~((X >= RAW_MIN) & (X <= RAW_MAX)).all(axis=1)
+    integer = X[:, INTEGER_COLUMNS]
+    return bad | (integer != np.rint(integer)).any(axis=1)
+
+
+def raw_out_of_range(frame):
+    """
+    Rows of a raw applicant frame whose age / bmi / children violate the schema.
+
+    Returns:
+        np.ndarray[bool]: True for out-of-range, missing or non-integral values.
+    """
+    bad = np.zeros(len(frame), dtype=bool)
+    for name in RAW_NUMERIC_COLUMNS:
+        spec = SPECS_BY_NAME[name]
+        values = np.asarray(frame[name], dtype=np.float64)
+        bad |= ~((values >= spec['min']) & (values <= spec['max']))
+        if spec['kind'] == 'integer':
+            bad |= values != np.rint(values)
+    return bad
+
+
+# ==============================================================================
+# 2. COMPACT DTYPES
+# ==============================================================================
+def compact_array(values, dtype):
+    """
+    Casts `values` to `dtype` if every value survives the round trip.
+
+    Returns:
+        np.ndarray: The downcast array, or `values` unchanged when inexact.
+    """
+    values = np.asarray(values)
+    dtype = np.dtype(dtype)
+    if values.dtype == dtype or values.dtype.itemsize <= dtype.itemsize:
+        return values
+    if dtype.kind in 'iu':
+        if values.dtype.kind == 'f' and not np.isfinite(values).all():
+            return values
+        info = np.iinfo(dtype)
+        if values.size and (values.min() < info.min or values.max() > info.max):
+            return values
+    with np.errstate(over='ignore', invalid='ignore'):
+        cast = values.astype(dtype)
+    if not np.array_equal(cast.astype(values.dtype), values, equal_nan=values.dtype.kind == 'f'):
+        return values
+    return cast
+
+
+def compact_frame(frame):
+    """
+    Verifies the column order and downcasts each column to its schema dtype where exact.
+
+    Scaled integer columns are no longer integral, so they fall back to the
+    float candidates: float32 if exact, else float64.
+
+    Returns:
+        pd.DataFrame: A new frame with compact column dtypes.
+    """
+    verify_order(frame.columns, 'frame')
+    columns = {}
+    for name in frame.columns:
+        values = frame[name].to_numpy()
+        compact = compact_array(values, SPECS_BY_NAME[name]['dtype'])
+        if compact is values and values.dtype.kind == 'f':
+            compact = compact_array(values, 'float32')
+        columns[name] = compact
+    return frame.__class__(columns, index=frame.index)
+
+
+def bytes_per_row(frame):
+    return sum(frame[name].to_numpy().dtype.itemsize for name in frame.columns)
+
+
+def main():
+    argparse.ArgumentParser(description="Report the compact-dtype footprint of the golden split.") \
+        .parse_args()
+    import pandas as pd
+
+    for name in ('X_train', 'X_test'):
+        frame = pd.read_csv(f'data/{name}.csv')
+        compact = compact_frame(frame)
+        exact = all(np.array_equal(compact[col].to_numpy().astype(np.float64),
+                                   frame[col].to_numpy().astype(np.float64))
+                    for col in frame.columns)
+        dtypes = ', '.join(f"{col}={compact[col].dtype}" for col in compact.columns)
+        print(f"{name}: {bytes_per_row(frame)} -> {bytes_per_row(compact)} bytes/row "
+              f"(exact={exact})\n  {dtypes}")
+    print("\n✅ Feature schema verified against the golden split.")
+
+
+if __name__ == '__main__':
+    main()
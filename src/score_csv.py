@@ -0,0 +1,144 @@
+"""
+Streaming bulk-scoring CLI for applicant CSV files of any size.
+
+Reads an extract in the raw `medical_insurance_data.csv` schema (age, sex, bmi,
+children, smoker, region; extra columns are passed through) in bounded-size
+chunks, encodes each chunk with the shared `src.batch` encoder, predicts it in
+one vectorized call and appends the result to the output file. Memory use is
+bounded by `--chunksize`, not by the input size.
+
+Usage (from the repository root):
+
+    python -m src.score_csv data/medical_insurance_data.csv data/processed/scored.csv
+    python -m src.score_csv applicants.csv scored.csv --chunksize 250000 --predictions-only
+    python -m src.score_csv applicants.csv scored.csv --workers 8   # see src/parallel_scoring.py
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.batch import RAW_COLUMNS, load_default_runtime, predict_batch
+from src.feature_pipeline import unknown_labels
+from src.schema import RAW_READ_DTYPES, raw_out_of_range
+
+DEFAULT_CHUNKSIZE = 100_000
+PREDICTION_COLUMN = 'predicted_charges'
+
+
+def score_chunk(chunk, runtime):
+    """
+    Predicts one chunk. Rows with missing raw fields get NaN instead of failing
+    the whole extract (the training notebook drops such rows with `dropna`), as
+    do rows whose age / bmi / children fall outside the feature schema and rows
+    with an unknown sex / smoker / region label.
+
+    Returns:
+        np.ndarray[float64]: One prediction per row of `chunk`.
+    """
+    complete = chunk[list(RAW_COLUMNS)].notna().all(axis=1).to_numpy() & \
+        ~raw_out_of_range(chunk) & ~unknown_labels(chunk)
+    predictions = np.full(len(chunk), np.nan)
+    if complete.all():
+        predictions[:] = predict_batch(chunk, runtime)
+    elif complete.any():
+        predictions[complete] = predict_batch(chunk[complete], runtime)
+    return predictions
+
+
+def restore_integers(chunk):
+    """
+    Writes every whole-number float as an integer, value by value: pandas reads
+    an integer column as float in any chunk with a missing or fractional value,
+    which would print `2.0` in some chunks and `2` in others and make the
+    output depend on where the file was chunked or sharded. Converting each
+    value on its own means no other row of the chunk can change its format.
+
+    Returns:
+        pd.DataFrame: `chunk`, with float columns holding whole numbers as
+            object columns of integers (NaN stays blank, fractions stay floats).
+    """
+    restored = {}
+    for name, values in chunk.items():
+        if values.dtype.kind != 'f':
+            continue
+        array = values.to_numpy()
+        whole = (array == np.rint(array)) & (np.abs(array) < 2 ** 53)
+        if not whole.any():
+            continue
+        column = array.astype(object)
+        column[whole] = array[whole].astype(np.int64)
+        restored[name] = pd.Series(column, index=values.index)
+    return chunk.assign(**restored) if restored else chunk
+
+
+def score_csv(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE,
+              predictions_only=False, runtime=None, log=sys.stderr):
+    """
+    Streams `input_path` through the model and writes `output_path`.
+
+    Args:
+        input_path (str): Raw applicant CSV.
+        output_path (str): Destination CSV (overwritten).
+        chunksize (int): Rows held in memory at a time.
+        predictions_only (bool): Write only the prediction column.
+        runtime (InferenceRuntime, optional): Defaults to `load_default_runtime()`.
+        log: Stream for progress lines (None to silence).
+
+    Returns:
+        dict: Summary with 'rows', 'seconds' and 'rows_per_second'.
+    """
+    runtime = runtime or load_default_runtime()
+    if runtime is None:
+        raise FileNotFoundError("No model artifact found in 'models/'.")
+
+    start = time.perf_counter()
+    rows = 0
+    reader = pd.read_csv(input_path, chunksize=chunksize, dtype=RAW_READ_DTYPES)
+    for i, chunk in enumerate(reader):
+        missing = [col for col in RAW_COLUMNS if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing required columns: {missing}")
+
+        predictions = np.round(score_chunk(chunk, runtime), 4)
+        if predictions_only:
+            out = pd.DataFrame({PREDICTION_COLUMN: predictions})
+        else:
+            out = restore_integers(chunk).assign(**{PREDICTION_COLUMN: predictions})
+        out.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0),
+                   index=False)
+
+        rows += len(chunk)
+        if log is not None:
+            elapsed = time.perf_counter() - start
+            print(f"  chunk {i + 1}: {rows:,} rows scored ({rows / elapsed:,.0f} rows/s)", file=log)
+
+    seconds = time.perf_counter() - start
+    return {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds if seconds else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score an applicant CSV in bounded-memory chunks.")
+    parser.add_argument('input', help="CSV with columns: " + ', '.join(RAW_COLUMNS))
+    parser.add_argument('output', help="Destination CSV")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--predictions-only', action='store_true',
+                        help=f"Write only the '{PREDICTION_COLUMN}' column.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Score shards across this many processes (0 = all cores).")
+    args = parser.parse_args()
+
+    if args.workers != 1:
+        from src.parallel_scoring import score_csv_parallel
+        summary = score_csv_parallel(args.input, args.output, args.workers or None,
+                                     predictions_only=args.predictions_only)
+    else:
+        summary = score_csv(args.input, args.output, args.chunksize, args.predictions_only)
+    print(f"✅ Scored {summary['rows']:,} rows in {summary['seconds']:.2f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s) -> '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
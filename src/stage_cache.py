@@ -0,0 +1,506 @@
+"""
+Content-addressed cache of pipeline stage outputs.
+
+Every stage of the training pipeline is a pure function of its input files and
+parameters, so its outputs are stored under a key derived from exactly those:
+
+    key = sha256(stage name, stage version, parameters, library versions,
+                 sha256 of each input file, keys of the upstream stages)
+
+Stages chain through their keys, so a change anywhere (a raw row, the split
+`random_state`, a KMeans or forest hyperparameter, the scikit-learn version)
+invalidates that stage and everything downstream, and nothing else:
+
+    clusters     KMeans(3, random_state=42, n_init=10) on age/bmi/charges -> centroids
+    split        dropna + encoding + 80/20 split (random_state=101) + scaler,
+                 with the cached centroids -> columnar cache + feature pipeline
+    fit/<model>  one `src.training.MODEL_SPECS` estimator fitted on the split -> .pkl
+    evaluate     test-set R² / MAE / RMSE of every fitted model -> metrics.json
+    verify       the champion fit exported and checked for parity, as in
+                 `model_Verification_FINAL.ipynb` -> .bin artifact, .npz bundle,
+                 scaler.pkl, verification.json
+
+Entries live in `data/processed/stage_cache/<key[:2]>/<key>/`, built in a
+temporary directory and renamed into place, with a `meta.json` whose mtime is
+touched on every hit. Whenever the cache is past its size limit, the least
+recently used entries are deleted, except those of the pipeline being run (a
+fit never evicts a sibling fit that `evaluate` still needs).
+
+Usage (from the repository root):
+
+    python -m src.stage_cache                       # all stages, every model
+    python -m src.stage_cache --models random_forest knn --max-mb 256
+    python -m src.stage_cache --info
+    python -m src.stage_cache --clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+DEFAULT_STAGE_CACHE_ROOT = 'data/processed/stage_cache'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+META_NAME = 'meta.json'
+HASH_BLOCK_BYTES = 1 << 20
+
+# Bump a stage's version when its code changes what it produces
+STAGE_VERSIONS = {'clusters': 1, 'split': 1, 'fit': 1, 'evaluate': 1, 'verify': 1}
+
+
+# ==============================================================================
+# 1. KEYS
+# ==============================================================================
+_DIGESTS = {}
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's content, memoized per (path, size, mtime) for the
+    lifetime of the process.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _DIGESTS:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+                digest.update(block)
+        _DIGESTS[memo_key] = digest.hexdigest()
+    return _DIGESTS[memo_key]
+
+
+def stage_key(stage, params, inputs=(), upstream=()):
+    """
+    Content address of one stage run.
+
+    Args:
+        stage (str): Stage name ('clusters', 'split', 'fit/<model>').
+        params (dict): JSON-serializable parameters.
+        inputs (iterable[str]): Input files (hashed by content, not by path).
+        upstream (iterable[str]): Keys of the stages whose outputs are used.
+
+    Returns:
+        str: Hex SHA-256 key.
+    """
+    payload = {
+        'stage': stage,
+        'version': STAGE_VERSIONS[stage.split('/')[0]],
+        'params': params,
+        'inputs': [file_digest(path) for path in inputs],
+        'upstream': list(upstream),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _tree_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(directory) for name in files)
+
+
+# ==============================================================================
+# 2. CACHE
+# ==============================================================================
+class StageCache:
+    """
+    Directory of stage outputs keyed by `stage_key`, with LRU eviction.
+
+    Args:
+        root (str): Cache directory.
+        max_bytes (int | None): Size limit enforced after every stage run
+            (None: no limit).
+    """
+
+    def __init__(self, root=DEFAULT_STAGE_CACHE_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def run(self, stage, params, build, inputs=(), upstream=(), keep=()):
+        """
+        Returns the outputs of a stage, building them only on a cache miss.
+
+        Args:
+            stage (str), params (dict), inputs, upstream: See `stage_key`.
+            build (callable): `build(directory, upstream_dirs)` writes the stage
+                outputs into the (new, empty) directory, reading the entries of
+                the upstream keys.
+            keep (iterable[str]): Further keys protected from eviction, e.g.
+                the other stages of the same plan.
+
+        Returns:
+            dict: 'stage', 'key', 'directory', 'hit' (bool) and 'seconds'.
+        """
+        start = time.perf_counter()
+        key = stage_key(stage, params, inputs, upstream)
+        directory = self.entry_dir(key)
+        meta_path = os.path.join(directory, META_NAME)
+        hit = self.has(key)
+        if hit:
+            os.utime(meta_path)
+        else:
+            tmp_dir = f'{directory}.tmp{os.getpid()}'
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            try:
+                build(tmp_dir, [self.entry_dir(up) for up in upstream])
+                meta = {'stage': stage, 'key': key, 'params': params,
+                        'inputs': [os.path.abspath(path) for path in inputs],
+                        'upstream': list(upstream), 'created': time.time(),
+                        'build_seconds': time.perf_counter() - start,
+                        'bytes': _tree_bytes(tmp_dir)}
+                with open(os.path.join(tmp_dir, META_NAME), 'w') as f:
+                    json.dump(meta, f, indent=2)
+                shutil.rmtree(directory, ignore_errors=True)
+                os.replace(tmp_dir, directory)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict(keep={key, *upstream, *keep})
+        return {'stage': stage, 'key': key, 'directory': directory, 'hit': hit,
+                'seconds': time.perf_counter() - start}
+
+    def run_spec(self, spec, keep=()):
+        """`run` for a stage spec (see `plan_pipeline`)."""
+        return self.run(spec['stage'], spec['params'], spec['build'], spec['inputs'],
+                        spec['upstream'], keep)
+
+    def has(self, key):
+        return os.path.exists(os.path.join(self.entry_dir(key), META_NAME))
+
+    def entries(self):
+        """
+        Metadata of every entry, least recently used first.
+
+        Returns:
+            list[dict]: `meta.json` contents plus 'directory' and 'last_used'.
+        """
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for shard in os.listdir(self.root):
+            shard_dir = os.path.join(self.root, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for key in os.listdir(shard_dir):
+                meta_path = os.path.join(shard_dir, key, META_NAME)
+                try:
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                    meta['last_used'] = os.path.getmtime(meta_path)
+                except (OSError, ValueError):
+                    continue
+                meta['directory'] = os.path.join(shard_dir, key)
+                entries.append(meta)
+        return sorted(entries, key=lambda meta: meta['last_used'])
+
+    def evict(self, keep=()):
+        """
+        Deletes least recently used entries until the cache fits `max_bytes`.
+
+        Args:
+            keep (iterable[str]): Keys never evicted (the entry just used, its
+                upstream entries and the rest of its plan).
+
+        Returns:
+            list[str]: Keys of the evicted entries.
+        """
+        if self.max_bytes is None:
+            return []
+        keep = set(keep)
+        entries = self.entries()
+        total = sum(meta['bytes'] for meta in entries)
+        evicted = []
+        for meta in entries:
+            if total <= self.max_bytes:
+                break
+            if meta['key'] in keep:
+                continue
+            shutil.rmtree(meta['directory'], ignore_errors=True)
+            total -= meta['bytes']
+            evicted.append(meta['key'])
+        return evicted
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# ==============================================================================
+# 3. PIPELINE STAGES
+# ==============================================================================
+def _sklearn_version():
+    # Package metadata: keying a cache hit must not pay for importing sklearn
+    from importlib.metadata import version
+
+    return version('scikit-learn')
+
+
+def clusters_spec(raw_path):
+    """KMeans centroids of the notebook (`centers.npy`)."""
+    from src.clustering import KMEANS_N_INIT, KMEANS_RANDOM_STATE, N_CLUSTERS
+
+    def build(directory, upstream_dirs):
+        import numpy as np
+
+        from src.clustering import fit_centers
+        from src.preprocessing import TARGET, load_clean
+
+        clean = load_clean(raw_path)
+        points = clean[['age', 'bmi', TARGET]].to_numpy(dtype=np.float64)
+        np.save(os.path.join(directory, 'centers.npy'), fit_centers(points, 'full'))
+
+    params = {'n_clusters': N_CLUSTERS, 'random_state': KMEANS_RANDOM_STATE,
+              'n_init': KMEANS_N_INIT, 'mode': 'full', 'sklearn': _sklearn_version()}
+    return {'stage': 'clusters', 'params': params, 'build': build, 'inputs': [raw_path],
+            'upstream': []}
+
+
+def split_spec(raw_path, clusters_key):
+    """Golden train/test split (`split/` columnar cache, `feature_pipeline.npz`)."""
+    from src.preprocessing import SPLIT_RANDOM_STATE, TEST_SIZE
+
+    def build(directory, upstream_dirs):
+        import numpy as np
+
+        from src.preprocessing import build_split, load_clean, save_split_cache
+
+        centers = np.load(os.path.join(upstream_dirs[0], 'centers.npy'))
+        split = build_split(load_clean(raw_path), cluster_centers=centers)
+        save_split_cache(split, 'golden', os.path.join(directory, 'split'), source_path=None)
+        split['pipeline'].save(os.path.join(directory, 'feature_pipeline.npz'))
+
+    params = {'test_size': TEST_SIZE, 'random_state': SPLIT_RANDOM_STATE,
+              'sklearn': _sklearn_version()}
+    return {'stage': 'split', 'params': params, 'build': build, 'inputs': [raw_path],
+            'upstream': [clusters_key]}
+
+
+def fit_spec(model_key, split_key):
+    """One `MODEL_SPECS` estimator fitted on the split (`model.pkl`)."""
+    from src.training import SPECS_BY_KEY
+
+    spec = SPECS_BY_KEY[model_key]
+
+    def build(directory, upstream_dirs):
+        import joblib
+
+        from src.training import build_estimator
+
+        X_train, _, y_train, _ = load_stage_split(upstream_dirs[0])
+        joblib.dump(build_estimator(spec).fit(X_train, y_train),
+                    os.path.join(directory, 'model.pkl'))
+
+    params = {'estimator': list(spec['estimator']), 'params': spec['params'],
+              'sklearn': _sklearn_version()}
+    return {'stage': f'fit/{model_key}', 'params': params, 'build': build, 'inputs': [],
+            'upstream': [split_key]}
+
+
+def evaluate_spec(split_key, fit_keys):
+    """
+    Test-set R², MAE and RMSE of each fitted model (`metrics.json`), as in
+    `model_Comparison_FINAL.ipynb`.
+
+    Args:
+        fit_keys (dict): model key -> key of its fit stage.
+    """
+    models = list(fit_keys)
+
+    def build(directory, upstream_dirs):
+        import numpy as np
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+        _, X_test, _, y_test = load_stage_split(upstream_dirs[0])
+        metrics = []
+        for model_key, fit_dir in zip(models, upstream_dirs[1:]):
+            y_pred = load_stage_model(fit_dir).predict(X_test)
+            metrics.append({'model': model_key, 'r2': float(r2_score(y_test, y_pred)),
+                            'mae': float(mean_absolute_error(y_test, y_pred)),
+                            'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred)))})
+        with open(os.path.join(directory, 'metrics.json'), 'w') as f:
+            json.dump(metrics, f, indent=2)
+
+    params = {'models': models, 'metrics': ['r2', 'mae', 'rmse'], 'sklearn': _sklearn_version()}
+    return {'stage': 'evaluate', 'params': params, 'build': build, 'inputs': [],
+            'upstream': [split_key] + [fit_keys[key] for key in models]}
+
+
+def verify_spec(split_key, fit_key):
+    """
+    Serving artifacts of the champion fit (`champion_forest.bin`,
+    `champion_bundle.npz`, `scaler.pkl`) with the parity checks of
+    `src.artifact_format` / `src.export_bundle`, plus its test-set R² and MAE
+    (`verification.json`), as in `model_Verification_FINAL.ipynb`.
+    """
+    from src.training import CHAMPION_KEY
+
+    def build(directory, upstream_dirs):
+        import joblib
+        from sklearn.metrics import mean_absolute_error, r2_score
+
+        from src.artifact_format import convert_pickles
+        from src.export_bundle import export_bundle
+        from src.feature_pipeline import FeaturePipeline
+
+        split_dir, fit_dir = upstream_dirs
+        X_train, X_test, _, y_test = load_stage_split(split_dir)
+        pipeline = FeaturePipeline.load(os.path.join(split_dir, 'feature_pipeline.npz'))
+        model_path = os.path.join(fit_dir, 'model.pkl')
+        scaler_path = os.path.join(directory, 'scaler.pkl')
+        joblib.dump(_standard_scaler(pipeline, len(X_train)), scaler_path)
+
+        # The exporters check parity against a test-set CSV; it is not kept
+        x_test_path = os.path.join(directory, 'X_test.csv')
+        X_test.to_csv(x_test_path, index=False)
+        try:
+            convert_pickles(model_path, scaler_path, os.path.join(directory, 'champion_forest.bin'),
+                            x_test_path)
+            runtime = export_bundle(model_path, scaler_path,
+                                    os.path.join(directory, 'champion_bundle.npz'), x_test_path)
+        finally:
+            os.remove(x_test_path)
+
+        y_pred = runtime.predict(X_test.to_numpy())
+        with open(os.path.join(directory, 'verification.json'), 'w') as f:
+            json.dump({'model': CHAMPION_KEY, 'r2': float(r2_score(y_test, y_pred)),
+                       'mae': float(mean_absolute_error(y_test, y_pred))}, f, indent=2)
+
+    params = {'model': CHAMPION_KEY, 'sklearn': _sklearn_version()}
+    return {'stage': 'verify', 'params': params, 'build': build, 'inputs': [],
+            'upstream': [split_key, fit_key]}
+
+
+def _standard_scaler(pipeline, n_samples):
+    """The fitted `StandardScaler` behind a split's feature pipeline, for `scaler.pkl`."""
+    import numpy as np
+    from sklearn.preprocessing import StandardScaler
+
+    from src.schema import SCALED_COLUMNS
+
+    scaler = StandardScaler()
+    scaler.mean_ = pipeline.scaler_mean
+    scaler.scale_ = pipeline.scaler_scale
+    scaler.var_ = pipeline.scaler_scale ** 2
+    scaler.n_features_in_ = len(SCALED_COLUMNS)
+    scaler.feature_names_in_ = np.array(SCALED_COLUMNS, dtype=object)
+    scaler.n_samples_seen_ = np.int64(n_samples)
+    return scaler
+
+
+def load_stage_split(directory):
+    """(X_train, X_test, y_train, y_test) of a split entry, memory-mapped."""
+    from src.preprocessing import load_split_cache
+
+    X_train, X_test, y_train, y_test, _, _ = load_split_cache(
+        'golden', os.path.join(directory, 'split'))
+    return X_train, X_test, y_train, y_test
+
+
+def load_stage_model(directory):
+    import joblib
+
+    return joblib.load(os.path.join(directory, 'model.pkl'))
+
+
+def load_stage_metrics(directory):
+    with open(os.path.join(directory, 'metrics.json')) as f:
+        return json.load(f)
+
+
+def load_stage_verification(directory):
+    with open(os.path.join(directory, 'verification.json')) as f:
+        return json.load(f)
+
+
+def plan_pipeline(models, raw_path=None):
+    """
+    Stage specs of clusters -> split -> fit/<model> -> evaluate (and verify,
+    when the champion is among the models), keyed upfront.
+
+    Keys depend only on inputs, parameters and upstream keys, so the whole
+    plan is addressed without building anything.
+
+    Returns:
+        dict: stage name -> spec (see `StageCache.run`) plus 'key' and 'deps'
+            (upstream stage names), in topological order.
+    """
+    from src.preprocessing import RAW_DATA_PATH
+    from src.training import CHAMPION_KEY
+
+    raw_path = raw_path or RAW_DATA_PATH
+    plan = {}
+
+    def add(spec, deps):
+        spec['key'] = stage_key(spec['stage'], spec['params'], spec['inputs'], spec['upstream'])
+        spec['deps'] = deps
+        plan[spec['stage']] = spec
+        return spec['key']
+
+    clusters_key = add(clusters_spec(raw_path), [])
+    split_key = add(split_spec(raw_path, clusters_key), ['clusters'])
+    fit_keys = {key: add(fit_spec(key, split_key), ['split']) for key in models}
+    if models:
+        add(evaluate_spec(split_key, fit_keys), ['split'] + [f'fit/{key}' for key in models])
+    if CHAMPION_KEY in fit_keys:
+        add(verify_spec(split_key, fit_keys[CHAMPION_KEY]), ['split', f'fit/{CHAMPION_KEY}'])
+    return plan
+
+
+def run_cached_pipeline(cache, models, raw_path=None):
+    """
+    Runs every stage of `plan_pipeline` in order through the cache. Every key of
+    the plan is kept on eviction, so a later stage never finds an input deleted
+    by an earlier one; the cache may exceed its limit while the plan itself is
+    larger than the limit.
+
+    Returns:
+        list[dict]: One `StageCache.run` result per stage, in execution order.
+    """
+    plan = plan_pipeline(models, raw_path)
+    keys = {spec['key'] for spec in plan.values()}
+    return [cache.run_spec(spec, keep=keys) for spec in plan.values()]
+
+
+def main():
+    from src.training import MODEL_SPECS, SPECS_BY_KEY
+
+    parser = argparse.ArgumentParser(description="Run the training stages through the "
+                                                 "content-addressed cache.")
+    parser.add_argument('--models', nargs='+', choices=list(SPECS_BY_KEY),
+                        default=[spec['key'] for spec in MODEL_SPECS])
+    parser.add_argument('--input', default=None, help="Raw CSV (default: the notebook data).")
+    parser.add_argument('--root', default=DEFAULT_STAGE_CACHE_ROOT)
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 2 ** 20,
+                        help="LRU size limit in MiB (default: 512).")
+    parser.add_argument('--info', action='store_true', help="List the cached entries.")
+    parser.add_argument('--clear', action='store_true', help="Delete the whole cache.")
+    args = parser.parse_args()
+
+    cache = StageCache(args.root, int(args.max_mb * 2 ** 20))
+    if args.clear:
+        cache.clear()
+        print(f"✅ Stage cache '{args.root}' cleared.")
+        return
+    if args.info:
+        entries = cache.entries()
+        for meta in reversed(entries):
+            print(f"{meta['key'][:12]}  {meta['stage']:<22} {meta['bytes'] / 1e6:8.2f} MB  "
+                  f"built in {meta['build_seconds']:.2f}s")
+        total = sum(meta['bytes'] for meta in entries)
+        print(f"\n✅ {len(entries)} entries, {total / 2 ** 20:.1f} of {args.max_mb:g} MiB.")
+        return
+
+    start = time.perf_counter()
+    results = run_cached_pipeline(cache, args.models, args.input)
+    for result in results:
+        print(f"{'hit ' if result['hit'] else 'miss'}  {result['stage']:<22} "
+              f"{result['seconds']:7.3f}s  {result['key'][:12]}")
+    hits = sum(result['hit'] for result in results)
+    print(f"\n✅ {hits}/{len(results)} stages served from '{args.root}' in "
+          f"{time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == '__main__':
+    main()
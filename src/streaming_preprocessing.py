@@ -0,0 +1,377 @@
+"""
+Chunked preprocessing with memory bounded by the chunk size, not the dataset.
+
+`src.preprocessing` loads the whole raw CSV, as the notebook does. This mode
+reads it twice with `pd.read_csv(chunksize=...)`, holding one chunk at a time:
+
+    pass 1 - each chunk is cleaned (dropna), encoded through the fixed category
+             tables of `src.feature_pipeline` (so a chunk that lacks a region
+             still yields all three region columns) and clustered with frozen
+             centroids. Rows go to train / test by a hash of their raw row
+             number, and the per-chunk mean / M2 of the scaled columns over the
+             training rows are merged (Chan et al.'s parallel form of Welford's
+             update) into the scaler statistics.
+    pass 2 - each chunk is transformed with the now-fitted scaler into a reused
+             buffer and appended to the column `.npy` files of the cache
+             (`src.columnar_cache.CacheWriter`).
+
+Two things differ from the in-memory golden split, both because they would
+need every row at once: the split is a per-row hash (stable when rows are
+appended) rather than a global permutation, and KMeans is not refitted: the
+centroids come from a saved `FeaturePipeline` (`models/feature_pipeline.npz`).
+With `--fit-clusters` an extra first pass refits them instead with streaming
+mini-batch k-means (`src.clustering`), numbered as the saved ones.
+
+Usage (from the repository root):
+
+    python -m src.streaming_preprocessing --chunksize 100000
+    python -m src.streaming_preprocessing --input claims.csv --name claims --check
+    python -m src.streaming_preprocessing --input claims.csv --fit-clusters
+"""
+import argparse
+import csv
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.clustering import DEFAULT_BATCH_SIZE, fit_centers, iter_cluster_points
+from src.columnar_cache import CacheWriter, cache_dir
+from src.feature_pipeline import (DEFAULT_PIPELINE_PATH, RAW_COLUMNS, SCALED_INDEX,
+                                  FeaturePipeline, unknown_labels)
+from src.preprocessing import RAW_DATA_PATH, SPLIT_RANDOM_STATE, TARGET, TEST_SIZE
+from src.schema import FEATURE_SCHEMA, RAW_READ_DTYPES, raw_out_of_range
+
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_CACHE_NAME = 'streaming'
+
+# Binary columns are exact in int8; everything else is stored as float64
+CACHE_COLUMNS = [(spec['name'], np.int8 if spec['kind'] == 'binary' else np.float64)
+                 for spec in FEATURE_SCHEMA]
+
+
+# ==============================================================================
+# 1. STREAMING BUILDING BLOCKS
+# ==============================================================================
+class RunningMoments:
+    """
+    Column-wise count / mean / sum of squared deviations, merged chunk by chunk.
+
+    Each chunk's statistics are computed in one vectorized pass and combined
+    with the running totals by the pairwise update of Chan, Golub & LeVeque,
+    which is as stable as Welford's per-row recurrence.
+    """
+
+    def __init__(self, n_columns):
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+
+    def update(self, X):
+        n_b = X.shape[0]
+        if n_b == 0:
+            return
+        mean_b = X.mean(axis=0)
+        self.merge(n_b, mean_b, ((X - mean_b) ** 2).sum(axis=0))
+
+    def merge(self, count, mean, m2):
+        """Folds in the statistics of another set of rows."""
+        if count == 0:
+            return
+        n = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / n)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.count * count / n)
+        self.count = n
+
+    def state(self):
+        """JSON-serializable statistics (see `from_state`)."""
+        return {'count': self.count, 'mean': self.mean.tolist(), 'm2': self.m2.tolist()}
+
+    @classmethod
+    def from_state(cls, state):
+        moments = cls(len(state['mean']))
+        moments.merge(state['count'], np.asarray(state['mean']), np.asarray(state['m2']))
+        return moments
+
+    @property
+    def variance(self):
+        """Population variance (ddof=0), as StandardScaler uses."""
+        return self.m2 / self.count
+
+    @property
+    def scale(self):
+        """Standard deviation with zero-variance columns mapped to 1 (StandardScaler)."""
+        std = np.sqrt(self.variance)
+        return np.where(std == 0.0, 1.0, std)
+
+
+def _splitmix64(values):
+    z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def is_test_row(row_numbers, test_size=TEST_SIZE, seed=SPLIT_RANDOM_STATE):
+    """
+    Deterministic per-row split: a row's side depends only on its raw row number.
+
+    Returns:
+        np.ndarray[bool]: True for test rows (about `test_size` of them).
+    """
+    with np.errstate(over='ignore'):
+        hashed = _splitmix64(np.asarray(row_numbers, dtype=np.uint64) + np.uint64(seed))
+    return (hashed >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, stop) of a file."""
+
+    def __init__(self, path, start=0, stop=None):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._left = (os.path.getsize(path) if stop is None else stop) - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._file.readinto(memoryview(buffer)[:max(0, min(len(buffer), self._left))])
+        self._left -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def read_header(path):
+    """Column names of a CSV (its first line)."""
+    with open(path, newline='') as f:
+        return next(csv.reader(f))
+
+
+def complete_length(path, block_size=1 << 16):
+    """
+    Size of a file up to and including its last newline: a writer that is
+    still appending may have left a partial last line, which is not read.
+    """
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def usable_rows(frame):
+    """
+    Rows that can be trained on.
+
+    Returns:
+        tuple: (complete, valid) boolean arrays; complete rows have every raw
+            field and the target, valid ones are complete, inside the schema
+            ranges and carry known category labels.
+    """
+    complete = frame[list(RAW_COLUMNS) + [TARGET]].notna().all(axis=1).to_numpy()
+    return complete, complete & ~raw_out_of_range(frame) & ~unknown_labels(frame)
+
+
+def iter_clean_chunks(path, chunksize=DEFAULT_CHUNKSIZE, start=0, stop=None, first_row=0,
+                      names=None, progress=None):
+    """
+    Yields the valid raw rows (see `usable_rows`) chunk by chunk.
+
+    Incomplete rows are dropped as the notebook's `dropna` does. Complete rows
+    outside the schema ranges or with an unknown label are skipped too, and
+    counted, so one bad row never blocks the rows after it.
+
+    Args:
+        path (str): Raw CSV.
+        start / stop (int, optional): Byte range to read; a range that does not
+            start at 0 has no header line and needs `names`.
+        first_row (int): Raw row number of the first row in the range.
+        names (list[str], optional): Column names of a headerless range.
+        progress (dict, optional): Receives 'rows', the raw rows read so far
+            (incomplete rows included), 'invalid_rows', the complete rows
+            skipped as invalid, and 'first_invalid_row', the raw row number of
+            the first of them (None when there is none).
+
+    Yields:
+        tuple: (raw row numbers, chunk DataFrame of valid rows)
+
+    Raises:
+        ValueError: On missing columns.
+    """
+    offset = first_row
+    if progress is not None:
+        progress.setdefault('invalid_rows', 0)
+        progress.setdefault('first_invalid_row', None)
+    header = {'header': None, 'names': names} if names is not None else {}
+    with io.BufferedReader(_ByteRange(path, start, stop)) as source:
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=RAW_READ_DTYPES, **header):
+            missing = [col for col in RAW_COLUMNS + (TARGET,) if col not in chunk.columns]
+            if missing:
+                raise ValueError(f"Input is missing required columns: {missing}")
+            rows = np.arange(offset, offset + len(chunk))
+            offset += len(chunk)
+            complete, valid = usable_rows(chunk)
+            if progress is not None:
+                progress['rows'] = offset
+                invalid = rows[complete & ~valid]
+                if invalid.size:
+                    progress['invalid_rows'] += int(invalid.size)
+                    if progress['first_invalid_row'] is None:
+                        progress['first_invalid_row'] = int(invalid[0])
+            yield rows[valid], chunk[valid]
+
+
+# ==============================================================================
+# 2. TWO-PASS PREPROCESSING
+# ==============================================================================
+def stream_preprocess(path=RAW_DATA_PATH, name=DEFAULT_CACHE_NAME, chunksize=DEFAULT_CHUNKSIZE,
+                      pipeline_path=DEFAULT_PIPELINE_PATH, fit_clusters=False,
+                      batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Builds a columnar cache of the encoded, scaled train/test split in two
+    streaming passes.
+
+    Args:
+        path (str): Raw CSV in the schema of `medical_insurance_data.csv`.
+        name (str): Cache name under `data/processed/cache/`.
+        chunksize (int): Raw rows held in memory at a time.
+        pipeline_path (str): Saved pipeline providing the cluster centroids.
+        fit_clusters (bool): Refit the centroids in an extra streaming pass
+            (aligned to the saved ones) instead of reusing them.
+        batch_size (int): Rows per mini-batch step when `fit_clusters`.
+
+    Only the bytes up to the last newline at the start of the call are read,
+    so rows appended meanwhile are left for `src.ingest`.
+
+    Returns:
+        dict: 'directory', 'pipeline' (with the streamed scaler), 'rows',
+            'train_rows', 'test_rows', 'seconds', 'moments' (training-row
+            RunningMoments), 'source_offset' and 'source_rows' (bytes and raw
+            rows read, incomplete rows included), 'invalid_rows' and
+            'first_invalid_row' (complete rows skipped, see `iter_clean_chunks`).
+    """
+    start = time.perf_counter()
+    stop = complete_length(path)
+    progress = {'rows': 0}
+    centers = FeaturePipeline.load(pipeline_path).cluster_centers
+    if fit_clusters:
+        centers = fit_centers(iter_cluster_points(path, chunksize, stop=stop), 'streaming',
+                              batch_size=batch_size, reference=centers)
+    pipeline = FeaturePipeline(cluster_centers=centers)
+    moments = RunningMoments(len(SCALED_INDEX))
+    buffer = np.empty((chunksize, len(CACHE_COLUMNS)))
+    split_rows = {'train': 0, 'test': 0}
+
+    # Pass 1: split assignment and scaler statistics
+    for rows, chunk in iter_clean_chunks(path, chunksize, stop=stop, progress=progress):
+        X = pipeline.transform(chunk, chunk[TARGET], out=buffer[:len(chunk)], scale=False)
+        test = is_test_row(rows)
+        moments.update(X[~test][:, SCALED_INDEX])
+        split_rows['test'] += int(test.sum())
+        split_rows['train'] += int((~test).sum())
+    pipeline.scaler_mean, pipeline.scaler_scale = moments.mean, moments.scale
+
+    # Pass 2: transform and append to the column files
+    directory = cache_dir(name)
+    writer = CacheWriter(directory, split_rows, CACHE_COLUMNS, source_path=path)
+    for rows, chunk in iter_clean_chunks(path, chunksize, stop=stop):
+        X = pipeline.transform(chunk, chunk[TARGET], out=buffer[:len(chunk)])
+        y = chunk[TARGET].to_numpy(dtype=np.float64)
+        test = is_test_row(rows)
+        writer.append('train', X[~test], y[~test])
+        writer.append('test', X[test], y[test])
+    writer.close()
+    pipeline.save(os.path.join(directory, 'feature_pipeline.npz'))
+    return {
+        'directory': directory,
+        'pipeline': pipeline,
+        'rows': split_rows['train'] + split_rows['test'],
+        'train_rows': split_rows['train'],
+        'test_rows': split_rows['test'],
+        'seconds': time.perf_counter() - start,
+        'moments': moments,
+        'source_offset': stop,
+        'source_rows': progress['rows'],
+        'invalid_rows': progress['invalid_rows'],
+        'first_invalid_row': progress['first_invalid_row'],
+    }
+
+
+def check_against_in_memory(result, path=RAW_DATA_PATH):
+    """
+    Recomputes the same split in memory (StandardScaler on the whole training
+    frame) and compares it with the streamed cache.
+
+    Returns:
+        dict: Max abs differences of the scaler mean / scale and the cached features.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    from src.columnar_cache import open_cache
+
+    raw = pd.read_csv(path)
+    clean = raw[usable_rows(raw)[1]]
+    test = is_test_row(clean.index.to_numpy())
+    pipeline = result['pipeline']
+    X = pipeline.transform(clean, clean[TARGET], scale=False)
+    scaler = StandardScaler().fit(X[~test][:, SCALED_INDEX])
+    reference = FeaturePipeline(scaler.mean_, scaler.scale_, pipeline.cluster_centers)
+
+    splits = open_cache(result['directory'])
+    feature_diff = 0.0
+    for name, rows in (('train', ~test), ('test', test)):
+        expected = reference.transform(clean[rows], clean[TARGET][rows])
+        feature_diff = max(feature_diff, float(np.abs(splits[name].matrix() - expected).max()))
+    return {
+        'mean_diff': float(np.abs(pipeline.scaler_mean - scaler.mean_).max()),
+        'scale_diff': float(np.abs(pipeline.scaler_scale - scaler.scale_).max()),
+        'feature_diff': feature_diff,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-pass, bounded-memory preprocessing.")
+    parser.add_argument('--input', default=RAW_DATA_PATH)
+    parser.add_argument('--name', default=DEFAULT_CACHE_NAME,
+                        help="Cache name under data/processed/cache (default: streaming).")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--pipeline', default=DEFAULT_PIPELINE_PATH,
+                        help="Saved FeaturePipeline supplying the cluster centroids.")
+    parser.add_argument('--fit-clusters', action='store_true',
+                        help="Refit the centroids with streaming mini-batch k-means.")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--check', action='store_true',
+                        help="Compare with an in-memory fit (loads the whole file).")
+    args = parser.parse_args()
+
+    from src.benchmark import _peak_rss_mb
+
+    result = stream_preprocess(args.input, args.name, args.chunksize, args.pipeline,
+                               args.fit_clusters, args.batch_size)
+    print(f"✅ {result['rows']:,} rows ({result['train_rows']:,} train / "
+          f"{result['test_rows']:,} test) cached in '{result['directory']}' in "
+          f"{result['seconds']:.2f}s, peak RSS {_peak_rss_mb():.0f} MB "
+          f"(chunks of {args.chunksize:,} rows).")
+    if result['invalid_rows']:
+        print(f"⚠️ Skipped {result['invalid_rows']:,} rows outside the schema ranges or with "
+              f"unknown labels (first: raw row {result['first_invalid_row']}).")
+    if args.check:
+        diffs = check_against_in_memory(result, args.input)
+        print(f"   vs in-memory: scaler mean {diffs['mean_diff']:.1e}, scale "
+              f"{diffs['scale_diff']:.1e}, features {diffs['feature_diff']:.1e} (max abs diff)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""
+Reproducible training of every leaderboard model from the golden split.
+
+Each competitor notebook (`notebooks/model_*.ipynb`) fits one estimator on
+`data/X_train.csv` / `data/y_train.csv` but only the champion was ever saved.
+`MODEL_SPECS` records the exact configuration of each notebook so the models
+can be rebuilt as artifacts and evaluated by `src/leaderboard.py`.
+
+Usage (from the repository root):
+
+    python -m src.training --missing          # train only models without an artifact
+    python -m src.training --models knn lasso # (re)train specific models
+    python -m src.training --weighted --models random_forest
+                                              # fit on the de-duplicated weighted split
+"""
+import argparse
+import os
+import time
+
+MODEL_SPECS = (
+    {
+        'key': 'random_forest',
+        'name': 'Random Forest Regressor (Pritilata)',
+        'notebook': 'model_RF_pritilata.ipynb',
+        'artifact': 'models/champion_random_forest.pkl',
+        'estimator': ('sklearn.ensemble', 'RandomForestRegressor'),
+        'params': {'n_estimators': 100, 'max_depth': 7, 'random_state': 42},
+    },
+    {
+        'key': 'decision_tree',
+        'name': 'Decision Tree Regressor (Dhrubajit)',
+        'notebook': 'model_DecisionTree_dhrubajit.ipynb',
+        'artifact': 'models/decision_tree.pkl',
+        'estimator': ('sklearn.tree', 'DecisionTreeRegressor'),
+        'params': {'random_state': 42},
+    },
+    {
+        'key': 'knn',
+        'name': 'KNN Regressor (Subhadip)',
+        'notebook': 'model_KNN_Subhadip.ipynb',
+        'artifact': 'models/knn.pkl',
+        'estimator': ('sklearn.neighbors', 'KNeighborsRegressor'),
+        'params': {'n_neighbors': 5},
+    },
+    {
+        'key': 'linear',
+        'name': 'Linear Regression (Shriyut)',
+        'notebook': 'model_Linear_Regression_Shriyut.ipynb',
+        'artifact': 'models/linear_regression.pkl',
+        'estimator': ('sklearn.linear_model', 'LinearRegression'),
+        'params': {},
+    },
+    {
+        'key': 'lasso',
+        'name': 'Lasso Regression (Shriyut)',
+        'notebook': 'model_Lasso_Regression_Shriyut.ipynb',
+        'artifact': 'models/lasso_regression.pkl',
+        'estimator': ('sklearn.linear_model', 'Lasso'),
+        'params': {'alpha': 0.1, 'random_state': 101},
+    },
+)
+SPECS_BY_KEY = {spec['key']: spec for spec in MODEL_SPECS}
+CHAMPION_KEY = 'random_forest'
+WEIGHTED_MODELS_DIR = 'models/weighted'
+
+
+def load_golden_data(data_dir='data', use_cache=True):
+    """
+    Loads the processed split exactly as the model notebooks do.
+
+    The memory-mapped columnar cache (`python -m src.preprocessing --cache`) is
+    used when it is up to date; otherwise the CSVs in `data_dir` are parsed,
+    downcast to the schema's compact dtypes where exact.
+
+    Returns:
+        tuple: (X_train DataFrame, X_test DataFrame, y_train ndarray, y_test ndarray)
+
+    Raises:
+        ValueError: If the feature columns do not follow `src.schema`.
+    """
+    import pandas as pd
+
+    from src.columnar_cache import cache_dir, is_fresh
+    from src.schema import compact_frame
+
+    if use_cache and data_dir == 'data' and is_fresh(cache_dir('golden')):
+        from src.preprocessing import load_split_cache
+
+        X_train, X_test, y_train, y_test, _, _ = load_split_cache('golden')
+        return X_train, X_test, y_train, y_test
+
+    X_train = compact_frame(pd.read_csv(os.path.join(data_dir, 'X_train.csv')))
+    X_test = compact_frame(pd.read_csv(os.path.join(data_dir, 'X_test.csv')))
+    y_train = pd.read_csv(os.path.join(data_dir, 'y_train.csv')).values.ravel()
+    y_test = pd.read_csv(os.path.join(data_dir, 'y_test.csv')).values.ravel()
+    return X_train, X_test, y_train, y_test
+
+
+def build_estimator(spec):
+    """Instantiates the (unfitted) estimator described by a spec."""
+    import importlib
+
+    module, cls = spec['estimator']
+    return getattr(importlib.import_module(module), cls)(**spec['params'])
+
+
+def weighted_artifact(spec):
+    """Artifact path of a model trained on the weighted split."""
+    return os.path.join(WEIGHTED_MODELS_DIR, os.path.basename(spec['artifact']))
+
+
+def train_model(key, data_dir=None, weighted=False):
+    """
+    Fits one model and saves it as its artifact.
+
+    Args:
+        key (str): Model key from `MODEL_SPECS`.
+        data_dir (str, optional): Split directory ('data'; for `weighted`, a CSV
+            export of the weighted split instead of its columnar cache).
+        weighted (bool): Train on the de-duplicated split with sample weights and
+            save under `models/weighted/` instead of replacing the golden artifact.
+
+    Returns:
+        dict: 'key', 'artifact', 'train_rows' and 'fit_seconds'.
+    """
+    import joblib
+
+    from src.preprocessing import fit_with_weights, load_weighted_split
+
+    spec = SPECS_BY_KEY[key]
+    model = build_estimator(spec)
+    if weighted:
+        X_train, _, y_train, _, w_train, _ = load_weighted_split(data_dir)
+        artifact = weighted_artifact(spec)
+        start = time.perf_counter()
+        fit_with_weights(model, X_train, y_train, w_train)
+    else:
+        X_train, _, y_train, _ = load_golden_data(data_dir or 'data')
+        artifact = spec['artifact']
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    os.makedirs(os.path.dirname(artifact), exist_ok=True)
+    joblib.dump(model, artifact)
+    return {'key': key, 'artifact': artifact, 'train_rows': len(X_train),
+            'fit_seconds': fit_seconds}
+
+
+def missing_models():
+    """Keys of the specs whose artifact does not exist yet."""
+    return [spec['key'] for spec in MODEL_SPECS if not os.path.exists(spec['artifact'])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train leaderboard models from the golden split.")
+    parser.add_argument('--models', nargs='+', choices=list(SPECS_BY_KEY), default=[])
+    parser.add_argument('--missing', action='store_true',
+                        help="Train every model whose artifact is missing.")
+    parser.add_argument('--weighted', action='store_true',
+                        help="Fit on the weighted split (python -m src.preprocessing --weighted) "
+                             "and save under models/weighted/.")
+    args = parser.parse_args()
+
+    keys = list(args.models) + (missing_models() if args.missing else [])
+    if CHAMPION_KEY in args.models and not args.weighted:
+        print(f"⚠️ Retraining the champion overwrites '{SPECS_BY_KEY[CHAMPION_KEY]['artifact']}'; "
+              "re-export the bundle and .bin artifact afterwards.")
+    if not keys:
+        print("Nothing to train: every model artifact already exists.")
+        return
+    for key in dict.fromkeys(keys):
+        result = train_model(key, weighted=args.weighted)
+        print(f"✅ {SPECS_BY_KEY[key]['name']} saved to '{result['artifact']}' "
+              f"({result['train_rows']} rows, fit {result['fit_seconds']:.2f}s).")
+
+
+if __name__ == '__main__':
+    main()